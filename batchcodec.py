@@ -0,0 +1,207 @@
+#Batch packet codec on NumPy: thousands to millions of packets per call, no Python loop per packet.
+#
+#packet.py builds and parses one packet at a time. For replaying and analysing captures and for
+#bulk traffic generation, packets here live back to back in one uint8 buffer plus an offsets array
+#(packet i is buf[offsets[i]:offsets[i + 1]]), and headers decode into a structured array whose
+#dtype is generated from packet.PacketLayout, so it always matches the wire layout: integers
+#big-endian, addresses as address keys (pack_addr) so they compare against the router's keys.
+#
+#NumPy is only needed by this module, nothing else in the tree imports it.
+
+import numpy as np
+
+from packet import PACKET_LAYOUTS, UNICAST_LAYOUT, MULTICAST_LAYOUT, WIRE_ORDER, pack_addr
+
+_BYTE_ORDER = {'!': '>', '>': '>', '<': '<', '=': '=', '@': '='}[WIRE_ORDER]
+_FORMATS = {'B': 'u1', 'H': _BYTE_ORDER + 'u2', 'I': _BYTE_ORDER + 'u4', 'L': _BYTE_ORDER + 'u4',
+            # address fields hold the address key, read in host order like packet.ADDR
+            '4s': '=u4'}
+
+
+def header_dtype(layout):
+    """Structured dtype of one packet header, field for field as the layout packs it."""
+    names, formats, offsets = [], [], []
+    for name in layout.names:
+        field, offset, decode = layout.fields[name]
+        names.append(name)
+        formats.append(_FORMATS[field.format.lstrip('!<>=@')])
+        offsets.append(offset)
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': layout.size})
+
+
+UNICAST_DTYPE = header_dtype(UNICAST_LAYOUT)
+MULTICAST_DTYPE = header_dtype(MULTICAST_LAYOUT)
+
+
+def addr_keys(addresses, n):
+    #n address keys out of one dotted IP, one key, or a sequence of either
+    if isinstance(addresses, str):
+        return np.full(n, pack_addr(addresses), dtype=np.uint32)
+    if isinstance(addresses, (int, np.integer)):
+        return np.full(n, addresses, dtype=np.uint32)
+    if isinstance(addresses, np.ndarray) and addresses.dtype.kind in 'ui':
+        return addresses.astype(np.uint32, copy=False)
+    # captures repeat a handful of addresses, so each distinct one is converted once
+    cache = {}
+    keys = [a if not isinstance(a, str) else cache[a] if a in cache else cache.setdefault(a, pack_addr(a))
+            for a in addresses]
+    return np.asarray(keys, dtype=np.uint32)
+
+
+def _payloads(payloads, n):
+    #(concatenated payload bytes, length per packet) of one payload for all or one per packet
+    if isinstance(payloads, str):
+        payloads = payloads.encode()
+    if isinstance(payloads, (bytes, bytearray, memoryview)):
+        data = np.frombuffer(payloads, dtype=np.uint8)
+        return np.tile(data, n), np.full(n, len(data), dtype=np.int64)
+    lengths = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=n)
+    return np.frombuffer(b''.join(payloads), dtype=np.uint8), lengths
+
+
+def _assemble(headers, payload, lengths):
+    #one buffer with every header followed by its payload, and the offsets of the packets
+    n = len(headers)
+    size = headers.dtype.itemsize
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(lengths + size, out=offsets[1:])
+    buf = np.empty(offsets[-1], dtype=np.uint8)
+    if n and (lengths == lengths[0]).all():
+        # equal sizes: the buffer is an n x packet-size matrix, header columns then payload columns
+        rows = buf.reshape(n, -1)
+        rows[:, :size] = headers.view(np.uint8).reshape(n, size)
+        rows[:, size:] = payload.reshape(n, -1)
+        return buf, offsets
+    header_index = (offsets[:-1, None] + np.arange(size)).ravel()
+    buf[header_index] = headers.view(np.uint8)
+    is_payload = np.ones(len(buf), dtype=bool)
+    is_payload[header_index] = False
+    buf[is_payload] = payload
+    return buf, offsets
+
+
+def encode_unicast(seq, TTL, src, dst, payloads, n=None):
+    """Encode n unicast packets into (buf, offsets), byte for byte what create_unicast_packet makes.
+
+    seq and TTL are scalars or arrays, src and dst dotted IPs, address keys or sequences of either,
+    payloads one bytes-like for every packet or a sequence of n. n defaults to the sequences' length.
+    """
+    n = _count(n, seq, TTL, src, dst, payloads)
+    payload, lengths = _payloads(payloads, n)
+    headers = np.zeros(n, dtype=UNICAST_DTYPE)
+    headers['type'] = 4
+    headers['length'] = UNICAST_DTYPE.itemsize + lengths
+    headers['seq'] = seq
+    headers['TTL'] = TTL
+    headers['src'] = addr_keys(src, n)
+    headers['dst'] = addr_keys(dst, n)
+    return _assemble(headers, payload, lengths)
+
+
+def encode_multicast(seq, TTL, kval, dst1, dst2, dst3, payloads, n=None):
+    """Encode n three-destination multicast packets, like create_multicast_packet; see encode_unicast."""
+    n = _count(n, seq, TTL, kval, dst1, dst2, dst3, payloads)
+    payload, lengths = _payloads(payloads, n)
+    headers = np.zeros(n, dtype=MULTICAST_DTYPE)
+    headers['type'] = 3
+    headers['length'] = MULTICAST_DTYPE.itemsize + lengths
+    headers['seq'] = seq
+    headers['TTL'] = TTL
+    headers['kval'] = kval
+    headers['dst1'] = addr_keys(dst1, n)
+    headers['dst2'] = addr_keys(dst2, n)
+    headers['dst3'] = addr_keys(dst3, n)
+    return _assemble(headers, payload, lengths)
+
+
+def _count(n, *values):
+    if n is not None:
+        return n
+    for value in values:
+        if not isinstance(value, (str, bytes, bytearray, memoryview, int, np.integer)):
+            return len(value)
+    raise ValueError("n is needed when every field is a scalar")
+
+
+def split_packets(buf):
+    """Offsets of the packets in a buffer that has no framing of its own, from their length fields.
+
+    Each length is only known once the previous packet is, so this walks the buffer packet by packet;
+    keep the offsets of a capture with it rather than recomputing them.
+    """
+    field, length_offset, _ = UNICAST_LAYOUT.fields['length']
+    data = memoryview(np.ascontiguousarray(buf, dtype=np.uint8))
+    offsets = [0]
+    end = len(data)
+    while offsets[-1] < end:
+        start = offsets[-1]
+        if start + length_offset + field.size > end:
+            raise ValueError(f"truncated packet at byte {start}")
+        length = field.unpack_from(data, start + length_offset)[0]
+        if length < 1 or start + length > end:
+            raise ValueError(f"bad length {length} at byte {start}")
+        offsets.append(start + length)
+    return np.asarray(offsets, dtype=np.int64)
+
+
+def decode(buf, offsets, dtype=UNICAST_DTYPE):
+    """Headers of every packet in buf as a structured array of dtype (UNICAST_DTYPE by default).
+
+    Every packet is read with the same layout; packets of other types (see the 'type' field) or
+    shorter than the header come out as garbage and are for the caller to mask off, e.g. with
+    valid(). Payload i is buf[offsets[i] + dtype.itemsize:offsets[i + 1]].
+    """
+    buf = np.asarray(buf, dtype=np.uint8)
+    index = offsets[:-1, None] + np.arange(dtype.itemsize)
+    np.minimum(index, len(buf) - 1, out=index)
+    return np.ascontiguousarray(buf[index]).view(dtype).reshape(-1)
+
+
+def valid(headers, offsets, packet_type):
+    #packets of packet_type whose length field matches their framing
+    size = PACKET_LAYOUTS[packet_type].size
+    lengths = np.diff(offsets)
+    return (headers['type'] == packet_type) & (lengths >= size) & (headers['length'] == lengths)
+
+
+def to_destinations(headers, destinations, field='dst'):
+    #mask of packets addressed to any of destinations (dotted IPs or address keys)
+    if isinstance(destinations, (str, int)):
+        destinations = [destinations]
+    return np.isin(headers[field], addr_keys(destinations, len(destinations)))
+
+
+def decrement_ttl(buf, offsets, mask=None, layout=UNICAST_LAYOUT):
+    """forward_unicast_in_place for many packets: TTL - 1 in buf where it is still above 0.
+
+    Only packets in mask (all by default) are touched. Returns the mask of packets still alive,
+    expired ones (TTL 0) are left as they are and are for the caller to drop.
+    """
+    _, ttl_offset, _ = layout.fields['TTL']
+    positions = offsets[:-1] + ttl_offset
+    if mask is not None:
+        positions = positions[mask]
+    ttl = buf[positions]
+    alive = ttl > 0
+    buf[positions[alive]] = ttl[alive] - 1
+    if mask is None:
+        return alive
+    out = np.zeros(len(offsets) - 1, dtype=bool)
+    out[np.flatnonzero(mask)[alive]] = True
+    return out
+
+
+def select(buf, offsets, mask):
+    """(buf, offsets) of only the packets in mask, in order, for replaying a filtered capture."""
+    starts = offsets[:-1][mask]
+    lengths = np.diff(offsets)[mask]
+    new_offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=new_offsets[1:])
+    index = np.repeat(starts - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return np.asarray(buf, dtype=np.uint8)[index], new_offsets
+
+
+def packets(buf, offsets):
+    #the packets as bytes objects, to hand to send() one at a time
+    data = np.asarray(buf, dtype=np.uint8).tobytes()
+    return [data[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
@@ -0,0 +1,51 @@
+"""All-pairs routing tables over a generated topology, as compute_routing_tables now builds them.
+
+The graph is extracted once (TopologySpec.graph(), the same {node: {neighbor: bw}} shape as
+extract_graph in changed_version.py) and spf.all_routing_tables runs SPF from every router, first
+in this process and then over process pools of growing size. A handful of sources are checked
+against spf.shortest_paths on the dict graph. The default 1000 routers take seconds, 5000 show
+what the pools buy.
+
+Run from the repository root:  python -m benchmarks.bench_all_pairs [--routers N]
+"""
+import argparse
+import os
+import random
+import time
+
+import topogen
+from spf import all_routing_tables, shortest_paths
+
+
+def check(graph, tables, count=5, seed=0):
+    for source in random.Random(seed).sample(sorted(tables), count):
+        expected = shortest_paths(graph, source)
+        got = tables[source]
+        assert {d: c for d, (c, h) in got.items()} == {d: c for d, (c, h) in expected.items()}, source
+        for dest, (cost, hop) in got.items():
+            if dest == source or dest == hop:
+                continue
+            # ties may pick a different first hop, it just has to start a shortest path
+            assert cost == graph[source][hop] + tables[hop][dest][0], (source, dest, hop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="All-pairs routing tables over growing process pools")
+    parser.add_argument('--routers', type=int, default=1000)
+    args = parser.parse_args()
+    spec = topogen.random_geometric(args.routers, degree=4, bw=(1, 100), seed=1)
+    graph = spec.graph()
+    print(f"{len(spec.routers)} routers, {len(spec.links)} links, {os.cpu_count()} cpu(s)")
+
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{'workers':>8}{'seconds':>10}")
+    for workers in counts:
+        start = time.perf_counter()
+        tables = all_routing_tables(graph, sources=spec.routers, workers=workers)
+        print(f"{workers:>8}{time.perf_counter() - start:>10.2f}")
+    check(graph, tables)
+    print(f"{len(tables)} routing tables, spot checks match shortest_paths")
+
+
+if __name__ == '__main__':
+    main()
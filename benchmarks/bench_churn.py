@@ -0,0 +1,73 @@
+"""Churn storm: one flapping link, with and without SPF throttling and flood pacing.
+
+Cold-starts a generated topology in the simulator, then flaps the cost of one link between 1 and
+1000 every interval for duration seconds; both routers on the link re-originate their LSA on every
+flap. Reports packets on the wire, SPF runs (IncrementalSPF repairs) and the CPU seconds they took
+over all routers, and for the throttled runs how many triggers were coalesced into a scheduled run
+or deferred by the backoff. Every run must end with each router's routes matching a from-scratch SPF.
+The unthrottled runs cost wall time in proportion to flaps times routers; the defaults take a few
+seconds.
+
+Run from the repository root:  python -m benchmarks.bench_churn [--routers N] [--duration S] [--intervals MS ...]
+"""
+import argparse
+import time
+
+import topogen
+from sim import Network
+from spf import distances, shortest_paths
+
+THROTTLE = (0.005, 0.05, 1.0)
+FLOOD_RATE = 1000
+
+
+def churn(spec, interval, duration, **kwargs):
+    net = Network.from_spec(spec, **kwargs)
+    net.start()
+    net.run()
+    router = min(net.routers)
+    neighbor = next(other for (node, other) in net.links if node == router and other in net.routers)
+    net.reset_counters()
+    before = net.spf_stats()
+    start = time.perf_counter()
+    flaps = int(duration / interval)
+    for i in range(flaps):
+        net.sim.schedule(i * interval, net.set_cost, router, neighbor, 1000 if i % 2 == 0 else 1)
+    net.run()
+    wall = time.perf_counter() - start
+    check(net)
+    stats = net.spf_stats()
+    stats = {key: value - before.get(key, 0) for key, value in stats.items()}
+    packets = sum(intf.tx_packets for link in set(net.links.values()) for intf in (link.intf1, link.intf2))
+    return flaps, packets, stats, wall
+
+
+def check(net):
+    graph = {router.addr: router.own_links() for router in net.routers.values()}
+    for router in net.routers.values():
+        assert distances(router.routing_table) == distances(shortest_paths(graph, router.addr)), router.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flap one link with and without SPF throttling and flood pacing")
+    parser.add_argument('--routers', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=0.05, help="simulated seconds of flapping")
+    parser.add_argument('--intervals', type=float, nargs='+', default=[10, 1, 0.2], help="ms between flaps")
+    args = parser.parse_args()
+    duration = args.duration
+    spec = topogen.random_geometric(args.routers, degree=4, seed=3)
+    print(f"{spec}, flapping for {duration:g} s; throttle {THROTTLE} s, pacing {FLOOD_RATE} packets/s")
+    print(f"{'interval ms':>12}{'mode':>10}{'flaps':>7}{'packets':>10}{'SPF runs':>10}{'SPF cpu s':>11}"
+          f"{'coalesced':>11}{'deferred':>10}{'wall s':>8}")
+    modes = (('plain', {}), ('throttled', {'spf_throttle': THROTTLE, 'flood_rate': FLOOD_RATE}))
+    for interval in (ms / 1e3 for ms in args.intervals):
+        for mode, kwargs in modes:
+            flaps, packets, stats, wall = churn(spec, interval, duration, **kwargs)
+            runs = stats['full'] + stats['incremental'] + stats['stub']
+            cpu = stats['full_time'] + stats['incremental_time'] + stats['stub_time']
+            print(f"{interval * 1e3:>12g}{mode:>10}{flaps:>7}{packets:>10}{runs:>10}{cpu:>11.2f}"
+                  f"{stats.get('coalesced', 0):>11}{stats.get('deferred', 0):>10}{wall:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
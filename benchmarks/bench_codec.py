@@ -0,0 +1,89 @@
+"""Packet codec cost per packet type and payload size.
+
+For every packet type and payload sizes of 1 to 1480 bytes, reports ns per operation and packets
+per second for:
+
+    encode   create_*_packet from fields and payload
+    decode   PacketView of the received bytes, every header field and the payload (read_header +
+             read_data for the dict-based callers)
+    forward  what a transit router does to it: unicast TTL patch in place, LSA re-flood rewrite,
+             multicast group read; hellos are never forwarded
+
+The exact wire bytes are pinned by the golden packets in test_packet.py; run the tests before
+timing a codec change.
+
+Run from the repository root:  python -m benchmarks.bench_codec [--number N] [--out results.json]
+"""
+import argparse
+import json
+import timeit
+
+from packet import (create_unicast_packet, create_multicast_packet, create_group_multicast_packet,
+                    create_LSA_packet, create_hello_packet, encode_lsa_links, pack_addr, PacketView,
+                    writable_packet, forward_unicast_in_place, reflood_LSA_in_place, MAX_PACKET_SIZE)
+
+SIZES = (1, 64, 512, 1480)
+R2 = pack_addr('10.0.0.2')
+
+
+def decode(packet):
+    view = PacketView(packet)
+    view.header()
+    return view.payload
+
+
+def cases(size):
+    #(type, encode, packet) per packet type, the payload being size bytes
+    payload = b'x' * size
+    links = {pack_addr(f"10.{i >> 8 & 255}.{i & 255}.1"): i for i in range(max(1, (size - 4) // 8))}
+    group = [f"10.0.{i}.1" for i in range(16)]
+    encoders = (
+        ('unicast', lambda: create_unicast_packet(1, 64, '10.0.0.1', '10.0.0.9', payload)),
+        ('multicast', lambda: create_multicast_packet(1, 64, 2, '10.0.0.9', '10.0.0.10', '10.0.0.11', payload)),
+        ('group16', lambda: create_group_multicast_packet(1, 64, 3, group, payload)),
+        # the LSA's payload is its links, as many as fit in size bytes
+        ('LSA', lambda: create_LSA_packet(1, 64, '10.0.0.2', 0, R2, 1, 0, encode_lsa_links(links))),
+    )
+    return [(name, encode, encode()) for name, encode in encoders]
+
+
+def forwarder(name, packet, scratch):
+    if name == 'unicast':
+        return lambda: forward_unicast_in_place(writable_packet(packet, scratch))
+    if name == 'LSA':
+        return lambda: reflood_LSA_in_place(writable_packet(packet, scratch), R2)
+    return lambda: PacketView(packet).destinations
+
+
+def ns_per_op(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time packet encode/decode/forward per type and size")
+    parser.add_argument('--number', type=int, default=20000, help="calls per timing")
+    parser.add_argument('--out', help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    scratch = bytearray(MAX_PACKET_SIZE)
+    results = []
+    print(f"{'packet':<10}{'payload':>8}{'bytes':>7}" + ''.join(f"{op + ' ns':>12}{'Mpps':>7}" for op in ('encode', 'decode', 'forward')))
+    for size in SIZES:
+        for name, encode, packet in cases(size):
+            ops = {'encode': encode, 'decode': lambda: decode(packet), 'forward': forwarder(name, packet, scratch)}
+            timings = {op: ns_per_op(fn, args.number) for op, fn in ops.items()}
+            results.append({'packet': name, 'payload': size, 'bytes': len(packet), 'ns': timings})
+            print(f"{name:<10}{size:>8}{len(packet):>7}" + ''.join(f"{ns:>12.0f}{1e3 / ns:>7.2f}" for ns in timings.values()))
+    hello = create_hello_packet(1, '10.0.0.2')
+    timings = {'encode': ns_per_op(lambda: create_hello_packet(1, '10.0.0.2'), args.number),
+               'decode': ns_per_op(lambda: decode(hello), args.number)}
+    results.append({'packet': 'hello', 'payload': 0, 'bytes': len(hello), 'ns': timings})
+    print(f"{'hello':<10}{0:>8}{len(hello):>7}" + ''.join(f"{ns:>12.0f}{1e3 / ns:>7.2f}" for ns in timings.values()))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'format': 1, 'results': results}, f, indent=1)
+        print(f"wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Convergence harness: time until every router's routes match a central oracle, written as JSON.
+
+Boots a generated topology in the simulator, injects one event per scenario and measures the
+simulated time until every live router's routing table has the costs an SPF over the links that
+are really up gives (Network.expected_routes). Events:
+
+    cold-start    every router originates its first LSA at once
+    link-down     a router-router link fails, found by the hellos' dead interval
+    link-up       a failed link comes back, its adjacency has to come up again
+    cost-change   a link's cost changes and both ends re-originate their LSA
+    router-crash  a router and all its links go dead
+
+Every event other than cold-start runs on a converged network with its adjacencies up. Each
+scenario runs in a fresh process, so peak_rss_kb is that scenario's own peak. Besides the
+convergence time a record has the LSA/LSU packets and bytes, all packets, SPF runs per router and
+the seconds they took, simulator events and wall time. Results go to --out as JSON, with the git
+revision, so runs can be compared release over release:
+
+    python -m benchmarks.bench_convergence --topology grid --routers 100 --out convergence.json
+
+Mininet is not driven from here; a Mininet run would have to report the same record fields.
+"""
+import argparse
+import json
+import platform
+import random
+import resource
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import topogen
+from sim import Network
+
+EVENTS = ('cold-start', 'link-down', 'link-up', 'cost-change', 'router-crash')
+# packet types counted as link-state traffic, see packet.py
+LSA, LSU = 5, 6
+
+
+def converge(net, limit, step):
+    #run until the routes match the oracle: simulated seconds it took, None if not within limit
+    start = net.sim.now
+    expected = net.expected_routes()
+    while not net.routes_match(expected):
+        if net.sim.now - start >= limit:
+            return None
+        net.run(net.sim.now + step)
+    return net.sim.now - start
+
+
+def scenario(kind, routers, event, seed, hello, dead, limit, step):
+    """One event on one topology, as a result record."""
+    spec = topogen.generate(kind, routers, seed=seed)
+    rng = random.Random(seed)
+    net = Network.from_spec(spec, seed=seed)
+    router_links = sorted((a, b) for a, b, params in spec.links if a in spec.routers and b in spec.routers)
+    link = rng.choice(router_links)
+    victim = rng.choice(sorted(spec.routers))
+    net.start_timers(hello_interval=hello, dead_interval=dead, refresh_interval=0, max_age=0)
+    net.start()
+    if event != 'cold-start':
+        assert converge(net, limit, step) is not None, "no cold start"
+        net.run(net.sim.now + dead + 2 * hello)
+        if event == 'link-up':
+            net.set_link(*link, False)
+            assert converge(net, limit, step) is not None, "link down never converged"
+        net.reset_counters()
+    spf_before = {name: dict(router.spf.stats) for name, router in net.routers.items()}
+    events_before = net.sim.processed
+    wall = time.perf_counter()
+    if event == 'link-down':
+        net.set_link(*link, False)
+    elif event == 'link-up':
+        net.set_link(*link, True)
+    elif event == 'cost-change':
+        net.set_cost(*link, 1000)
+    elif event == 'router-crash':
+        net.crash(victim)
+    converged = converge(net, limit, step)
+    wall = time.perf_counter() - wall
+
+    runs = []
+    spf_seconds = 0.0
+    for name, router in net.routers.items():
+        stats, before = router.spf.stats, spf_before[name]
+        runs.append(sum(stats[path] - before[path] for path in ('full', 'incremental', 'stub')))
+        spf_seconds += sum(stats[path] - before[path] for path in ('full_time', 'incremental_time', 'stub_time'))
+    traffic = net.traffic()
+    return {
+        'topology': spec.name,
+        'routers': len(spec.routers),
+        'links': len(spec.links),
+        'event': event,
+        'target': {'cold-start': None, 'router-crash': victim}.get(event, list(link)),
+        'hello_interval': hello,
+        'dead_interval': dead,
+        'converged_s': converged,
+        'lsa_packets': traffic.get(LSA, (0, 0))[0],
+        'lsa_bytes': traffic.get(LSA, (0, 0))[1],
+        'lsu_packets': traffic.get(LSU, (0, 0))[0],
+        'lsu_bytes': traffic.get(LSU, (0, 0))[1],
+        'packets': sum(packets for packets, size in traffic.values()),
+        'spf_runs': {'total': sum(runs), 'mean': sum(runs) / len(runs), 'max': max(runs)},
+        'spf_seconds': spf_seconds,
+        'sim_events': net.sim.processed - events_before,
+        'wall_s': wall,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure link-state convergence after injected events")
+    parser.add_argument('--topology', default='grid', choices=('ring', 'grid', 'fat-tree', 'geometric'))
+    parser.add_argument('--routers', type=int, nargs='+', default=[100])
+    parser.add_argument('--events', nargs='+', default=list(EVENTS), choices=EVENTS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hello', type=float, default=0.1, help="hello interval, seconds")
+    parser.add_argument('--dead', type=float, default=0.3, help="dead interval, seconds")
+    parser.add_argument('--limit', type=float, default=10, help="simulated seconds to wait for convergence")
+    parser.add_argument('--step', type=float, default=0.001, help="seconds between convergence checks")
+    parser.add_argument('--jobs', type=int, default=1, help="scenarios run in parallel")
+    parser.add_argument('--out', default='convergence.json')
+    args = parser.parse_args()
+
+    jobs = [(args.topology, n, event, args.seed, args.hello, args.dead, args.limit, args.step)
+            for n in args.routers for event in args.events]
+    # one process per scenario, so neither memory peaks nor state carry over
+    with ProcessPoolExecutor(args.jobs, mp_context=get_context('spawn'), max_tasks_per_child=1) as pool:
+        results = list(pool.map(scenario, *zip(*jobs)))
+    for r in results:
+        converged = 'never' if r['converged_s'] is None else f"{r['converged_s'] * 1e3:.1f} ms"
+        print(f"{r['topology']:>14} {r['event']:>13}: {converged:>10}, {r['lsa_packets'] + r['lsu_packets']:>7} LSA/LSU packets, "
+              f"SPF runs {r['spf_runs']['mean']:.1f}/router, {r['peak_rss_kb'] / 1024:.0f} MB peak")
+    report = {
+        'format': 1,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'revision': revision(),
+        'python': platform.python_version(),
+        'settings': vars(args),
+        'results': results,
+    }
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {args.out}")
+
+
+if __name__ == '__main__':
+    main()
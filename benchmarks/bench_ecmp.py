@@ -0,0 +1,79 @@
+"""Equal-cost multipath: aggregate throughput from s to d1-d3 with and without ECMP.
+
+s reaches r1 over a fast link, r1 reaches r5 over three parallel two-hop paths (r2, r3, r4) of
+equal cost, and d1-d3 hang off r5. s offers each destination more than one 10 Mbit/s path can
+carry; without ECMP all three flows share r1's single best path, with ECMP the flow hash spreads them
+over the parallel ones. Also checks SPF's equal-cost first hops against brute force on MyTopo and a
+grid, where every link has the same cost.
+
+Run from the repository root:  python -m benchmarks.bench_ecmp
+"""
+import itertools
+
+import topogen
+from sim import Network
+from spf import IncrementalSPF, shortest_paths
+
+
+def parallel_paths(paths=3, bw=10, fast=100):
+    spec = topogen.TopologySpec(f"parallel-{paths}")
+    spec.source = spec.add_host('s')
+    for name in ['r1'] + [f"r{i + 2}" for i in range(paths)] + [f"r{paths + 2}"]:
+        spec.add_router(name)
+    last = f"r{paths + 2}"
+    spec.add_link('s', 'r1', bw=fast)
+    for i in range(paths):
+        spec.add_link('r1', f"r{i + 2}", bw=bw)
+        spec.add_link(f"r{i + 2}", last, bw=bw)
+    for i in range(1, 4):
+        spec.destinations.append(spec.add_host(f"d{i}"))
+        spec.add_link(last, f"d{i}", bw=fast)
+    return spec.assign_addresses()
+
+
+def throughput(spec, ecmp, seconds=1.0, rate_mbit=8, size=1000):
+    net = Network.from_spec(spec, ecmp=ecmp, queue_bytes=256 * 1024)
+    net.start()
+    net.run()
+    start = net.sim.now
+    interval = size * 8 / (rate_mbit * 1e6)
+    for i in range(int(seconds / interval)):
+        for dest in spec.destinations:
+            net.sim.schedule(i * interval, net.send, spec.source, dest, b"x" * size, i % 256)
+    net.run()
+    received = sum(net.hosts[dest].received_bytes for dest in spec.destinations)
+    return received * 8 / (net.sim.now - start) / 1e6, received
+
+
+def equal_cost_first_hops(graph, source):
+    #brute force: a neighbor n is an equal-cost first hop to d if cost(source, n) + dist(n, d) == dist(source, d)
+    dist = {dest: cost for dest, (cost, hop) in shortest_paths(graph, source).items()}
+    from_neighbor = {n: {d: c for d, (c, h) in shortest_paths(graph, n).items()} for n in graph[source]}
+    hops = {}
+    for dest in dist:
+        if dest != source:
+            hops[dest] = tuple(sorted(n for n, cost in graph[source].items()
+                                      if dest in from_neighbor[n] and cost + from_neighbor[n][dest] == dist[dest]))
+    return hops
+
+
+def main():
+    for spec in (topogen.mytopo(flat=False), topogen.grid(6, 6, dests=3)):
+        graph = spec.graph()
+        for source in spec.routers:
+            # hosts do not forward, leave their links out like LSAs would
+            router_graph = {node: links for node, links in graph.items() if node in spec.routers}
+            multipath = IncrementalSPF(source, router_graph).multipath()
+            del multipath[source]
+            assert multipath == equal_cost_first_hops(router_graph, source), source
+    print("SPF equal-cost first hops match brute force on MyTopo and a 6x6 grid")
+
+    spec = parallel_paths()
+    print(f"{spec.name}: s offers 3 x 8 Mbit/s over 3 parallel 10 Mbit/s paths")
+    for ecmp in (False, True):
+        mbit, received = throughput(spec, ecmp)
+        print(f"  ecmp={ecmp!s:5}  {mbit:6.1f} Mbit/s delivered to d1-d3 ({received} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Failure-to-reconvergence time with hello-driven failure detection, for several hello intervals.
+
+Cold-starts a topology in the simulator, starts hellos with the given hello/dead intervals and
+lets the adjacencies come up, then fails something and measures how long it takes until every live
+router's routing table has the costs an SPF over the surviving links gives (Network.expected_routes).
+That time is about the dead interval, the failure has to be detected first, plus the flooding of
+the new LSAs. Also reports the packets (hellos included) sent in the meantime.
+
+Run from the repository root:  python -m benchmarks.bench_failover
+"""
+import topogen
+from sim import Network
+
+INTERVALS = ((1.0, 4.0), (0.1, 0.3), (0.02, 0.06))
+
+
+def failover(spec, fail, hello, dead, step=0.001):
+    net = Network.from_spec(spec)
+    net.start()
+    net.run()
+    net.start_timers(hello_interval=hello, dead_interval=dead, refresh_interval=0, max_age=0)
+    net.run(net.sim.now + dead + 2 * hello)
+    assert all(state == 'up' for router in net.routers.values() for state in router.adjacencies.values())
+    net.reset_counters()
+    fail(net)
+    failed = net.sim.now
+    expected = net.expected_routes()
+    while not net.routes_match(expected):
+        assert net.sim.now - failed < 2 * dead + 1, "no reconvergence"
+        net.run(net.sim.now + step)
+    packets = sum(intf.tx_packets for link in set(net.links.values()) for intf in (link.intf1, link.intf2))
+    return net.sim.now - failed, packets
+
+
+def main():
+    grid = topogen.grid(10, 10)
+    center = sorted(grid.routers, key=lambda name: int(name[1:]))[len(grid.routers) // 2 + 5]
+    scenarios = (
+        (topogen.mytopo(), "link r1-r2 down", lambda net: net.set_link('r1', 'r2', False)),
+        (topogen.mytopo(), "r2 crashes", lambda net: net.crash('r2')),
+        (grid, f"{center} crashes", lambda net: net.crash(center)),
+    )
+    print(f"{'topology':>12}{'failure':>18}{'hello s':>9}{'dead s':>8}{'reconverged ms':>16}{'packets':>9}")
+    for spec, name, fail in scenarios:
+        for hello, dead in INTERVALS:
+            elapsed, packets = failover(spec, fail, hello, dead)
+            print(f"{spec.name:>12}{name:>18}{hello:>9g}{dead:>8g}{elapsed * 1e3:>16.1f}{packets:>9}")
+
+
+if __name__ == '__main__':
+    main()
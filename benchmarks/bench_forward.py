@@ -0,0 +1,60 @@
+"""Per-hop forwarding cost: rebuilding the packet vs patching it in place.
+
+The rebuild path is what UDPRouter.receive_packet used to do for every transit packet: decode the
+header and payload, then create_unicast_packet / create_LSA_packet a new packet with TTL - 1. The
+in-place path patches TTL (and hops/src for LSAs) in a reusable bytearray and resends it.
+
+Run from the repository root:  python -m benchmarks.bench_forward
+"""
+import timeit
+
+from packet import (read_header, read_data, create_unicast_packet, create_LSA_packet, pack_addr,
+                    writable_packet, forward_unicast_in_place, reflood_LSA_in_place, MAX_PACKET_SIZE)
+
+SRC = '10.0.0.1'
+DST = '10.0.0.9'
+ROUTER = '10.0.0.2'
+
+
+def rebuild_unicast(packet):
+    header = read_header(packet)
+    return create_unicast_packet(header["seq"], header["TTL"] - 1, header["src"], header["dst"], read_data(packet))
+
+def rebuild_LSA(packet):
+    header = read_header(packet)
+    return create_LSA_packet(header["seq"], header["TTL"] - 1, ROUTER, header["hops"] + 1, pack_addr(header["advRoute"]),
+                             header["LSSeq"], header["CRC"], read_data(packet))
+
+def in_place_unicast(packet, scratch):
+    buf = writable_packet(packet, scratch)
+    forward_unicast_in_place(buf)
+    return buf
+
+def in_place_LSA(packet, scratch, src_addr=pack_addr(ROUTER)):
+    buf = writable_packet(packet, scratch)
+    reflood_LSA_in_place(buf, src_addr)
+    return buf
+
+
+def ns_per_op(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+
+def main(number=100000):
+    scratch = bytearray(MAX_PACKET_SIZE)
+    print(f"{'packet':<10}{'payload':>8}{'rebuild ns':>12}{'in-place ns':>13}{'speedup':>9}")
+    for size in (16, 256, 1480):
+        payload = b'x' * size
+        # the TTL never reaches zero within a run because every call starts from the same received bytes
+        unicast = create_unicast_packet(1, 64, SRC, DST, payload)
+        lsa = create_LSA_packet(1, 64, SRC, 1, 7, 1, 0, payload)
+        assert bytes(in_place_unicast(unicast, scratch)) == rebuild_unicast(unicast)
+        assert bytes(in_place_LSA(lsa, scratch)) == rebuild_LSA(lsa)
+        for name, rebuild, in_place, packet in (('unicast', rebuild_unicast, in_place_unicast, unicast),
+                                                ('LSA', rebuild_LSA, in_place_LSA, lsa)):
+            slow = ns_per_op(lambda: rebuild(packet), number)
+            fast = ns_per_op(lambda: in_place(packet, scratch), number)
+            print(f"{name:<10}{size:>8}{slow:>12.0f}{fast:>13.0f}{slow / fast:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
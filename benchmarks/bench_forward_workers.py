@@ -0,0 +1,56 @@
+"""ForwardingEngine throughput for 1 to N worker processes.
+
+Builds a 10000-destination FIB over 8 egress interfaces and pushes unicast packets from 1024 flows
+through the engine with ForwardingEngine.forward, which drains the egress rings as it goes and returns
+once the workers are through, once per worker count. Prints the wall clock packets/s; it only grows
+with the worker count while every worker and the router process have a core of their own.
+
+Run from the repository root:  python -m benchmarks.bench_forward_workers [--packets N] [--workers N]
+"""
+import argparse
+import os
+import random
+import time
+
+from forwarding import ForwardingEngine
+from packet import create_unicast_packet, pack_addr, unpack_addr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ForwardingEngine throughput per worker count")
+    parser.add_argument('--packets', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=max(4, os.cpu_count() or 1), help="largest worker count, doubling from 1")
+    args = parser.parse_args()
+    count = args.packets
+    max_workers = args.workers
+    rng = random.Random(0)
+    interfaces = [f"eth{i}" for i in range(8)]
+    base = pack_addr('10.0.0.0')
+    destinations = [unpack_addr(base + i) for i in range(1, 10001)]
+    routes = [(pack_addr(dest), rng.choice(interfaces)) for dest in destinations]
+    flows = [create_unicast_packet(0, 64, f"172.16.{i // 256}.{i % 256}", rng.choice(destinations), b"x" * 64)
+             for i in range(1024)]
+    packets = [flows[rng.randrange(len(flows))] for _ in range(count)]
+
+    print(f"{count} packets, {len(flows)} flows, {len(routes)} FIB entries, {os.cpu_count()} cpu(s)")
+    print(f"{'workers':>8}{'wall pkt/s':>12}{'forwarded':>11}{'drops':>7}")
+    workers = 1
+    while workers <= max_workers:
+        sent = [0]
+
+        def send(intf, packet):
+            sent[0] += 1
+
+        engine = ForwardingEngine(interfaces, workers=workers).start()
+        engine.publish(routes)
+        start = time.perf_counter()
+        engine.forward(packets, send)
+        wall = time.perf_counter() - start
+        stats = engine.stop(send)
+        assert stats['forwarded'] + stats['egress_drops'] == count and stats['forwarded'] == sent[0]
+        print(f"{workers:>8}{count / wall:>12.0f}{stats['forwarded']:>11}{stats['egress_drops']:>7}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
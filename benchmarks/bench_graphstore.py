@@ -0,0 +1,86 @@
+"""GraphStore vs the dict graph layout: memory, SPF time and LSA row updates.
+
+Builds a geometric topology (2000 routers by default, 10000 for the memory figures at scale), reports GraphStore.nbytes() against the dict layout's
+footprint, checks GraphStore SPF costs against spf.shortest_paths for a few sources, times both, then
+replays random LSA row changes through set_row (checking rows and SPF costs afterwards) and times
+nearest() for multicast destination ranking against a full SPF plus sort.
+
+Run from the repository root:  python -m benchmarks.bench_graphstore [--routers N] [--updates N]
+"""
+import argparse
+import random
+import time
+
+import topogen
+from graphstore import GraphStore, dict_graph_nbytes
+from spf import shortest_paths
+
+
+def same_costs(store, graph, source):
+    dist, hop = store.shortest_paths(source)
+    expected = shortest_paths(graph, source)
+    got = {store.name_of(i): cost for i, cost in enumerate(dist) if cost >= 0}
+    return got == {dest: cost for dest, (cost, first_hop) in expected.items()}
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GraphStore against the dict graph layout")
+    parser.add_argument('--routers', type=int, default=2000)
+    parser.add_argument('--updates', type=int, default=2000, help="LSA row changes replayed")
+    args = parser.parse_args()
+    spec = topogen.random_geometric(args.routers, degree=4, bw=(1, 100), seed=2)
+    graph = spec.graph()
+    start = time.perf_counter()
+    store = GraphStore.from_graph(graph)
+    build = time.perf_counter() - start
+    edges = sum(len(links) for links in graph.values())
+    footprint = store.nbytes()
+    dict_bytes = dict_graph_nbytes(graph)
+    print(f"{len(store)} nodes, {edges} directed edges, GraphStore built in {build * 1e3:.0f} ms")
+    print(f"  dict layout  {dict_bytes / 1e6:8.2f} MB  {dict_bytes / edges:6.1f} B/edge")
+    print(f"  GraphStore   {footprint['total'] / 1e6:8.2f} MB  {footprint['total'] / edges:6.1f} B/edge"
+          f"  (arrays {footprint['arrays'] / 1e6:.2f} MB, interning {footprint['interning'] / 1e6:.2f} MB)")
+
+    rng = random.Random(0)
+    routers = list(spec.routers)
+    sources = rng.sample(routers, 5)
+    for source in sources:
+        assert same_costs(store, graph, source), source
+    dict_time = sum(timed(shortest_paths, graph, source) for source in sources) / len(sources)
+    store_time = sum(timed(store.shortest_paths, source) for source in sources) / len(sources)
+    print(f"SPF: dict {dict_time * 1e3:.1f} ms, GraphStore {store_time * 1e3:.1f} ms (costs match)")
+
+    updates = args.updates
+    start = time.perf_counter()
+    for _ in range(updates):
+        router = rng.choice(routers)
+        links = dict(graph[router])
+        if links and rng.random() < 0.4:
+            del links[rng.choice(list(links))]
+        else:
+            links[rng.choice(routers)] = rng.randint(1, 100)
+        links.pop(router, None)
+        graph[router] = links
+        store.set_row(router, links)
+    update_time = time.perf_counter() - start
+    assert all(store.row(router) == graph[router] for router in routers)
+    assert same_costs(store, graph, sources[0])
+    print(f"{updates} LSA row updates: {update_time / updates * 1e6:.1f} us each,"
+          f" {store.nbytes()['total'] / 1e6:.2f} MB after (rows and SPF still match)")
+
+    dests = rng.sample(routers, 3)
+    near_time = timed(store.nearest, sources[0], dests, 2)
+    table = shortest_paths(graph, sources[0])
+    ranked = sorted((dest for dest in dests if dest in table), key=lambda dest: table[dest][0])[:2]
+    assert [table[dest][0] for dest in store.nearest(sources[0], dests, 2)] == [table[dest][0] for dest in ranked]
+    print(f"nearest 2 of 3 destinations: {near_time * 1e3:.1f} ms with early exit")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Binary LSA body against the JSON encoding it replaced, at 1 to 1000 neighbors.
+
+Times encoding and decoding both ways (JSON being what encode_lsa_links/decode_lsa_links did
+before: a sorted list of pairs dumped to UTF-8 text), compares body sizes, and times loading a
+binary body straight into a GraphStore row. Both codecs must round-trip the same links.
+
+Run from the repository root:  python -m benchmarks.bench_lsa_codec
+"""
+import json
+import random
+import time
+
+from graphstore import GraphStore
+from packet import encode_lsa_links, decode_lsa_links, pack_addr
+
+
+def encode_json(links):
+    return json.dumps(sorted(links.items()))
+
+
+def decode_json(data):
+    return {neighbor: cost for neighbor, cost in json.loads(bytes(data))}
+
+
+def per_call(fn, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'links':>6}{'json B':>9}{'binary B':>10}{'json enc us':>13}{'bin enc us':>12}"
+          f"{'json dec us':>13}{'bin dec us':>12}{'to CSR us':>11}")
+    for count in (1, 10, 100, 1000):
+        links = {pack_addr(f"172.16.{i // 256}.{i % 256}"): rng.randint(1, 100) for i in range(count)}
+        as_json = encode_json(links).encode()
+        binary = encode_lsa_links(links)
+        assert decode_json(as_json) == links == decode_lsa_links(binary)
+        repeat = max(20, 20000 // count)
+        store = GraphStore()
+        store.set_row_from_lsa('r0', binary)
+        assert store.row('r0') == links
+        print(f"{count:>6}{len(as_json):>9}{len(binary):>10}"
+              f"{per_call(encode_json, links, repeat) * 1e6:>13.1f}{per_call(encode_lsa_links, links, repeat) * 1e6:>12.1f}"
+              f"{per_call(decode_json, as_json, repeat) * 1e6:>13.1f}{per_call(decode_lsa_links, binary, repeat) * 1e6:>12.1f}"
+              f"{per_call(lambda body: store.set_row_from_lsa('r0', body), binary, repeat) * 1e6:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Cold-start flooding with and without LSU bundling.
+
+Cold-starts a generated topology in the simulator (100 routers by default) once with every LSA
+flooded as its own packet and once with per-interface flood windows bundling them into LSU
+packets, and reports packets and bytes on the wire, simulated convergence time and wall time.
+Both runs must end with complete routing tables. Routers spend rx_cost (20 us by default, about
+what this Python router spends per packet) of CPU per received datagram, so per-packet overhead
+shows up in the convergence time; with rx_cost 0 bundling only adds the windows' delay. The
+default run takes a few seconds; wall time grows about with the square of the router count, 1000
+routers take minutes.
+
+Run from the repository root:  python -m benchmarks.bench_lsu [--routers N] [--window MS] [--rx-cost US]
+"""
+import argparse
+import time
+
+import topogen
+from sim import Network
+
+
+def cold_start(spec, window, rx_cost):
+    start = time.perf_counter()
+    net = Network.from_spec(spec, flood_window=window, rx_cost=rx_cost)
+    net.start()
+    net.run()
+    wall = time.perf_counter() - start
+    assert net.routes_complete()
+    intfs = [intf for link in set(net.links.values()) for intf in (link.intf1, link.intf2)]
+    packets = sum(intf.tx_packets for intf in intfs)
+    size = sum(intf.tx_bytes for intf in intfs)
+    return packets, size, net.sim.now, net.sim.processed, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start flooding with and without LSU bundling")
+    parser.add_argument('--routers', type=int, default=100)
+    parser.add_argument('--window', type=float, default=2, help="flood window of the LSU run, ms")
+    parser.add_argument('--rx-cost', type=float, default=20, help="CPU time per received packet, us")
+    args = parser.parse_args()
+    window = args.window / 1e3
+    rx_cost = args.rx_cost / 1e6
+    spec = topogen.random_geometric(args.routers, degree=4, seed=3)
+    print(f"{spec}, flood window {window * 1e3:g} ms, {rx_cost * 1e6:g} us per received packet")
+    print(f"{'mode':>8}{'packets':>10}{'MB':>8}{'converged ms':>14}{'events':>10}{'wall s':>8}")
+    for mode, w in (('per-LSA', 0), ('LSU', window)):
+        packets, size, converged, events, wall = cold_start(spec, w, rx_cost)
+        print(f"{mode:>8}{packets:>10}{size / 1e6:>8.1f}{converged * 1e3:>14.1f}{events:>10}{wall:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Multicast bytes per link: unicast fan-out against the shared-path replication tree.
+
+Cold-starts a topology in the simulator once per multicast mode, has s send one multicast to all
+destination hosts through its first router, and counts the bytes every link direction carried
+(LSA traffic excluded). Each destination must receive exactly one copy in both modes.
+
+Run from the repository root:  python -m benchmarks.bench_multicast
+"""
+import topogen
+from sim import Network
+
+
+def run(spec, mode, payload):
+    net = Network.from_spec(spec, multicast_mode=mode)
+    net.start()
+    net.run()
+    net.reset_counters()
+    first_router = net.hosts[spec.source].intfs[0].peer().node.name
+    net.send_multicast(spec.source, first_router, spec.destinations, len(spec.destinations), payload)
+    net.run()
+    received = {dest: net.hosts[dest].received for dest in spec.destinations}
+    assert all(count == 1 for count in received.values()), received
+    return net.link_bytes()
+
+
+def compare(spec, payload=b"x" * 1000, show_links=False):
+    unicast = run(spec, 'unicast', payload)
+    tree = run(spec, 'tree', payload)
+    print(f"{spec.name}: {len(spec.destinations)} destinations, {len(payload)} byte payload")
+    if show_links:
+        print(f"  {'link':>12}{'unicast B':>11}{'tree B':>9}")
+        for link in sorted(unicast.keys() | tree.keys()):
+            print(f"  {link[0] + '>' + link[1]:>12}{unicast.get(link, 0):>11}{tree.get(link, 0):>9}")
+    total_unicast, total_tree = sum(unicast.values()), sum(tree.values())
+    print(f"  total bytes on links: unicast {total_unicast}, tree {total_tree}"
+          f" ({total_tree / total_unicast:.0%}), busiest link {max(unicast.values())} vs {max(tree.values())}")
+
+
+def main():
+    compare(topogen.mytopo(flat=False), show_links=True)
+    # copies leave with TTL 10 like before, so the topologies stay within 10 hops
+    compare(topogen.grid(5, 5, dests=20, seed=1))
+    compare(topogen.fat_tree(4, dests=16, seed=2))
+
+
+if __name__ == '__main__':
+    main()
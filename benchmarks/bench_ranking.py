@@ -0,0 +1,62 @@
+"""Multicast destination ranking: the old bubble sort against DestinationRanker.
+
+For groups of 3 to 1000 members over a 10000-entry routing table, times picking the k = 10 closest
+with the bubble sort receive_packet used to do, with an uncached nsmallest selection (a new routing
+generation every call) and with the cached ranking of a steady topology, and checks that all three
+agree. Then does the same for a 1000-member group-format multicast packet, ranking straight off
+PacketView.destinations.
+
+Run from the repository root:  python -m benchmarks.bench_ranking
+"""
+import random
+import time
+
+from multicast import DestinationRanker
+from packet import PacketView, create_group_multicast_packet
+
+
+def bubble_sort_nearest(routing_table, destinations, k):
+    #what receive_packet did before DestinationRanker
+    destList = list(destinations)
+    for i in range(len(destList)):
+        for j in range(0, len(destList) - i - 1):
+            if routing_table[destList[j]][0] > routing_table[destList[j + 1]][0]:
+                destList[j], destList[j + 1] = destList[j + 1], destList[j]
+    return destList[:k]
+
+
+def per_call(fn, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    rng = random.Random(0)
+    routing_table = {addr: (rng.randint(1, 500), addr) for addr in range(10000)}
+    k = 10
+    print(f"{'members':>8}{'bubble us':>11}{'nsmallest us':>14}{'cached us':>11}")
+    for size in (3, 30, 100, 300, 1000):
+        group = rng.sample(list(routing_table), size)
+        ranker = DestinationRanker(routing_table)
+        expected = bubble_sort_nearest(routing_table, group, k)
+        assert ranker.nearest(group, k, 0) == expected
+        repeat = max(3, 30000 // (size * size))
+        bubble = per_call(lambda i: bubble_sort_nearest(routing_table, group, k), repeat)
+        uncached = per_call(lambda i: ranker.nearest(group, k, i + 1), 200)
+        cached = per_call(lambda i: ranker.nearest(group, k, 0), 2000)
+        print(f"{size:>8}{bubble * 1e6:>11.1f}{uncached * 1e6:>14.1f}{cached * 1e6:>11.2f}")
+
+    group = rng.sample(list(routing_table), 1000)
+    packet = create_group_multicast_packet(0, 10, k, group, b"x" * 64)
+    ranker = DestinationRanker(routing_table)
+    assert ranker.nearest(PacketView(packet).destinations, k, 0) == bubble_sort_nearest(routing_table, group, k)
+    uncached = per_call(lambda i: ranker.nearest(PacketView(packet).destinations, k, i + 1), 200)
+    cached = per_call(lambda i: ranker.nearest(PacketView(packet).destinations, k, 0), 2000)
+    print(f"1000-member group packet ({len(packet)} bytes): decode + rank {uncached * 1e6:.1f} us,"
+          f" decode + cached {cached * 1e6:.2f} us")
+
+
+if __name__ == '__main__':
+    main()
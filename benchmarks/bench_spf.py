@@ -0,0 +1,145 @@
+"""SPF correctness against brute force, and heap SPF vs the old linear-scan selection.
+
+Every run first checks spf.shortest_paths on random weighted graphs of a few thousand routers
+against Bellman-Ford: the costs must match exactly, and every first hop must start a shortest path
+(some predecessor on a shortest path shares it). Then it times both SPF variants as V grows, and
+replays random single-router LSA changes through IncrementalSPF against full recomputation.
+
+Run from the repository root:  python -m benchmarks.bench_spf
+"""
+import random
+import sys
+import time
+
+from spf import shortest_paths, links_of, IncrementalSPF
+
+
+def random_graph(n, degree=3, max_cost=10, seed=0):
+    #connected graph, a random spanning tree plus extra links up to the average degree, both
+    #directions of a link get the same cost like two routers advertising it
+    rng = random.Random(seed)
+    graph = {f"r{i}": {} for i in range(n)}
+    names = list(graph)
+
+    def link(a, b):
+        if a != b:
+            graph[a][b] = graph[b][a] = rng.randint(1, max_cost)
+
+    for i in range(1, n):
+        link(names[i], names[rng.randrange(i)])
+    for _ in range(n * (degree - 2) // 2):
+        link(rng.choice(names), rng.choice(names))
+    return graph
+
+
+def bellman_ford(graph, source):
+    dist = {source: 0}
+    for _ in range(len(graph)):
+        changed = False
+        for node, adjacency in graph.items():
+            if node not in dist:
+                continue
+            for neighbor, cost in links_of(adjacency):
+                if dist[node] + cost < dist.get(neighbor, sys.maxsize):
+                    dist[neighbor] = dist[node] + cost
+                    changed = True
+        if not changed:
+            break
+    return dist
+
+
+def verify(graph, source):
+    table = shortest_paths(graph, source)
+    dist = bellman_ford(graph, source)
+    assert {dest: cost for dest, (cost, hop) in table.items()} == dist, "SPF costs differ from Bellman-Ford"
+    incoming = {}
+    for node, adjacency in graph.items():
+        for neighbor, cost in links_of(adjacency):
+            incoming.setdefault(neighbor, []).append((node, cost))
+    for dest, (cost, hop) in table.items():
+        if dest == source:
+            continue
+        assert hop in graph[source], f"first hop {hop} of {dest} is not a neighbor of {source}"
+        assert any(dist[p] + c == cost and (table[p][1] == hop or (p == source and hop == dest))
+                   for p, c in incoming[dest]), f"first hop {hop} of {dest} is not on a shortest path"
+
+
+def linear_scan_spf(graph, source):
+    #what dijstrka() did: pick the closest unvisited node by scanning all of them
+    dist = {source: 0}
+    hop = {source: source}
+    visited = set()
+    while True:
+        node = None
+        for candidate, d in dist.items():
+            if candidate not in visited and (node is None or d < dist[node]):
+                node = candidate
+        if node is None:
+            return {dest: (dist[dest], hop[dest]) for dest in dist}
+        visited.add(node)
+        for neighbor, cost in links_of(graph.get(node, ())):
+            if dist[node] + cost < dist.get(neighbor, sys.maxsize):
+                dist[neighbor] = dist[node] + cost
+                hop[neighbor] = neighbor if node == source else hop[node]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    for n, seed in ((2000, 1), (3000, 2), (4000, 3)):
+        graph = random_graph(n, degree=4, seed=seed)
+        for source in random.Random(seed).sample(list(graph), 3):
+            verify(graph, source)
+    print("shortest_paths matches Bellman-Ford on 2000-4000 router graphs")
+
+    print(f"{'routers':>8}{'heap ms':>10}{'linear ms':>11}")
+    for n in (500, 1000, 2000, 4000):
+        graph = random_graph(n, degree=4, seed=n)
+        heap_time = timed(shortest_paths, graph, "r0")
+        linear_time = timed(linear_scan_spf, graph, "r0")
+        print(f"{n:>8}{heap_time * 1e3:>10.1f}{linear_time * 1e3:>11.1f}")
+
+    churn(4000, changes=300)
+
+
+def churn(n, changes, seed=0):
+    #random LSA changes: a link re-costed, removed or added, or a stub destination flapping
+    rng = random.Random(seed)
+    graph = random_graph(n, degree=4, seed=seed)
+    names = list(graph)
+    for i in range(n // 100):
+        graph[rng.choice(names)][f"d{i}"] = rng.randint(1, 10)
+    spf = IncrementalSPF("r0", graph)
+    full_time = 0.0
+    for _ in range(changes):
+        router = rng.choice(names)
+        links = dict(graph[router])
+        kind = rng.random()
+        if kind < 0.25:
+            links[f"d{rng.randrange(n // 100)}"] = rng.randint(1, 10)
+        elif kind < 0.5 and links:
+            del links[rng.choice(list(links))]
+        elif kind < 0.75:
+            links[rng.choice(names)] = rng.randint(1, 10)
+        elif links:
+            links[rng.choice(list(links))] = rng.randint(1, 10)
+        links.pop(router, None)
+        graph[router] = links
+        spf.update_links(router, links)
+        start = time.perf_counter()
+        full = shortest_paths(graph, "r0")
+        full_time += time.perf_counter() - start
+        assert {d: c for d, (c, h) in full.items()} == {d: c for d, (c, h) in spf.routes.items()}
+    stats = spf.stats
+    runs = stats['incremental'] + stats['stub']
+    print(f"{changes} LSA changes on {n} routers: incremental {stats['incremental']}, stub {stats['stub']}")
+    print(f"  avg incremental/stub update {(stats['incremental_time'] + stats['stub_time']) / runs * 1e3:.3f} ms,"
+          f" avg full SPF {full_time / changes * 1e3:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
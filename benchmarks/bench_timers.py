@@ -0,0 +1,121 @@
+"""Protocol timers on a TimerWheel: raw cost against a heap, hellos for many routers, LSA aging.
+
+1. live timers that keep being pushed back, like dead-interval timers on every hello: the wheel
+   cancels and re-inserts in O(1), a heap (what Simulator uses, with lazy deletion) keeps the
+   cancelled entries until they surface.
+2. every router of a generated topology sending hellos and watching its neighbors' dead intervals
+   on one shared wheel in the simulator, reporting live timers and wall time per simulated second.
+3. LSA refresh and max-age: after one router crashes, every other router must purge its LSA once
+   max-age has passed and its neighbors must declare it dead.
+
+Run from the repository root:  python -m benchmarks.bench_timers [--routers N] [--live N] [--resets N]
+"""
+import argparse
+import heapq
+import itertools
+import random
+import time
+
+import topogen
+from sim import Network
+from timerwheel import TimerWheel
+
+
+def nothing():
+    pass
+
+
+def wheel_resets(n, resets, rng):
+    wheel = TimerWheel(0.001)
+    timers = [wheel.schedule(rng.uniform(1, 4), nothing) for _ in range(n)]
+    start = time.perf_counter()
+    now = 0.0
+    for i in range(resets):
+        j = rng.randrange(n)
+        wheel.cancel(timers[j])
+        timers[j] = wheel.schedule(4, nothing)
+        if i % 1000 == 999:
+            now += 0.001
+            wheel.advance(now)
+    return time.perf_counter() - start, len(wheel)
+
+
+def heap_resets(n, resets, rng):
+    heap = []
+    order = itertools.count()
+    cancelled = set()
+    live = [None] * n
+    for j in range(n):
+        live[j] = next(order)
+        heapq.heappush(heap, (rng.uniform(1, 4), live[j]))
+    start = time.perf_counter()
+    now = 0.0
+    for i in range(resets):
+        j = rng.randrange(n)
+        cancelled.add(live[j])
+        live[j] = next(order)
+        heapq.heappush(heap, (now + 4, live[j]))
+        if i % 1000 == 999:
+            now += 0.001
+            while heap and heap[0][0] <= now:
+                cancelled.discard(heapq.heappop(heap)[1])
+    return time.perf_counter() - start, len(heap)
+
+
+def hellos(n, seconds):
+    spec = topogen.random_geometric(n, degree=8, seed=1)
+    net = Network.from_spec(spec)
+    net.start_timers(hello_interval=1.0, dead_interval=4.0, refresh_interval=0, max_age=0)
+    start = time.perf_counter()
+    peak = 0
+    for _ in range(int(seconds * 10)):
+        net.run(net.sim.now + 0.1)
+        peak = max(peak, len(net.timers))
+    wall = time.perf_counter() - start
+    routers = {router.addr for router in net.routers.values()}
+    dead = sum(1 for router in net.routers.values() for neighbor in router.neighbor_interfaces()
+               if neighbor in routers and neighbor not in router.neighbor_heard)
+    return spec, peak, wall / seconds, net.timers.stats, dead
+
+
+def aging():
+    net = Network.from_spec(topogen.random_geometric(50, degree=4, seed=2))
+    net.start()
+    net.run()
+    net.start_timers(hello_interval=0.5, dead_interval=2.0, refresh_interval=1.0, max_age=3.0)
+    net.run(net.sim.now + 5)
+    assert all(len(router.lsdb) == len(net.routers) for router in net.routers.values())
+    crashed = net.routers['r1']
+    net.crash('r1')
+    net.run(net.sim.now + 4)
+    others = [router for router in net.routers.values() if router is not crashed]
+    assert all(crashed.addr not in router.lsdb for router in others), "max-age did not purge r1's LSA"
+    neighbors = [router for router in others if crashed.addr in router.neighbor_interfaces()]
+    assert neighbors and all(crashed.addr not in router.neighbor_heard for router in neighbors)
+    return len(neighbors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TimerWheel against a heap, hellos and LSA aging in the simulator")
+    parser.add_argument('--routers', type=int, default=1000, help="routers sending hellos")
+    parser.add_argument('--live', type=int, default=100000, help="live timers being pushed back")
+    parser.add_argument('--resets', type=int, default=300000, help="push-backs timed")
+    args = parser.parse_args()
+    n, live, resets = args.routers, args.live, args.resets
+    print(f"{live} live timers, {resets} push-backs")
+    for name, run in (('wheel', wheel_resets), ('heap', heap_resets)):
+        seconds, entries = run(live, resets, random.Random(0))
+        print(f"  {name:>5}: {seconds / resets * 1e9:6.0f} ns per push-back, {entries} entries held")
+
+    spec, peak, per_second, stats, dead = hellos(n, 2)
+    print(f"{spec}: hellos every 1 s, dead interval 4 s")
+    print(f"  {peak} live timers, {per_second:.1f} s wall per simulated second, "
+          f"{stats['scheduled']} scheduled / {stats['cancelled']} cancelled / {stats['fired']} fired, "
+          f"{dead} adjacencies without hellos")
+
+    neighbors = aging()
+    print(f"aging: r1 crashed, purged from every LSDB within max-age, {neighbors} neighbors saw it dead")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Load sweep from s with the traffic generator: one-way latency, loss and goodput against offered rate.
+
+Cold-starts MyTopo (10 Mbit/s links) in the simulator and, for unicast to d1-d3 and for 2-anycast
+through r1, sends probes at increasing rates in each departure mode (trafficgen.MODES). Below the
+links' capacity nothing may be lost or reordered; above it the link queues fill, latency climbs to
+the queueing delay and the excess is tail-dropped. Wall is the host time the simulator took, which
+with the packets forwarded gives the in-process forwarding path's own rate.
+
+Run from the repository root:  python -m benchmarks.bench_traffic [--count N] [--size BYTES]
+Against Mininet, trafficgen.run_mininet reports the same record.
+"""
+import argparse
+import time
+
+import topogen
+import trafficgen
+from sim import Network
+
+RATES = (500, 1000, 2000, 4000, 8000)
+
+
+def run(spec, mode, rate, count, size, kval):
+    net = Network.from_spec(spec)
+    net.start()
+    net.run()
+    net.reset_counters()
+    events = net.sim.processed
+    wall = time.perf_counter()
+    result = trafficgen.run_simulated(net, spec.source, spec.destinations, mode, rate, count, size, kval)
+    wall = time.perf_counter() - wall
+    forwarded = sum(packets for packets, size in net.traffic().values())
+    return result, wall, forwarded, net.sim.processed - events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep offered load through MyTopo in the simulator")
+    parser.add_argument('--count', type=int, default=5000, help="probes per run")
+    parser.add_argument('--size', type=int, default=512, help="payload bytes")
+    args = parser.parse_args()
+
+    spec = topogen.mytopo(flat=False)
+    print(f"{spec.name}: {args.count} probes of {args.size} B payload from {spec.source}")
+    print(f"{'traffic':>10}{'mode':>10}{'pps':>7}{'loss':>8}{'reord':>7}{'p50 ms':>9}{'p99 ms':>9}{'p999 ms':>9}"
+          f"{'goodput Mb/s':>14}{'fwd kpps':>10}")
+    for kval in (None, 2):
+        for mode in trafficgen.MODES:
+            for rate in RATES:
+                result, wall, forwarded, events = run(spec, mode, rate, args.count, args.size, kval)
+                assert result['duplicates'] == 0
+                if rate == RATES[0]:
+                    assert result['lost'] == 0 and result['reordered'] == 0, result
+                    assert result['received'] == args.count * (kval or 1)
+                latency = result['latency_ms']
+                goodput = (result['goodput_bps'] or 0) / 1e6
+                print(f"{'unicast' if kval is None else f'{kval}-anycast':>10}{mode:>10}{rate:>7}{result['loss']:>8.1%}"
+                      f"{result['reordered']:>7}{latency['p50']:>9.2f}{latency['p99']:>9.2f}{latency['p999']:>9.2f}"
+                      f"{goodput:>14.2f}{forwarded / wall / 1e3:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#asyncio UDP datapath: one router per process, one datagram endpoint per interface.
+#
+#A router process knows the topology from a topogen.TopologySpec (written with --json) and its own
+#name. It opens a UDP socket bound to each of its interfaces and runs the shared LinkStateRouter
+#logic off one event loop: received datagrams go straight into receive_packet, forwarding and LSA
+#flooding call send(), which never blocks, and the protocol timers (hellos, LSA refresh, aging) sit on
+#a TimerWheel the loop advances every tick. No thread per socket.
+#
+#    python datapath.py topology.json r1          inside r1's namespace, e.g. via UDPRouter.start_datapath
+#
+#Sends go through the transport right away. When the kernel socket buffer fills, the transport
+#pauses the endpoint (pause_writing), further packets wait in a bounded per-interface queue and are
+#tail-dropped beyond it, and the queue drains once the transport resumes. Packets sent before the
+#socket is up wait in the same queue until connection_made.
+
+import argparse
+import asyncio
+import collections
+import logging
+import socket
+
+from directory import AddressDirectory
+from linkstate import LinkStateRouter
+from throttle import SPFThrottle
+from timerwheel import TimerWheel
+from topogen import TopologySpec
+
+log = logging.getLogger(__name__)
+
+ROUTER_PORT = 5005
+
+
+class RemoteRouter:
+    """A neighboring router running in its own process, only its name and router id are known here."""
+
+    is_router = True
+
+    def __init__(self, name, ip):
+        self.name = name
+        self.ip = ip
+
+
+class RemoteHost:
+    def __init__(self, name, ip):
+        self.name = name
+        self.ip = ip
+
+    def IP(self):
+        return self.ip
+
+
+class LinkEnd:
+    """One end of a spec link, with the .name / .node / .link / .params attributes of a Mininet Intf.
+
+    address is the IP this end answers on: its /30 in per-link topologies, the node's IP on a flat one.
+    """
+
+    def __init__(self, name, node, link, address):
+        self.name = name
+        self.node = node
+        self.link = link
+        self.params = link.params
+        self.address = address
+
+
+class SpecLink:
+    def __init__(self, params):
+        self.params = params
+        self.intf1 = self.intf2 = None
+
+
+class InterfaceEndpoint(asyncio.DatagramProtocol):
+    """Datagram endpoint of one router interface, with a bounded queue for while it is paused."""
+
+    def __init__(self, router, intf, peer, queue_limit):
+        self.router = router
+        self.intf = intf
+        self.peer = peer
+        self.transport = None
+        self.paused = False
+        self.backlog = collections.deque()
+        self.queue_limit = queue_limit
+        self.stats = {'rx': 0, 'tx': 0, 'queued': 0, 'drops': 0}
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # packets sent before the socket was up
+        self.drain()
+
+    def datagram_received(self, data, addr):
+        self.stats['rx'] += 1
+        self.router.receive_packet(data, self.intf)
+
+    def error_received(self, exc):
+        log.info(f"{self.router.name} {self.intf.name}: {exc}")
+
+    def send(self, packet):
+        if self.transport is None or self.paused or self.backlog:
+            # copy, the router reuses its forward buffer for the next packet
+            if len(self.backlog) >= self.queue_limit:
+                self.stats['drops'] += 1
+                return False
+            self.backlog.append(bytes(packet))
+            self.stats['queued'] += 1
+            return True
+        self.transport.sendto(packet, self.peer)
+        self.stats['tx'] += 1
+        return True
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+        self.drain()
+
+    def drain(self):
+        #send the backlog until it is empty or the transport pauses us again
+        backlog = self.backlog
+        while backlog and not self.paused:
+            self.transport.sendto(backlog.popleft(), self.peer)
+            self.stats['tx'] += 1
+
+
+class DatagramRouter(LinkStateRouter):
+    """LinkStateRouter whose interfaces are UDP sockets on the event loop."""
+
+    def __init__(self, name, ip, port=ROUTER_PORT, queue_limit=1024, bind_device=True):
+        super().__init__(name, ip)
+        self.port = port
+        self.queue_limit = queue_limit
+        self.bind_device = bind_device
+        self.intfs = []
+        self.endpoints = {}
+
+    def intfList(self):
+        return self.intfs
+
+    def send(self, intf, packet):
+        endpoint = self.endpoints.get(intf.name)
+        if endpoint is not None:
+            endpoint.send(packet)
+
+    async def open_endpoints(self):
+        loop = asyncio.get_running_loop()
+        for intf in self.intfs:
+            link = intf.link
+            other = link.intf2 if link.intf1 is intf else link.intf1
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if self.bind_device:
+                # on a flat subnet every interface has the same address, the device tells them apart
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, intf.name.encode())
+            sock.bind((intf.address, self.port))
+            sock.setblocking(False)
+            endpoint = InterfaceEndpoint(self, intf, (other.address, self.port), self.queue_limit)
+            await loop.create_datagram_endpoint(lambda: endpoint, sock=sock)
+            self.endpoints[intf.name] = endpoint
+
+    def call_later(self, delay, callback, *args):
+        asyncio.get_running_loop().call_later(delay, callback, *args)
+
+    def clock(self):
+        return asyncio.get_running_loop().time()
+
+    def every(self, interval, callback, *args):
+        #run callback now and then every interval seconds on the router's loop
+        loop = asyncio.get_running_loop()
+
+        def tick():
+            callback(*args)
+            loop.call_later(interval, tick)
+        loop.call_soon(tick)
+
+    def tick_timers(self):
+        self.timers.advance(self.clock())
+
+    async def run(self, lsa_interval=30, ttl=255, resolution=0.01):
+        await self.open_endpoints()
+        self.refresh_interval = lsa_interval
+        self.lsa_ttl = ttl
+        self.send_lsa(0, ttl)
+        self.start_timers(TimerWheel(resolution, start=self.clock()))
+        self.every(resolution, self.tick_timers)
+        await asyncio.Event().wait()
+
+
+def router_from_spec(spec, name, **kwargs):
+    #name's DatagramRouter with its interfaces and neighbors as described by spec
+    router = DatagramRouter(name, spec.routers[name], **kwargs)
+    router.directory = AddressDirectory.from_spec(spec)
+    for node1, node2, params in spec.links:
+        if name not in (node1, node2):
+            continue
+        link = SpecLink(params)
+        ends = []
+        for key, node, intf_name in ((1, node1, params['intfName1']), (2, node2, params['intfName2'])):
+            if node == name:
+                owner = router
+            elif node in spec.routers:
+                owner = RemoteRouter(node, spec.routers[node])
+            else:
+                owner = RemoteHost(node, spec.hosts[node])
+            address = params[f'params{key}']['ip'].split('/')[0] if f'params{key}' in params else spec.nodes[node]
+            ends.append(LinkEnd(intf_name, owner, link, address))
+        link.intf1, link.intf2 = ends
+        router.intfs.append(ends[0] if node1 == name else ends[1])
+    return router
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one router's UDP datapath")
+    parser.add_argument('spec', help="topology written by topogen.py --json")
+    parser.add_argument('router')
+    parser.add_argument('--port', type=int, default=ROUTER_PORT)
+    parser.add_argument('--lsa-interval', type=float, default=30)
+    parser.add_argument('--hello-interval', type=float, default=1.0)
+    parser.add_argument('--dead-interval', type=float, default=4.0)
+    parser.add_argument('--max-age', type=float, default=120.0, help="seconds before an LSA that was not refreshed is purged")
+    parser.add_argument('--flood-window', type=float, default=0.01, help="seconds to bundle LSAs per interface, 0 to send each alone")
+    parser.add_argument('--spf-throttle', type=float, nargs=3, metavar=('INITIAL', 'INCREMENTAL', 'MAX_HOLD'),
+                        help="seconds for the SPF backoff, default runs SPF on every LSA")
+    parser.add_argument('--flood-rate', type=float, default=0, help="LSA packets a second per interface, 0 for unpaced")
+    parser.add_argument('--flood-burst', type=int, default=8)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with open(args.spec) as f:
+        spec = TopologySpec.from_json(f.read())
+    router = router_from_spec(spec, args.router, port=args.port)
+    router.flood_window = args.flood_window
+    router.hello_interval = args.hello_interval
+    router.dead_interval = args.dead_interval
+    router.max_age = args.max_age
+    if args.spf_throttle:
+        router.spf_throttle = SPFThrottle(*args.spf_throttle)
+    router.flood_rate = args.flood_rate
+    router.flood_burst = args.flood_burst
+    asyncio.run(router.run(args.lsa_interval))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#Address directory: packed address key <-> node name for every address in a topology.
+#
+#Replaces the old resolve_ip_to_id if/elif chain over four hard-coded IPs. It is built once from the
+#topology (router ids, host addresses and, with per-link subnets, every interface address) and
+#answers either way with one dict lookup.
+
+from packet import pack_addr, unpack_addr
+
+
+class AddressDirectory:
+    """Address key -> node name, and node name -> its primary address key."""
+
+    def __init__(self):
+        self.names = {}
+        self.addresses = {}
+
+    @classmethod
+    def from_topology(cls, nodes, links=()):
+        #nodes maps names to their primary IP, links are (node1, node2, params) with optional
+        #params1/params2 interface addresses like a topogen.TopologySpec's
+        directory = cls()
+        for name, ip in nodes.items():
+            if ip is not None:
+                directory.add(name, ip)
+        for node1, node2, params in links:
+            for node, key in ((node1, 'params1'), (node2, 'params2')):
+                if key in params:
+                    directory.add(node, params[key]['ip'].split('/')[0])
+        return directory
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls.from_topology(spec.nodes, spec.links)
+
+    def add(self, name, ip):
+        addr = pack_addr(ip)
+        self.names[addr] = name
+        # the first address added for a node is its primary one
+        self.addresses.setdefault(name, addr)
+        return addr
+
+    def name_of(self, addr):
+        return self.names.get(addr)
+
+    def address_of(self, name):
+        return self.addresses.get(name)
+
+    def ip_of(self, name):
+        addr = self.addresses.get(name)
+        return unpack_addr(addr) if addr is not None else None
+
+    def __contains__(self, addr):
+        return addr in self.names
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,83 @@
+#Forwarding information base: packed 32-bit destination address -> output interface.
+#
+#The routing table says which neighbor a destination is reached through, resolving that to an
+#interface per packet means walking the interface list. The FIB does that resolution once, when the
+#routing table changes, so forwarding a packet is a single dict lookup on PacketView.dst_addr.
+#
+#With equal-cost multipath a destination maps to a tuple of interfaces instead, one slot per share
+#of its traffic, and a packet takes the slot its flow hashes to, so a flow always keeps one path.
+
+from math import gcd
+
+from packet import flow_hash
+
+
+class ForwardingTable:
+    """Destination address key -> output interface, swapped in as a whole on every rebuild.
+
+    The table is never modified after it is published; rebuild() builds a new dict and replaces the
+    (generation, table) snapshot with one assignment, so a lookup that grabbed the old snapshot keeps
+    reading a complete table and never a half-built one.
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self.snapshot = (0, {})
+
+    def rebuild(self, routes):
+        #routes: iterable of (dst_addr, interface) pairs
+        table = dict(routes)
+        self.generation += 1
+        self.snapshot = (self.generation, table)
+        return self.generation
+
+    def lookup(self, dst_addr, packet=None):
+        #output interface for dst_addr, among equal-cost ones the one packet's flow hashes to
+        intf = self.snapshot[1].get(dst_addr)
+        if type(intf) is tuple:
+            return intf[flow_hash(packet) % len(intf)] if packet is not None else intf[0]
+        return intf
+
+    def __len__(self):
+        return len(self.snapshot[1])
+
+    def __contains__(self, dst_addr):
+        return dst_addr in self.snapshot[1]
+
+
+def build_routes(routing_table, interfaces):
+    """(dst_addr, interface) pairs for a {dest: (cost, next_hop)} routing table.
+
+    Destinations and next hops are address keys, interfaces maps each neighbor to the interface
+    facing it. Destinations without an interface towards their next hop (the router itself, or a
+    neighbor whose link is gone) are left out and reported as unreachable.
+    """
+    for dest, (cost, next_hop) in routing_table.items():
+        intf = interfaces.get(next_hop)
+        if intf is not None:
+            yield dest, intf
+
+
+def build_multipath_routes(multipath, interfaces, weighted=False, max_slots=64):
+    """(dst_addr, interface or tuple of interfaces) pairs for a {dest: first_hops} multipath table.
+
+    Destinations with one usable first hop map to its interface as in build_routes. With several,
+    the tuple holds one slot per interface, or with weighted as many slots per interface as its
+    share of the links' bw (reduced by their gcd, at most max_slots in all).
+    """
+    for dest, next_hops in multipath.items():
+        intfs = [interfaces[hop] for hop in next_hops if hop in interfaces]
+        if len(intfs) == 1:
+            yield dest, intfs[0]
+        elif intfs:
+            if weighted:
+                weights = [max(1, int(intf.params.get('bw', 1))) for intf in intfs]
+                divisor = 0
+                for weight in weights:
+                    divisor = gcd(divisor, weight)
+                weights = [weight // divisor for weight in weights]
+                total = sum(weights)
+                if total > max_slots:
+                    weights = [max(1, weight * max_slots // total) for weight in weights]
+                intfs = [intf for intf, weight in zip(intfs, weights) for _ in range(weight)]
+            yield dest, tuple(intfs)
@@ -0,0 +1,287 @@
+#Multi-core forwarding: unicast lookups sharded over a pool of worker processes.
+#
+#The router process keeps the control plane (LSDB, SPF, FIB) and the sockets. ForwardingEngine copies
+#each packet, as it is, into a shared-memory ring of the worker its flow (packet.flow_hash of src/dst)
+#or its ingress interface maps to, so a flow always lands on the same worker and stays in order. All
+#parsing happens in the workers: each decrements TTL in place in its ring, looks the destination up in
+#its copy of the FIB and copies the packet into its egress ring for that interface, dropping it when
+#that ring is full. Every worker has one bounded egress ring per interface, so a congested interface
+#only tail-drops its own traffic. The router process drains the egress rings into its send(). No
+#packet is pickled on the way.
+#
+#The FIB reaches the workers as a whole: publish() queues the new {dst_addr: egress index} table for
+#every worker and marks the spot in its ring, and the worker swaps tables when it reaches the mark, so
+#packets submitted before publish() use the old table, the ones after the new one, and none a
+#half-updated one. Between SPF runs the table is only read.
+
+import multiprocessing
+import struct
+import time
+
+from packet import UNICAST_LAYOUT, ADDR, MAX_PACKET_SIZE, forward_unicast_in_place, flow_hash
+
+_, DST_OFFSET, _ = UNICAST_LAYOUT.fields['dst_addr']
+
+# slot header: packet length and a tag, what the slot holds (egress rings only hold packets)
+SLOT = struct.Struct('=HH')
+SLOT_SIZE = SLOT.size + MAX_PACKET_SIZE
+PACKET, FIB, STOP = 0, 1, 2
+
+
+class PacketRing:
+    """Single-producer single-consumer ring of packets in shared memory.
+
+    slots fixed-size slots, each a SLOT header and up to MAX_PACKET_SIZE bytes. written counts the
+    slots the producer has filled, read the ones the consumer is done with; each side owns one of
+    the two, publishes it to the other only once the slots it covers are complete and keeps a cached
+    copy of the other's, so neither needs a lock.
+
+    There are no memory barriers either: this relies on the other process seeing one process's
+    stores in the order they were made, which x86-64 (TSO) guarantees. A slot's bytes are stored
+    before the counter that publishes it, and read only after the counter was. On weaker memory
+    models (ARM, POWER) publish() and release() would need a barrier, e.g. taking a shared
+    multiprocessing.Lock around the counter write and read.
+    """
+
+    def __init__(self, ctx, slots):
+        self.slots = slots
+        self.shared = (ctx.RawArray('B', slots * SLOT_SIZE), ctx.RawArray('Q', 2))
+        self.attach()
+
+    def attach(self):
+        data, counters = self.shared
+        self.data = memoryview(data).cast('B')
+        self.counters = memoryview(counters).cast('B').cast('Q')
+        self.written = self.counters[0]
+        self.read = self.counters[1]
+
+    def __getstate__(self):
+        return {'slots': self.slots, 'shared': self.shared}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attach()
+
+    def put(self, packet, tag=PACKET):
+        #producer: copy packet into the next slot, False if the ring is full. Unseen until publish()
+        if self.written - self.read >= self.slots:
+            self.read = self.counters[1]
+            if self.written - self.read >= self.slots:
+                return False
+        offset = (self.written % self.slots) * SLOT_SIZE
+        length = len(packet)
+        SLOT.pack_into(self.data, offset, length, tag)
+        self.data[offset + SLOT.size:offset + SLOT.size + length] = packet
+        self.written += 1
+        return True
+
+    def publish(self):
+        self.counters[0] = self.written
+
+    def poll(self):
+        #consumer: how many published slots are waiting
+        self.written = self.counters[0]
+        return self.written - self.read
+
+    def get(self):
+        #consumer: (tag, packet) of the next waiting slot, the packet a view into the ring that stays
+        #valid until release()
+        offset = (self.read % self.slots) * SLOT_SIZE
+        length, tag = SLOT.unpack_from(self.data, offset)
+        self.read += 1
+        offset += SLOT.size
+        return tag, self.data[offset:offset + length]
+
+    def release(self):
+        self.counters[1] = self.read
+
+    def idle(self):
+        #producer: whether the consumer is through everything published
+        return self.counters[1] == self.counters[0]
+
+
+def _forward_worker(ring, egress, wake, tables, batch, results):
+    table = {}
+    generation = 0
+    stats = {'forwarded': 0, 'no_route': 0, 'expired': 0, 'egress_drops': 0, 'batches': 0, 'busy': 0.0}
+    unpack_dst = ADDR.unpack_from
+    stop = False
+    while not stop:
+        if not ring.poll():
+            wake.acquire(timeout=0.1)
+            continue
+        start = time.perf_counter()
+        end = min(ring.written, ring.read + batch)
+        while ring.read < end:
+            tag, buf = ring.get()
+            if tag == FIB:
+                # the table was queued before its mark was written
+                generation, table = tables.get()
+                continue
+            if tag == STOP:
+                stop = True
+                break
+            if not forward_unicast_in_place(buf):
+                stats['expired'] += 1
+                continue
+            index = table.get(unpack_dst(buf, DST_OFFSET)[0])
+            if index is None:
+                stats['no_route'] += 1
+                continue
+            if type(index) is tuple:
+                # equal-cost paths, the flow picks one
+                index = index[flow_hash(buf) % len(index)]
+            if egress[index].put(buf):
+                stats['forwarded'] += 1
+            else:
+                # tail drop, the interface is not keeping up
+                stats['egress_drops'] += 1
+        # egress first: once the router sees these input slots released, their packets are visible
+        for out in egress:
+            out.publish()
+        ring.release()
+        stats['batches'] += 1
+        stats['busy'] += time.perf_counter() - start
+    stats['generation'] = generation
+    results.put(stats)
+
+
+class ForwardingEngine:
+    """Pool of forwarding workers between a router's receive path and its egress interfaces.
+
+    interfaces are the router's egress interfaces, in any form its send() accepts. shard is 'flow'
+    (packet.flow_hash of src/dst) or 'ingress' (the interface index passed to submit). Each worker's
+    input ring holds queue_limit packets, and every interface's egress queue holds at most queue_limit
+    packets, split evenly over the workers' egress rings for it. A worker is handed its input and
+    releases ring slots in batches of up to batch packets.
+    """
+
+    def __init__(self, interfaces, workers=None, shard='flow', batch=64, queue_limit=1024):
+        self.interfaces = list(interfaces)
+        self.index = {intf: i for i, intf in enumerate(self.interfaces)}
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shard = shard
+        self.batch = batch
+        self.generation = 0
+        self.submitted = 0
+        ctx = multiprocessing.get_context()
+        self.rings = [PacketRing(ctx, queue_limit) for _ in range(self.workers)]
+        # egress[worker][interface index]
+        per_worker = max(1, queue_limit // self.workers)
+        self.egress = [[PacketRing(ctx, per_worker) for _ in self.interfaces] for _ in range(self.workers)]
+        self.wake = [ctx.Semaphore(0) for _ in range(self.workers)]
+        self.tables = [ctx.Queue() for _ in range(self.workers)]
+        self.results = ctx.Queue()
+        self.processes = [ctx.Process(target=_forward_worker, args=args + (batch, self.results), daemon=True)
+                          for args in zip(self.rings, self.egress, self.wake, self.tables)]
+        self.stats = None
+
+    def start(self):
+        for process in self.processes:
+            process.start()
+        return self
+
+    def publish(self, routes):
+        """Swap in a new FIB on every worker: routes are (dst_addr, interface) pairs, see fib.build_routes."""
+        index = self.index
+        table = {}
+        for dst, intf in routes:
+            if type(intf) is tuple:
+                table[dst] = tuple(index[i] for i in intf)
+            elif intf in index:
+                table[dst] = index[intf]
+        self.generation += 1
+        for worker, tables in enumerate(self.tables):
+            tables.put((self.generation, table))
+            self.mark(worker, FIB)
+        return self.generation
+
+    def mark(self, worker, tag):
+        #control slot in worker's ring, waits for room: the workers never block, so it frees up
+        ring = self.rings[worker]
+        while not ring.put(b'', tag):
+            self.wakeup(worker)
+            time.sleep(0.0001)
+        self.wakeup(worker)
+
+    def wakeup(self, worker):
+        self.rings[worker].publish()
+        self.wake[worker].release()
+
+    def submit(self, packet, ingress=0):
+        """Queue packet for its worker, False if that worker's ring is full (see forward)."""
+        if self.shard == 'flow':
+            worker = flow_hash(packet) % self.workers
+        else:
+            worker = ingress % self.workers
+        ring = self.rings[worker]
+        if not ring.put(packet):
+            # a full ring may hold slots we have not published yet
+            self.wakeup(worker)
+            return False
+        self.submitted += 1
+        if ring.written % self.batch == 0:
+            self.wakeup(worker)
+        return True
+
+    def flush(self):
+        #hand over partly filled batches
+        for worker, ring in enumerate(self.rings):
+            if ring.written != ring.counters[0]:
+                self.wakeup(worker)
+
+    def drain(self, send, wait=False):
+        """Pass every egress packet to send(interface, packet), returns how many were sent.
+
+        packet is a view into an egress ring, valid until send returns. With wait, keeps draining
+        until the workers are through everything flushed so far.
+        """
+        sent = 0
+        interfaces = self.interfaces
+        while True:
+            done = not wait or all(ring.idle() for ring in self.rings)
+            drained = 0
+            for rings in self.egress:
+                for intf, egress in zip(interfaces, rings):
+                    waiting = egress.poll()
+                    for _ in range(waiting):
+                        tag, packet = egress.get()
+                        send(intf, packet)
+                    if waiting:
+                        egress.release()
+                        drained += waiting
+            sent += drained
+            if done:
+                return sent
+            if not drained:
+                time.sleep(0.0001)
+
+    def forward(self, packets, send):
+        """Forward packets through the workers and wait for them, returns how many were sent."""
+        sent = 0
+        for packet in packets:
+            while not self.submit(packet):
+                sent += self.drain(send)
+                time.sleep(0.0001)
+            if self.submitted % self.batch == 0:
+                sent += self.drain(send)
+        self.flush()
+        return sent + self.drain(send, wait=True)
+
+    def stop(self, send=None):
+        """Stop the workers and return their stats summed up, per-worker in stats['workers'].
+
+        Egress packets still waiting go to send, or are discarded without one.
+        """
+        send = send or (lambda intf, packet: None)
+        self.flush()
+        for worker in range(self.workers):
+            self.mark(worker, STOP)
+        workers = [self.results.get() for _ in self.processes]
+        for process in self.processes:
+            process.join()
+        self.drain(send)
+        totals = {key: sum(w[key] for w in workers) for key in ('forwarded', 'no_route', 'expired', 'egress_drops', 'batches', 'busy')}
+        totals['workers'] = workers
+        self.stats = totals
+        return totals
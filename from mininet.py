@@ -5,6 +5,7 @@ from mininet.node import RemoteController, Controller, OVSKernelSwitch, Node, Ho
 from mininet.link import TCLink, Link
 from mininet.cli import CLI
 from mininet.util import dumpNodeConnections
+from topo import destinations
 from packet import read_data, read_header, create_LSA_packet, create_multicast_packet, create_unicast_packet
 import heapq
 import sys
@@ -29,7 +30,7 @@ class UDPRouter(Node):
                 neighbor = link[0][1]
                 cost = int(intf.bw)
                 links[neighbor.name] = cost
-            for dest in ['d1', 'd2', 'd3']:
+            for dest in destinations(net):
                 if dest != self.name:
                     link = self.connectionsTo(net.get(dest))[0]
                     cost = int(link[0].bw)
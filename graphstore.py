@@ -0,0 +1,301 @@
+#Compact link-state graph: interned integer router ids and CSR adjacency in flat arrays.
+#
+#The dict layout ({router: {"Neighbors": {neighbor: cost}}}) spends a dict entry, a key object and
+#an int object on every edge, and SPF chases pointers through all of them. GraphStore interns every
+#router id to a dense integer once and keeps each router's links as a slice of two flat arrays
+#(neighbor ids and costs), so an edge costs 8 bytes and SPF walks contiguous memory.
+#
+#Rows are stored CSR style, start[i] and degree[i] locate router i's slice. Each row also has a
+#capacity, so an LSA that keeps or shrinks a router's link count rewrites its slice in place; a row
+#that grows is moved to the end of the arrays and the arrays are compacted once the dead slots make
+#up half of them.
+#
+#Every router's LSDB keeps its map in one (lsdb.LinkStateDatabase.graph), LSAs are written into it
+#row by row and spf.IncrementalSPF runs directly on its arrays.
+
+import heapq
+import sys
+from array import array
+
+from packet import lsa_links
+
+
+def links_of(adjacency):
+    #a node's outgoing links, given either as a {neighbor: cost} dict (the get_links format) or as
+    #a list of (neighbor, cost) pairs (the compute_shortest_paths format)
+    if isinstance(adjacency, dict):
+        return adjacency.items()
+    return adjacency
+
+
+# costs are stored like an LSA carries them, unsigned 32-bit
+MAX_COST = 0xFFFFFFFF
+
+
+class CSRRows:
+    """One adjacency in CSR arrays: row i is neighbors/costs[start[i]:start[i] + degree[i]]."""
+
+    def __init__(self):
+        self.start = array('i')
+        self.degree = array('i')
+        self.capacity = array('i')
+        self.neighbors = array('i')
+        self.costs = array('I')
+        self.dead = 0
+
+    def add(self):
+        self.start.append(len(self.neighbors))
+        self.degree.append(0)
+        self.capacity.append(0)
+
+    def get(self, i):
+        #row i as (neighbor id, cost) pairs
+        offset = self.start[i]
+        end = offset + self.degree[i]
+        return zip(self.neighbors[offset:end], self.costs[offset:end])
+
+    def set(self, i, row):
+        #replace row i with a list of (neighbor id, cost) pairs
+        if len(row) > self.capacity[i]:
+            # no room in the old slot, move the row to the end
+            self.dead += self.capacity[i]
+            self.start[i] = len(self.neighbors)
+            self.capacity[i] = len(row)
+            self.neighbors.extend([0] * len(row))
+            self.costs.extend([0] * len(row))
+        offset = self.start[i]
+        for j, (neighbor, cost) in enumerate(row, offset):
+            self.neighbors[j] = neighbor
+            self.costs[j] = cost
+        self.degree[i] = len(row)
+        if self.dead * 2 > len(self.neighbors):
+            self.compact()
+
+    def compact(self):
+        #rewrite the arrays without dead slots or spare capacity
+        neighbors = array('i')
+        costs = array('I')
+        for i in range(len(self.start)):
+            offset, count = self.start[i], self.degree[i]
+            self.start[i] = len(neighbors)
+            self.capacity[i] = count
+            neighbors.extend(self.neighbors[offset:offset + count])
+            costs.extend(self.costs[offset:offset + count])
+        self.neighbors = neighbors
+        self.costs = costs
+        self.dead = 0
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.start, self.degree, self.capacity, self.neighbors, self.costs))
+
+
+class GraphStore:
+    """Directed weighted graph over interned node ids, with per-row in-place updates.
+
+    Node ids can be any hashable (names, packed address keys), id_of() interns them to the dense
+    integers the arrays and the SPF results use and name_of() maps them back. With incoming, the
+    reverse rows (who links to a node, at what cost) are kept in step with every set_row, which is
+    what incremental SPF repairs need.
+    """
+
+    def __init__(self, incoming=False):
+        self.ids = {}
+        self.names = []
+        self.out = CSRRows()
+        self.inc = None
+        if incoming:
+            self.build_incoming()
+
+    @classmethod
+    def from_graph(cls, graph, incoming=False):
+        #GraphStore of a {node: links} graph, links as in links_of
+        store = cls()
+        for node, links in graph.items():
+            store.set_row(node, links)
+        if incoming:
+            store.build_incoming()
+        return store
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, node):
+        return node in self.ids
+
+    def id_of(self, node):
+        #dense integer id of node, interning it with an empty row the first time it is seen
+        i = self.ids.get(node)
+        if i is None:
+            i = self.ids[node] = len(self.names)
+            self.names.append(node)
+            self.out.add()
+            if self.inc is not None:
+                self.inc.add()
+        return i
+
+    def name_of(self, i):
+        return self.names[i]
+
+    def build_incoming(self):
+        #reverse rows out of the forward ones in one pass, from then on kept up to date by set_row
+        rows = [[] for _ in self.names]
+        for i in range(len(self.names)):
+            for neighbor, cost in self.out.get(i):
+                rows[neighbor].append((i, cost))
+        self.inc = CSRRows()
+        for i, row in enumerate(rows):
+            self.inc.add()
+            self.inc.set(i, row)
+
+    def set_row(self, node, links):
+        """Replace node's outgoing links ({neighbor: cost} or (neighbor, cost) pairs).
+
+        Costs must be integers from 0 to MAX_COST, anything else raises ValueError before the store
+        is changed at all; the forward row and the reverse rows it touches are written together.
+        """
+        links = list(links_of(links))
+        for neighbor, cost in links:
+            if not (isinstance(cost, int) and 0 <= cost <= MAX_COST):
+                raise ValueError(f"link cost {cost!r} from {node!r} to {neighbor!r} is not a 32-bit unsigned integer")
+        i = self.id_of(node)
+        row = [(self.id_of(neighbor), cost) for neighbor, cost in links]
+        reverse = []
+        if self.inc is not None:
+            old = dict(self.out.get(i))
+            new = dict(row)
+            for neighbor in old.keys() | new.keys():
+                cost = new.get(neighbor)
+                if old.get(neighbor) != cost:
+                    incoming = dict(self.inc.get(neighbor))
+                    if cost is None:
+                        del incoming[i]
+                    else:
+                        incoming[i] = cost
+                    reverse.append((neighbor, list(incoming.items())))
+        self.out.set(i, row)
+        for neighbor, incoming in reverse:
+            self.inc.set(neighbor, incoming)
+
+    def set_row_from_lsa(self, node, body):
+        #node's links straight out of a binary LSA body, see packet.lsa_links
+        self.set_row(node, lsa_links(body))
+
+    def links(self, node):
+        #node's outgoing links as (neighbor, cost) pairs by name, none for unknown nodes
+        i = self.ids.get(node)
+        if i is None:
+            return []
+        names = self.names
+        return [(names[neighbor], cost) for neighbor, cost in self.out.get(i)]
+
+    def incoming_links(self, node):
+        #(router, cost) pairs of the links into node, needs incoming
+        i = self.ids.get(node)
+        if i is None:
+            return []
+        names = self.names
+        return [(names[router], cost) for router, cost in self.inc.get(i)]
+
+    def degree_of(self, node):
+        i = self.ids.get(node)
+        return 0 if i is None else self.out.degree[i]
+
+    def row(self, node):
+        #{neighbor: cost} of node, by name
+        names = self.names
+        return {names[neighbor]: cost for neighbor, cost in self.out.get(self.ids[node])}
+
+    def compact(self):
+        self.out.compact()
+        if self.inc is not None:
+            self.inc.compact()
+
+    def shortest_path_tree(self, source, targets=None):
+        """Dijkstra from source over the arrays: (costs, first hop ids, parent ids) indexed by node id.
+
+        All three are -1 for nodes not reached, the source is its own first hop and parent. With
+        targets (a set of node ids) the search stops as soon as all of them are settled, so the
+        arrays are only complete for nodes at most that far.
+        """
+        n = len(self.names)
+        source = self.ids[source]
+        # sums of 32-bit costs, 64-bit on every platform
+        dist = array('q', [-1]) * n
+        hop = array('i', [-1]) * n
+        best = [sys.maxsize] * n
+        parent = array('i', [-1]) * n
+        best[source] = 0
+        hop[source] = parent[source] = source
+        remaining = len(targets) if targets is not None else -1
+        start, degree, neighbors, costs = self.out.start, self.out.degree, self.out.neighbors, self.out.costs
+        heap = [(0, source)]
+        pop, push = heapq.heappop, heapq.heappush
+        while heap:
+            d, node = pop(heap)
+            if dist[node] >= 0:
+                continue
+            dist[node] = d
+            if node != source:
+                hop[node] = node if parent[node] == source else hop[parent[node]]
+            if remaining > 0 and node in targets:
+                remaining -= 1
+                if not remaining:
+                    break
+            offset = start[node]
+            for j in range(offset, offset + degree[node]):
+                neighbor = neighbors[j]
+                new_dist = d + costs[j]
+                if new_dist < best[neighbor]:
+                    best[neighbor] = new_dist
+                    parent[neighbor] = node
+                    push(heap, (new_dist, neighbor))
+        for i in range(n):
+            if dist[i] < 0:
+                parent[i] = -1
+        return dist, hop, parent
+
+    def shortest_paths(self, source, targets=None):
+        """(costs, first hop ids) arrays indexed by node id, -1 for nodes not reached; see shortest_path_tree."""
+        dist, hop, parent = self.shortest_path_tree(source, targets)
+        return dist, hop
+
+    def routing_table(self, source):
+        #{dest: (cost, first_hop)} by name, the shortest_paths format of spf.py
+        dist, hop = self.shortest_paths(source)
+        names = self.names
+        return {names[i]: (cost, names[hop[i]]) for i, cost in enumerate(dist) if cost >= 0}
+
+    def nearest(self, source, destinations, k):
+        """The k destinations closest to source, closest first, ties kept in the given order.
+
+        SPF stops once every destination is settled, unreachable destinations are left out.
+        """
+        ids = [self.ids.get(dest) for dest in destinations]
+        targets = {i for i in ids if i is not None}
+        dist, hop = self.shortest_paths(source, targets)
+        ranked = sorted((dist[i], order) for order, i in enumerate(ids) if i is not None and dist[i] >= 0)
+        return [destinations[order] for cost, order in ranked[:k]]
+
+    def nbytes(self):
+        """Memory footprint in bytes: {'arrays': ..., 'interning': ..., 'total': ...}.
+
+        arrays covers the CSR arrays (incoming ones included), interning the id dict and name list
+        (not the names themselves, which the dict layout holds as well).
+        """
+        arrays = self.out.nbytes() + (self.inc.nbytes() if self.inc is not None else 0)
+        interning = sys.getsizeof(self.ids) + sys.getsizeof(self.names)
+        return {'arrays': arrays, 'interning': interning, 'total': arrays + interning}
+
+
+def dict_graph_nbytes(graph):
+    #footprint of a {node: {neighbor: cost}} graph's containers and cost ints, for comparison with
+    #GraphStore.nbytes(); node names are shared with the store and left out, like there
+    seen = set()
+    total = sys.getsizeof(graph)
+    for links in graph.values():
+        total += sys.getsizeof(links)
+        for cost in links.values():
+            if id(cost) not in seen:
+                seen.add(id(cost))
+                total += sys.getsizeof(cost)
+    return total
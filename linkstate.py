@@ -0,0 +1,531 @@
+#Link-state routing logic shared by every kind of router.
+#
+#LinkStateRouter holds the protocol state (LSDB, SPF tree, FIB) and the packet handling, and knows
+#nothing about where packets come from. A concrete router only has to provide intfList(), returning
+#interfaces with Mininet's .link / .node / .params attributes, and send(intf, packet), plus
+#call_later(delay, callback, *args) and clock() for anything timed. UDPRouter in
+#CustomRouter.py plugs it into a Mininet Node, datapath.DatagramRouter onto UDP sockets in the
+#router's own process, sim.SimRouter into the in-process simulator.
+
+import logging
+import time
+
+from packet import PacketView, pack_addr, unpack_addr, encode_lsa_links, lsa_links, writable_packet, forward_unicast_in_place, reflood_LSA_in_place, MAX_PACKET_SIZE
+from packet import create_LSA_packet, create_unicast_packet, create_group_multicast_packet
+from packet import create_LSU_packets, iter_bundled_LSAs, LSU_MTU, LSU_LAYOUT, create_hello_packet
+from fib import ForwardingTable, build_routes, build_multipath_routes
+from spf import IncrementalSPF
+from lsdb import LinkStateDatabase, SEQ_MOD
+from directory import AddressDirectory
+from multicast import DestinationRanker
+from throttle import TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class LinkStateRouter:
+    """Protocol state and packet handling of one router, independent of how packets are carried."""
+
+    # what router_interfaces and node_id look for on the node at the far end of a link: routers,
+    # here or stand-ins for one in another process (datapath.RemoteRouter), set it, hosts don't
+    is_router = True
+
+    def __init__(self, name, ip):
+        self.LSSEQ = 0
+        self.id = name
+        self.name = name
+        self.ip = ip
+        # routers and destinations are identified by their packed 32-bit address (pack_addr), the
+        # same value LSAs carry in advRoute and packets carry in src/dst
+        self.addr = pack_addr(ip)
+        self.lsdb = LinkStateDatabase()
+        self.map_table = self.lsdb.table
+        '''
+        {r1 : {"LSSEQ": 1, ...}}, the links in self.lsdb.graph:
+        r1 -> {r2: 10, r3: 10}
+        '''
+        # shortest-path tree kept between LSAs, run on the LSDB's GraphStore, routing_table is its
+        # live {dest: (cost, first_hop)} table
+        self.spf = IncrementalSPF(self.addr, store=self.lsdb.graph)
+        self.routing_table = self.spf.routes
+        '''
+        {r1: (3, r2)}
+        '''
+        # bumped whenever routing_table changes, cached multicast rankings are only valid within one
+        self.route_generation = 0
+        self.ranker = DestinationRanker(self.routing_table)
+        # address key <-> node name, filled in from the topology by whoever builds the router
+        self.directory = AddressDirectory()
+        self.fib = ForwardingTable()
+        # the FIB is rebuilt on the first lookup after the routes change, so a burst of LSAs (cold
+        # start, a topology change) costs one rebuild instead of one per LSA
+        self.fib_stale = False
+        # equal-cost multipath: keep every equal-cost first hop in the FIB and spread flows over them,
+        # with ecmp_weighted in proportion to the links' bw
+        self.ecmp = False
+        self.ecmp_weighted = False
+        # 'unicast': a multicast becomes one unicast copy per chosen destination at the first router.
+        # 'tree': one copy per branch of our SPF tree, replicated again where the branches split
+        self.multicast_mode = 'unicast'
+        # seconds LSAs wait per interface to be bundled with others into LSU packets, 0 sends each
+        # LSA right away; needs call_later
+        self.flood_window = 0
+        self.flood_queues = {}
+        self.flood_bytes = {}
+        # optional SPFThrottle: LSAs then only note their router in spf_pending, with the links SPF
+        # last saw for it, and one SPF run, scheduled with backoff, repairs the tree for all of them;
+        # None runs SPF on every LSA
+        self.spf_throttle = None
+        self.spf_pending = {}
+        # flood pacing, per interface at most flood_rate LSA/LSU packets a second in bursts of up to
+        # flood_burst, 0 for unpaced; what waits is replaced by newer LSAs of the same router
+        self.flood_rate = 0
+        self.flood_burst = 8
+        self.flood_buckets = {}
+        self.paced = {}
+        self.flood_stats = {'paced': 0, 'superseded': 0}
+        # protocol timers (hellos, dead intervals, LSA refresh and max-age) run on the
+        # timerwheel.TimerWheel given to start_timers, which many routers can share; an interval of 0
+        # turns that timer off
+        self.timers = None
+        self.hello_interval = 1.0
+        self.dead_interval = 4.0
+        self.refresh_interval = 30.0
+        self.max_age = 120.0
+        self.lsa_ttl = 10
+        self.hello_seq = 0
+        # neighbor id -> clock() of the last hello or hello ACK heard from it
+        self.neighbor_heard = {}
+        # neighbor router id -> adjacency state, see set_adjacency; neighbors without one (no hellos
+        # running) are taken to be up as configured
+        self.adjacencies = {}
+        self.hello_timer = self.refresh_timer = None
+        self.dead_timers = {}
+        self.lsa_timers = {}
+        # optional forwarding.ForwardingEngine that process_packet_queue hands packets to
+        self.engine = None
+        self.packet_queue = []
+        # scratch buffer that received packets are patched in for forwarding, reused for every
+        # packet, so send() must have copied or transmitted a packet before the next one arrives
+        self.forward_buffer = bytearray(MAX_PACKET_SIZE)
+
+    def get_immediate_neighbors(self):
+        #neighbor name -> neighbor node
+        neighbors = {}
+        for intf in self.intfList():
+            link = intf.link
+            if link:
+                other = link.intf2 if link.intf1 is intf else link.intf1
+                if self.adjacent(node_id(other.node)):
+                    neighbors[other.node.name] = other.node
+        return neighbors
+
+    def own_links(self):
+        #{neighbor id: cost} advertised in this router's LSA, the cost of a link is its bw like in get_links
+        return {neighbor_id: int(intf.params.get('bw', 1)) for neighbor_id, intf in self.neighbor_interfaces().items()
+                if self.adjacent(neighbor_id)}
+
+    def adjacent(self, neighbor):
+        #whether the link to neighbor is advertised: configured and not found dead by the hellos
+        return self.adjacencies.get(neighbor, 'up') in ('attempt', 'up')
+
+    def link_state_graph(self):
+        #the LSDB as a {router: {neighbor: cost}} dict graph
+        return {router: self.lsdb.links(router) for router in self.map_table}
+
+    def compute_routing_table(self, table=None):
+        #full SPF run over the LSDB
+        self.spf.reset()
+        self.route_generation += 1
+        self.rebuild_fib()
+
+    def update_routes(self, changes):
+        #the LSDB links of the routers in changes ({router: old links}) changed, only repair the part
+        #of the tree they affect
+        if self.spf.links_changed(changes):
+            self.route_generation += 1
+            self.fib_stale = True
+        elif self.ecmp:
+            # an equal-cost alternative can appear or vanish without any route changing
+            self.fib_stale = True
+
+    def lsdb_changed(self, router, old):
+        #router's links in the LSDB changed from old, run SPF for it now or leave it to the throttle
+        if self.spf_throttle is None:
+            self.update_routes({router: old})
+            return
+        # SPF last saw the links from before the first of the pending changes
+        self.spf_pending.setdefault(router, old)
+        delay = self.spf_throttle.request(self.clock())
+        if delay is not None:
+            self.call_later(delay, self.run_spf)
+
+    def run_spf(self):
+        #throttled SPF run: repair the tree for every router whose LSA changed since the last run
+        pending, self.spf_pending = self.spf_pending, {}
+        self.update_routes(pending)
+        self.spf_throttle.ran(self.clock())
+
+    def neighbor_interfaces(self):
+        #neighbor id -> our interface on the link to it
+        interfaces = {}
+        for intf in self.intfList():
+            link = intf.link
+            if link:
+                other = link.intf2 if link.intf1 is intf else link.intf1
+                interfaces[node_id(other.node)] = intf
+        return interfaces
+
+    def rebuild_fib(self):
+        # resolve every destination to its output interface once, here, instead of once per packet
+        if self.ecmp:
+            self.fib.rebuild(build_multipath_routes(self.spf.multipath(), self.neighbor_interfaces(), self.ecmp_weighted))
+        else:
+            self.fib.rebuild(build_routes(self.routing_table, self.neighbor_interfaces()))
+        self.fib_stale = False
+        if self.engine is not None:
+            self.engine.publish(self.fib.snapshot[1].items())
+    
+    '''''''''
+    {
+        routers : (cost, first_hop)
+    }
+    '''
+
+    
+    def send_lsa(self, seq_num, ttl=10):
+        links = self.own_links()
+        # our own LSA goes into the LSDB like any other, that is what puts us in the SPF graph
+        old = self.lsdb.install(self.addr, self.LSSEQ, links)
+        self.lsdb_changed(self.addr, old)
+
+        lsa_packet = create_LSA_packet(seq_num, ttl, self.ip, 0, self.addr, self.LSSEQ, 5, encode_lsa_links(links))
+        # LSSeq is 32 bits on the wire, lsdb.seq_newer takes care of the wrap
+        self.LSSEQ = (self.LSSEQ + 1) % SEQ_MOD
+        
+        self.lsa_flood(lsa_packet)
+
+    def router_interfaces(self):
+        #interfaces facing other routers, hosts never take part in flooding
+        interfaces = []
+        for intf in self.intfList():
+            link = intf.link
+            if link:
+                other = link.intf2 if link.intf1 is intf else link.intf1
+                if is_router(other.node):
+                    interfaces.append(intf)
+        return interfaces
+
+    def lsa_flood(self, packet, ingress=None):
+        #send to every neighboring router except back out the interface the LSA arrived on
+        sent = 0
+        advRoute = PacketView(packet).advRoute_addr
+        for intf in self.router_interfaces():
+            if intf is not ingress:
+                if self.flood_window:
+                    self.queue_flood(intf, advRoute, packet)
+                else:
+                    self.send_flood(intf, packet, advRoute)
+                sent += 1
+        self.lsdb.note_flooded(advRoute, sent)
+
+    def queue_flood(self, intf, advRoute, packet):
+        """Flood packet out of intf, bundling it with other LSAs if intf sent one within flood_window.
+
+        The first LSA after a quiet period goes out right away and opens a window; LSAs arriving
+        inside it wait (a newer LSA of the same router replacing an older one) and go out bundled
+        when it closes, or as soon as they fill a bundle.
+        """
+        pending = self.flood_queues.get(intf)
+        if pending is None:
+            self.flood_queues[intf] = {}
+            self.call_later(self.flood_window, self.flush_floods, intf)
+            self.send_flood(intf, packet, advRoute)
+            return
+        # copy, packet may be the forward buffer
+        packet = bytes(packet)
+        old = pending.get(advRoute)
+        pending[advRoute] = packet
+        size = self.flood_bytes[intf] = self.flood_bytes.get(intf, 0) + len(packet) - (len(old) if old else 0)
+        if size >= LSU_MTU - LSU_LAYOUT.size:
+            self.send_bundles(intf, pending)
+
+    def flush_floods(self, intf):
+        #intf's flood window closed: send what is pending and keep the window open, or close it
+        pending = self.flood_queues.get(intf)
+        if pending:
+            self.send_bundles(intf, pending)
+            self.call_later(self.flood_window, self.flush_floods, intf)
+        else:
+            self.flood_queues.pop(intf, None)
+
+    def send_bundles(self, intf, pending):
+        for packet in create_LSU_packets(0, 1, self.ip, list(pending.values())):
+            self.send_flood(intf, packet)
+        pending.clear()
+        self.flood_bytes[intf] = 0
+
+    def send_flood(self, intf, packet, advRoute=None):
+        """Send an LSA or LSU out of intf, or queue it if intf has used up its flood_rate.
+
+        A queued LSA (advRoute given) is replaced by a newer one of the same router, so under churn
+        a paced interface carries each router's latest LSA rather than every one of them.
+        """
+        if not self.flood_rate:
+            self.send(intf, packet)
+            return
+        bucket = self.flood_buckets.get(intf)
+        if bucket is None:
+            bucket = self.flood_buckets[intf] = TokenBucket(self.flood_rate, self.flood_burst)
+        queue = self.paced.setdefault(intf, {})
+        now = self.clock()
+        if not queue:
+            if bucket.take(now):
+                self.send(intf, packet)
+                return
+            self.call_later(bucket.wait(now), self.drain_paced, intf)
+        key = advRoute if advRoute is not None else object()
+        if key in queue:
+            self.flood_stats['superseded'] += 1
+        # copy, packet may be the forward buffer
+        queue[key] = bytes(packet)
+        self.flood_stats['paced'] += 1
+
+    def drain_paced(self, intf):
+        queue = self.paced[intf]
+        bucket = self.flood_buckets[intf]
+        now = self.clock()
+        while queue and bucket.take(now):
+            self.send(intf, queue.pop(next(iter(queue))))
+        if queue:
+            self.call_later(bucket.wait(now), self.drain_paced, intf)
+
+    def call_later(self, delay, callback, *args):
+        #timer hook of the concrete router class: run callback(*args) after delay seconds
+        raise NotImplementedError(f"{type(self).__name__} has no timers, flood_window needs them")
+
+    def clock(self):
+        #current time in seconds, on the clock call_later counts in
+        return time.monotonic()
+
+    def start_timers(self, timers, offset=0.0):
+        #start sending hellos and refreshing our LSA on timers, the first hello offset seconds from now
+        self.timers = timers
+        if self.hello_interval:
+            self.hello_timer = timers.schedule(offset, self.send_hellos)
+            if self.dead_interval:
+                # configured neighbors stay advertised unless they miss their first dead interval
+                for intf in self.router_interfaces():
+                    link = intf.link
+                    neighbor = node_id((link.intf2 if link.intf1 is intf else link.intf1).node)
+                    self.adjacencies[neighbor] = 'attempt'
+                    self.dead_timers[neighbor] = timers.schedule(offset + self.dead_interval, self.neighbor_dead, neighbor)
+        if self.refresh_interval:
+            self.refresh_timer = timers.schedule(offset + self.refresh_interval, self.refresh_lsa)
+
+    def stop_timers(self):
+        #cancel all our timers, the router goes quiet (as if crashed) until start_timers again
+        if self.timers is None:
+            return
+        for timer in [self.hello_timer, self.refresh_timer] + list(self.dead_timers.values()) + list(self.lsa_timers.values()):
+            self.timers.cancel(timer)
+        self.dead_timers.clear()
+        self.lsa_timers.clear()
+        self.adjacencies.clear()
+        self.timers = None
+
+    def send_hellos(self):
+        self.hello_seq += 1
+        packet = create_hello_packet(self.hello_seq, self.ip)
+        for intf in self.router_interfaces():
+            self.send(intf, packet)
+        self.hello_timer = self.timers.schedule(self.hello_interval, self.send_hellos)
+
+    def refresh_lsa(self):
+        #re-originate our LSA before the others age it out
+        self.send_lsa(0, self.lsa_ttl)
+        self.refresh_timer = self.timers.schedule(self.refresh_interval, self.refresh_lsa)
+
+    def hello_heard(self, neighbor, ack=False):
+        #neighbor is alive, push its dead timer back; an ACK to our hello means it hears us too
+        self.neighbor_heard[neighbor] = self.clock()
+        if self.timers is None or not self.dead_interval:
+            return
+        self.timers.cancel(self.dead_timers.get(neighbor))
+        self.dead_timers[neighbor] = self.timers.schedule(self.dead_interval, self.neighbor_dead, neighbor)
+        if ack:
+            self.set_adjacency(neighbor, 'up')
+        elif self.adjacencies.get(neighbor, 'down') == 'down':
+            self.set_adjacency(neighbor, 'init')
+
+    def neighbor_dead(self, neighbor):
+        self.dead_timers.pop(neighbor, None)
+        self.neighbor_heard.pop(neighbor, None)
+        log.info(f"{self.name}: no hello from {unpack_addr(neighbor)} for {self.dead_interval} s")
+        self.set_adjacency(neighbor, 'down')
+
+    def set_adjacency(self, neighbor, state):
+        """Move the adjacency with neighbor to state, re-originating our LSA if that changes it.
+
+        'attempt': configured, hellos started but none answered yet (advertised)
+        'init': heard its hello after it was down, not yet an ACK to ours (not advertised)
+        'up': heard an ACK to our hello, the link works both ways (advertised)
+        'down': missed a dead interval (not advertised)
+        """
+        was = self.adjacent(neighbor)
+        self.adjacencies[neighbor] = state
+        if self.adjacent(neighbor) == was:
+            return
+        log.info(f"{self.name}: adjacency with {unpack_addr(neighbor)} {state}")
+        if self.addr not in self.lsdb or self.lsdb.links(self.addr) != self.own_links():
+            # tell everyone now rather than at the next refresh, SPF follows from our own LSA
+            self.send_lsa(0, self.lsa_ttl)
+
+    def arm_max_age(self, router):
+        #(re)start the max-age timer of router's LSA, it is purged unless a newer one arrives in time
+        if self.timers is not None and self.max_age:
+            self.timers.cancel(self.lsa_timers.get(router))
+            self.lsa_timers[router] = self.timers.schedule(self.max_age, self.purge_lsa, router)
+
+    def purge_lsa(self, router):
+        #router's LSA reached max-age: drop it and the routes through its links
+        self.lsa_timers.pop(router, None)
+        old = self.lsdb.links(router)
+        if self.lsdb.remove(router) is not None:
+            log.info(f"{self.name}: LSA of {unpack_addr(router)} reached max-age")
+            self.lsdb_changed(router, old)
+
+    def send_packet(self, packet):
+        if self.fib_stale:
+            self.rebuild_fib()
+        view = PacketView(packet)
+        out_intf = self.fib.lookup(view.dst_addr, view.buf)
+        if out_intf is not None:
+            self.send(out_intf, packet)
+        else:
+            log.info(f"{self.name}: Destination {view.dst} not found in forwarding table")
+
+    def send_multicast(self, group, kval, data, src):
+        #deliver data to the kval members of group closest to us, src is the original sender's IP
+        dests = self.ranker.nearest(group, kval, self.route_generation)
+        if self.multicast_mode != 'tree':
+            # SEQ = 1 & TTL = 10 for every copy
+            for dest in dests:
+                self.send_packet(create_unicast_packet(1, 10, src, unpack_addr(dest), data))
+            return
+        branches = {}
+        for dest in dests:
+            if dest == self.addr:
+                print(f"{self.name} Packet recieved")
+            else:
+                branches.setdefault(self.routing_table[dest][1], []).append(dest)
+        for next_hop, members in branches.items():
+            if len(members) == 1:
+                self.send_packet(create_unicast_packet(1, 10, src, unpack_addr(members[0]), data))
+            else:
+                # the destinations behind this branch ride to its first router as a group multicast,
+                # which replicates it again wherever its own branches split
+                group_packet = create_group_multicast_packet(1, 10, len(members), members, data)
+                self.send_packet(create_unicast_packet(1, 10, src, unpack_addr(next_hop), group_packet))
+
+    def resolve_ip_to_id(self, ip):
+        return self.directory.name_of(pack_addr(ip))
+
+    def receive_packet(self, packet, ingress=None):
+        #ingress is the interface the packet arrived on, LSAs are never flooded back out of it
+        try:
+            view = PacketView(writable_packet(packet, self.forward_buffer))
+        except ValueError:
+            print("Error reading packet header")
+            return
+        # Process the packet based on its type
+        pkt_type = view.type
+        if pkt_type == 1:  # Hello, answered on the link it came from
+            if ingress is not None:
+                self.send(ingress, create_hello_packet(view.seq, self.ip, ack=True))
+            self.hello_heard(view.src_addr)
+        elif pkt_type == 2:  # Hello ACK
+            self.hello_heard(view.src_addr, ack=True)
+        elif pkt_type == 3:  # Multicast packet
+            # sent to us directly rather than inside a unicast, so we are the sender as far as copies go
+            self.send_multicast(view.destinations, view.kval, view.payload, self.ip)
+        elif pkt_type == 4:  # Unicast packet
+            # Process unicast packet
+            # must determine if data field holds a multicast packet
+            pkt_data = view.payload
+            if view.dst_addr != self.addr:
+                if forward_unicast_in_place(view.buf):
+                    self.send_packet(view.buf)
+                else:
+                    #drop the packet since TTL is low
+                    pass
+
+            elif len(pkt_data) and pkt_data[0] == 3: # this means the first byte in data is 3, which is the value of the type field for a multicast packet
+                # now we have to split the packets to unicast, and determine k closest destinations
+                try:
+                    multi = PacketView(pkt_data)
+                except ValueError as e:
+                    log.info(f"{self.name}: bad multicast packet: {e}")
+                    return
+
+                # send copies to the k closest destinations. Currently "src" field is the original src where the multicast packet was sent from
+                self.send_multicast(multi.destinations, multi.kval, multi.payload, view.src)
+
+            else:
+                print(f"{self.name} Packet recieved")
+
+
+        elif pkt_type == 5:  # LSA packet
+            self.receive_lsa(view, ingress)
+        elif pkt_type == 6:  # LSU, several LSAs in one packet
+            try:
+                for lsa in iter_bundled_LSAs(view):
+                    self.receive_lsa(PacketView(lsa), ingress)
+            except ValueError as e:
+                log.info(f"{self.name}: bad LSU: {e}")
+            # what the bundle made us re-flood is already a bundle's worth, no point holding it
+            for intf, pending in self.flood_queues.items():
+                if pending:
+                    self.send_bundles(intf, pending)
+        else:
+            # Invalid packet type
+            print("Invalid packet type")
+
+    def receive_lsa(self, view, ingress=None):
+        #advertising route = ID of the router that originated the LSA
+        incomingID = view.advRoute_addr
+        if self.lsdb.is_newer(incomingID, view.LSSeq): # duplicates and stale copies stop here and are never re-flooded
+            try:
+                # the links go from the packet into the LSDB's store without a dict in between
+                links = lsa_links(view.payload)
+            except ValueError as e:
+                log.info(f"{self.name}: bad LSA from {unpack_addr(incomingID)}: {e}")
+                return
+            old = self.lsdb.install(incomingID, view.LSSeq, links)
+            self.lsdb_changed(incomingID, old)
+            self.arm_max_age(incomingID)
+            if reflood_LSA_in_place(view.buf, self.addr):
+                self.lsa_flood(view.buf, ingress)
+
+    def process_packet_queue(self):
+        if self.engine is not None:
+            # TTL, lookup and egress queueing happen in the engine's workers, we only transmit;
+            # forward() returns once the workers are through every packet of the queue
+            if self.fib_stale:
+                self.rebuild_fib()
+            sent = self.engine.forward(self.packet_queue, self.send)
+            self.packet_queue = []
+            return sent
+        for packet in self.packet_queue:
+            self.send_packet(packet)
+        self.packet_queue = []
+
+
+
+def is_router(node):
+    return getattr(node, 'is_router', False)
+
+
+def node_id(node):
+    #id of a node: the address a router was created with, a host's IP otherwise
+    return pack_addr(node.ip if is_router(node) else node.IP())
@@ -0,0 +1,82 @@
+#Link-state database: the newest LSA heard from every advertising router.
+#
+#Flooding is only bounded if a router re-floods an LSA the first time it sees it and drops every
+#later copy. That needs the last sequence number per advertising router, which is what this keeps.
+#The links themselves go into a graphstore.GraphStore, the router's SPF runs on that same store.
+#
+#Sequence numbers are the 32-bit LSSeq field of the LSA header and wrap around, so they are compared
+#in serial number arithmetic (RFC 1982): seq is newer than old if it is less than half the number
+#space ahead of it, counting modulo 2**32.
+
+import time
+
+from graphstore import GraphStore
+
+SEQ_MOD = 1 << 32
+
+
+def seq_newer(seq, old):
+    #whether sequence number seq comes after old, see above
+    return 0 < (seq - old) % SEQ_MOD < SEQ_MOD // 2
+
+
+class LinkStateDatabase:
+    """Newest LSA per advertising router id, with sequence number and age.
+
+    table holds {"LSSEQ": seq} per advertising router plus the time the LSA was installed and how
+    many copies this router flooded, and serves as the router's map_table. The links of every LSA
+    are a row of graph, a GraphStore with incoming rows, links() reads one back. stats counts what
+    happened to every LSA received.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.table = {}
+        self.graph = GraphStore(incoming=True)
+        self.stats = {'received': 0, 'accepted': 0, 'duplicate': 0, 'stale': 0, 'flooded': 0}
+
+    def is_newer(self, router, seq):
+        """Count an incoming LSA and say whether it is newer than what we have for its router.
+
+        Only newer LSAs should be installed and re-flooded, duplicates and stale copies are dropped.
+        """
+        self.stats['received'] += 1
+        entry = self.table.get(router)
+        if entry is None or seq_newer(seq, entry["LSSEQ"]):
+            return True
+        self.stats['duplicate' if seq == entry["LSSEQ"] else 'stale'] += 1
+        return False
+
+    def install(self, router, seq, links):
+        #install router's LSA with links ({neighbor_id: cost} or the pairs of packet.lsa_links), returns
+        #the links it replaced
+        old = self.links(router)
+        self.stats['accepted'] += 1
+        self.graph.set_row(router, links)
+        self.table[router] = {"LSSEQ": seq, "installed": self.clock(), "flooded": 0}
+        return old
+
+    def links(self, router):
+        #{neighbor_id: cost} of router's current LSA, empty if we have none
+        return self.graph.row(router) if router in self.table else {}
+
+    def note_flooded(self, router, count):
+        #count copies of router's current LSA sent out by this router
+        self.stats['flooded'] += count
+        self.table[router]["flooded"] += count
+
+    def age(self, router):
+        return self.clock() - self.table[router]["installed"]
+
+    def remove(self, router):
+        #drop router's LSA and its links, returns its entry or None if there was none
+        entry = self.table.pop(router, None)
+        if entry is not None:
+            self.graph.set_row(router, ())
+        return entry
+
+    def __contains__(self, router):
+        return router in self.table
+
+    def __len__(self):
+        return len(self.table)
@@ -0,0 +1,43 @@
+#Multicast destination selection: the k members of a group closest to this router.
+#
+#A multicast packet names a group of destinations and a k, and the first router sends unicast
+#copies to the k closest members by routing cost. Instead of sorting the whole group per packet,
+#heapq.nsmallest does a partial selection, and the result is cached per (group, k) until the routes
+#change, which for a steady topology means one selection per group.
+
+import heapq
+
+
+class DestinationRanker:
+    """k closest destinations of a group by routing_table cost, cached per routing generation.
+
+    routing_table is the router's live {dest: (cost, first_hop)} table. Unreachable members are
+    left out, members of equal cost keep their order in the group.
+    """
+
+    def __init__(self, routing_table, max_entries=4096):
+        self.routing_table = routing_table
+        self.max_entries = max_entries
+        self.generation = None
+        self.cache = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def nearest(self, destinations, k, generation):
+        if generation != self.generation:
+            self.cache.clear()
+            self.generation = generation
+        # a group straight out of a packet is a memoryview over its packed addresses, those bytes
+        # are the cheapest key
+        key = (destinations.tobytes() if isinstance(destinations, memoryview) else tuple(destinations), k)
+        ranked = self.cache.get(key)
+        if ranked is not None:
+            self.stats['hits'] += 1
+            return ranked
+        self.stats['misses'] += 1
+        table = self.routing_table
+        members = [(table[dest][0], i, dest) for i, dest in enumerate(destinations) if dest in table]
+        ranked = [dest for cost, i, dest in heapq.nsmallest(k, members)]
+        if len(self.cache) >= self.max_entries:
+            self.cache.clear()
+        self.cache[key] = ranked
+        return ranked
@@ -1,10 +1,10 @@
-import time
+import itertools
 #from socket import socket, AF_INET, SOCK_DGRAM, inet_aton
 import socket
 import struct
-import select
-import random
-import asyncore
+import zlib
+from array import array
+import sys
 
 
 #Types:
@@ -14,125 +14,365 @@ import asyncore
 # 3: Mulicast Packet
 # 4: Unicast Packet
 # 5: LSA Packet
+# 6: Link State Update, a bundle of LSA packets
 
 # The objective would be to store everything in a struct, but since we have different packet types of varying lengths 
 # use this as a reference? https://github.com/sumitece87/comnet2_2020/tree/master/comnetsii_package/Example_Ping
 # documentation reference https://docs.google.com/document/d/1meTQd49NvTkn1GZNhilRDmXpstn27qb0XuhDAtOjkKQ/edit#
 
+# Header layouts per packet type, as (field name, struct code) pairs. The field names are the
+# keys read_header has always returned, so PacketView attributes and read_header dicts line up.
+# On the wire every header is packed in network order without padding (WIRE_ORDER), so its size
+# and bytes are the same on every host; '4s' fields carry IPv4 addresses as their 4 address bytes.
+MULTICAST_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('kval', 'B'),
+                    ('dst1', '4s'), ('dst2', '4s'), ('dst3', '4s'))
+# group multicast, the variable-length type 3: a destination count and then that many packed IPv4
+# addresses between the header and the payload. version sits where dst1's first byte is in the
+# three-destination format and is 0, which no destination address starts with.
+GROUP_MULTICAST_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('kval', 'B'),
+                          ('version', 'B'), ('count', 'H'))
+UNICAST_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('src', '4s'), ('dst', '4s'))
+LSA_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('src', '4s'), ('hops', 'B'),
+              ('advRoute', '4s'), ('LSSeq', 'L'), ('CRC', 'B'))
+# hello and hello ACK: src is the sending router's id, seq echoes the hello an ACK answers
+HELLO_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('src', '4s'))
+# followed by count complete LSA packets back to back, each as long as its own length field
+LSU_FIELDS = (('type', 'B'), ('length', 'L'), ('seq', 'B'), ('TTL', 'B'), ('src', '4s'), ('count', 'H'))
+
+WIRE_ORDER = '!'
+
+# a packed IPv4 address read as one 32-bit integer, used as a cheap dict key for addresses. It is
+# read in host order, so the key packs back into the same 4 address bytes on any host
+ADDR = struct.Struct('=I')
+
+
+def pack_addr(ip):
+    #dotted quad -> 32-bit address key
+    return ADDR.unpack(socket.inet_aton(ip))[0]
+
+def unpack_addr(addr):
+    #32-bit address key -> dotted quad
+    return socket.inet_ntoa(ADDR.pack(addr))
+
+
+class PacketLayout:
+    """Precompiled struct for one packet type plus per-field (struct, offset, decoder) accessors."""
+
+    def __init__(self, fields):
+        codes = [code for name, code in fields]
+        self.header = struct.Struct(WIRE_ORDER + ''.join(codes))
+        self.size = self.header.size
+        self.names = tuple(name for name, code in fields)
+        self.fields = {}
+        for i, (name, code) in enumerate(fields):
+            # there is no padding in the wire order, a field starts where the ones before it end
+            offset = struct.calcsize(WIRE_ORDER + ''.join(codes[:i]))
+            if code == '4s':
+                self.fields[name] = (struct.Struct(code), offset, socket.inet_ntoa)
+                self.fields[name + '_addr'] = (ADDR, offset, None)
+            else:
+                self.fields[name] = (struct.Struct(WIRE_ORDER + code), offset, None)
+
+
+# dispatch table indexed by the type byte
+PACKET_LAYOUTS = {
+    1: PacketLayout(HELLO_FIELDS),
+    2: PacketLayout(HELLO_FIELDS),
+    3: PacketLayout(MULTICAST_FIELDS),
+    4: PacketLayout(UNICAST_FIELDS),
+    5: PacketLayout(LSA_FIELDS),
+    6: PacketLayout(LSU_FIELDS),
+}
+NULL_LAYOUT = PacketLayout((('type', 'B'),))
+HELLO_LAYOUT = PACKET_LAYOUTS[1]
+MULTICAST_LAYOUT = PACKET_LAYOUTS[3]
+UNICAST_LAYOUT = PACKET_LAYOUTS[4]
+LSA_LAYOUT = PACKET_LAYOUTS[5]
+LSU_LAYOUT = PACKET_LAYOUTS[6]
+GROUP_MULTICAST_LAYOUT = PacketLayout(GROUP_MULTICAST_FIELDS)
+GROUP_VERSION = 0
+_, GROUP_VERSION_OFFSET, _ = GROUP_MULTICAST_LAYOUT.fields['version']
+assert GROUP_VERSION_OFFSET == MULTICAST_LAYOUT.fields['dst1'][1]
+# largest group one packet can name
+MAX_GROUP_SIZE = 0xFFFF
+
+# a unicast packet's flow is its (src, dst) pair, seq and TTL change from packet to packet
+FLOW_START = min(UNICAST_LAYOUT.fields['src'][1], UNICAST_LAYOUT.fields['dst'][1])
+FLOW_END = max(UNICAST_LAYOUT.fields['src'][1], UNICAST_LAYOUT.fields['dst'][1]) + 4
+
+# largest header plus the largest payload (1480) we ever send
+MAX_PACKET_SIZE = max(layout.size for layout in PACKET_LAYOUTS.values()) + 1480
+
+
+def encode_data(data):
+    #payloads may be given as text or as any bytes-like object (e.g. a PacketView payload)
+    if isinstance(data, str):
+        return bytes(data, 'utf-8')
+    return data
+
+# LSA body: the neighbor count (32 bits, network order), then one (neighbor, cost) pair per link,
+# the neighbor as its 4 address bytes like advRoute and the cost as 32 bits in network order
+LSA_LINK_COUNT = struct.Struct(WIRE_ORDER + 'I')
+# on a big-endian host the costs already are in host order
+_SWAP_COSTS = sys.byteorder == 'little'
+
+def encode_lsa_links(links):
+    #LSA body for the advertising router's {neighbor id: cost} links, ids being address keys
+    pairs = array('I', itertools.chain.from_iterable(links.items()))
+    if _SWAP_COSTS:
+        costs = pairs[1::2]
+        costs.byteswap()
+        pairs[1::2] = costs
+    return LSA_LINK_COUNT.pack(len(links)) + pairs.tobytes()
+
+def lsa_links(data):
+    #the body's links as (neighbor id, cost) pairs, read straight off the packet through a memoryview
+    #cast to 32-bit ints: the neighbor ids are the address bytes as they are, only each cost goes from
+    #network to host order (socket.ntohl) as the pairs are consumed. Nothing is copied, so the pairs
+    #have to be used before the packet buffer is
+    view = memoryview(data)
+    count = LSA_LINK_COUNT.unpack_from(view)[0]
+    end = LSA_LINK_COUNT.size + 8 * count
+    if len(view) < end:
+        raise ValueError(f"truncated LSA body: {count} links in {len(view)} bytes")
+    pairs = view[LSA_LINK_COUNT.size:end].cast('I')
+    return zip(pairs[::2], map(socket.ntohl, pairs[1::2]))
+
+def decode_lsa_links(data):
+    return dict(lsa_links(data))
 
 def create_LSA_packet(seq, TTL, src, hops, advRoute, LSSeq, CRC, data):
-    #Type(1), Len(4), Seq(1), TTL(1), src(1), hops(1), advRoute(4), LSSeq(4), CRC(1)
-    #header (41)
+    #Type(1), Len(4), Seq(1), TTL(1), src(4), hops(1), advRoute(4), LSSeq(4), CRC(1)
+    #header (21); advRoute is the advertising router's address key
     
-    byteData = bytes(data, 'utf-8')
-    length = 41 + len(byteData)
+    byteData = encode_data(data)
+    length = LSA_LAYOUT.size + len(byteData)
     
     pkttype = 5 # 5 is defined as the pkt type for LSA packets
-    header = struct.pack('BLBB4sBLLB', pkttype, length, seq, TTL, socket.inet_aton(src), hops, advRoute, LSSeq, CRC)
+    header = LSA_LAYOUT.header.pack(pkttype, length, seq, TTL, socket.inet_aton(src), hops, ADDR.pack(advRoute), LSSeq, CRC)
     return header + byteData
 
+# LSU bundles are filled up to this many bytes, so they fit one Ethernet frame's IP payload
+LSU_MTU = 1472
+
+def create_LSU_packets(seq, TTL, src, lsas, mtu=LSU_MTU):
+    """Bundle LSA packets into as few LSU packets of at most mtu bytes as they fit in.
+
+    An LSA too big to share a bundle with anything is sent on its own, as a plain LSA.
+    """
+    room = mtu - LSU_LAYOUT.size
+    bundle = []
+    size = 0
+    for lsa in lsas:
+        if bundle and size + len(lsa) > room:
+            yield _bundle(seq, TTL, src, bundle, size)
+            bundle = []
+            size = 0
+        bundle.append(lsa)
+        size += len(lsa)
+    if bundle:
+        yield _bundle(seq, TTL, src, bundle, size)
+
+def _bundle(seq, TTL, src, lsas, size):
+    if len(lsas) == 1:
+        return bytes(lsas[0])
+    header = LSU_LAYOUT.header.pack(6, LSU_LAYOUT.size + size, seq, TTL, socket.inet_aton(src), len(lsas))
+    return b''.join([header] + lsas)
+
+def iter_bundled_LSAs(view):
+    #the LSA packets inside an LSU PacketView, as memoryview slices of its buffer, in one pass
+    buf = view.buf
+    field, length_offset, _ = LSA_LAYOUT.fields['length']
+    offset = LSU_LAYOUT.size
+    for _ in range(view.count):
+        if offset + LSA_LAYOUT.size > len(buf):
+            raise ValueError(f"truncated LSU at byte {offset}")
+        length = field.unpack_from(buf, offset + length_offset)[0]
+        if length < LSA_LAYOUT.size or offset + length > len(buf):
+            raise ValueError(f"bad LSA length {length} in LSU at byte {offset}")
+        yield buf[offset:offset + length]
+        offset += length
+
+def create_hello_packet(seq, src, ack=False):
+    #Type(1), Len(4), Seq(1), TTL(1), src(4), a hello never leaves the link so TTL is 1
+    return HELLO_LAYOUT.header.pack(2 if ack else 1, HELLO_LAYOUT.size, seq & 0xFF, 1, socket.inet_aton(src))
+
 def create_unicast_packet(seq, TTL, src, dst, data):
     #Type(1), Length(4), Seq(1), TTL(1), src(4), dst(4), data(1-1480)
-    #header (26) + data(1-1480) -> 27 - 1506
+    #header (15) + data(1-1480) -> 16 - 1495
     pkttype = 4 # 4 is defined as the pkttype for unicast packets
 
-    byteData = bytes(data, 'utf-8')
+    byteData = encode_data(data)
 
-    length = 26 + len(byteData)
+    length = UNICAST_LAYOUT.size + len(byteData)
     
 
-    header = struct.pack('BLBB4s4s', pkttype, length, seq, TTL, socket.inet_aton(src), socket.inet_aton(dst))
+    header = UNICAST_LAYOUT.header.pack(pkttype, length, seq, TTL, socket.inet_aton(src), socket.inet_aton(dst))
     return header + byteData
     
 
 def create_multicast_packet(seq, TTL, kval, dst1, dst2, dst3, data):
     """Create new packet with given fields"""
     #Type(1), Len(4), Seq(1), TTL(1), K-val(1), Dest1(4), Dest2(4), Dest3(4), Data(1-1480)
-    #header (31) + data(1-1480) -> 32 - 1511
+    #header (20) + data(1-1480) -> 21 - 1500
     pkttype = 3 # 3 is defined as the pkttype for multicast packets
 
-    byteData = bytes(data, 'utf-8')
+    byteData = encode_data(data)
 
-    length = 31 + len(byteData)
+    length = MULTICAST_LAYOUT.size + len(byteData)
 
-    header = struct.pack('BLBBB4s4s4s', pkttype, length, seq, TTL, kval, socket.inet_aton(dst1), socket.inet_aton(dst2), socket.inet_aton(dst3))
+    header = MULTICAST_LAYOUT.header.pack(pkttype, length, seq, TTL, kval, socket.inet_aton(dst1), socket.inet_aton(dst2), socket.inet_aton(dst3))
     return header + byteData
 
 
-def read_header(pkt):
-    #change bytes to account for network encapsulations
+def create_group_multicast_packet(seq, TTL, kval, destinations, data):
+    """Create a multicast packet for any number of destinations (dotted IPs or address keys)."""
+    #Type(1), Len(4), Seq(1), TTL(1), K-val(1), Version(1), Count(2), Dest(4 * Count), Data(1-1480)
+    count = len(destinations)
+    if count > MAX_GROUP_SIZE:
+        raise ValueError(f"group of {count} destinations, at most {MAX_GROUP_SIZE} fit")
+    if kval > count:
+        raise ValueError(f"kval {kval} is larger than the group of {count}")
+    if count and isinstance(destinations[0], int):
+        addresses = array('I', destinations).tobytes()
+    else:
+        addresses = b''.join(socket.inet_aton(dest) for dest in destinations)
+    byteData = encode_data(data)
+    length = GROUP_MULTICAST_LAYOUT.size + len(addresses) + len(byteData)
+    header = GROUP_MULTICAST_LAYOUT.header.pack(3, length, seq, TTL, kval, GROUP_VERSION, count)
+    return header + addresses + byteData
 
-    #check which packet type it is, and handle accordingly
 
-    rawPacketType = pkt[0]
+class PacketView:
+    """Zero-copy view over a received packet.
 
-    if rawPacketType == 0:
-        #invalid packet type
-        print(0)
-    elif rawPacketType == 1:
-        #HELLO pkt type
-        header = pkt
+    Header fields decode lazily on attribute access (view.TTL, view.dst, ...), straight out of the
+    receive buffer. IPv4 fields also have an *_addr form (view.dst_addr) giving the 32-bit address
+    key without building a dotted string, and view.payload is a memoryview slice of the same buffer.
+    view.destinations is a multicast packet's group as address keys, for the group format a
+    memoryview cast to 'I' straight over the packed addresses.
+    """
 
-    elif rawPacketType == 2:
-        #HELLO ACK pkt type
-        print(2)
+    __slots__ = ('buf', 'type', 'layout', 'start')
 
-    elif rawPacketType == 3:
-        #multicast pkt type
-        header = pkt[0:31]
-        pkttype, length, seq, TTL, kval, dst1, dst2, dst3 = struct.unpack('BLBBB4s4s4s', header)
+    def __init__(self, pkt):
+        buf = pkt if isinstance(pkt, memoryview) else memoryview(pkt)
+        if len(buf) == 0:
+            raise ValueError("empty packet")
+        self.buf = buf
+        self.type = buf[0]
+        layout = PACKET_LAYOUTS.get(self.type, NULL_LAYOUT)
+        if layout is MULTICAST_LAYOUT and len(buf) > GROUP_VERSION_OFFSET and buf[GROUP_VERSION_OFFSET] == GROUP_VERSION:
+            layout = GROUP_MULTICAST_LAYOUT
+        self.layout = layout
+        if len(buf) < layout.size:
+            raise ValueError(f"truncated packet of type {self.type}: {len(buf)} bytes")
+        self.start = layout.size
+        if layout is GROUP_MULTICAST_LAYOUT:
+            count = self.count
+            self.start += 4 * count
+            if len(buf) < self.start:
+                raise ValueError(f"truncated multicast packet: {count} destinations in {len(buf)} bytes")
+            if self.kval > count:
+                raise ValueError(f"multicast kval {self.kval} is larger than its group of {count}")
 
-        dst1 = socket.inet_ntoa(dst1)
-        dst2 = socket.inet_ntoa(dst2)
-        dst3 = socket.inet_ntoa(dst3)
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            field, offset, decode = self.layout.fields[name]
+        except KeyError:
+            raise AttributeError(f"packet type {self.type} has no field {name!r}") from None
+        value = field.unpack_from(self.buf, offset)[0]
+        return decode(value) if decode else value
 
-        return {"type": pkttype, "length": length, "seq": seq, "TTL": TTL, "kval": kval, "dst1": dst1, "dst2": dst2, "dst3": dst3}
+    @property
+    def known(self):
+        return self.layout is not NULL_LAYOUT
 
-    elif rawPacketType == 4:
-        #unicast pkt type
-        header = pkt[0:26] #correct size for unicast
-        pkttype, length, seq, TTL, src, dst = struct.unpack('BLBB4s4s', header)
+    @property
+    def payload(self):
+        return self.buf[self.start:]
 
-        src = socket.inet_ntoa(src)
-        dst = socket.inet_ntoa(dst)
+    @property
+    def destinations(self):
+        if self.layout is GROUP_MULTICAST_LAYOUT:
+            return self.buf[self.layout.size:self.start].cast('I')
+        return (self.dst1_addr, self.dst2_addr, self.dst3_addr)
 
-        return {"type": pkttype, "length": length, "seq": seq, "TTL": TTL, "src": src, "dst": dst}
-        
-    elif rawPacketType == 5:
-        #LSA packet type
-        header = pkt[0:41]
-        pkttype, length, seq, TTL, src, hops, advRoute, LSSeq, CRC = struct.unpack('BLBB4sBLLB', header)
-        
-        src = socket.inet_ntoa(src)
-        advRoute = socket.inet_ntoa(advRoute)
-        return {"type": pkttype, "length": length, "seq": seq, "TTL": TTL, "src": src, "hops": hops, "advRoute": advRoute, "LSSeq": LSSeq, "CRC": CRC}
+    def header(self):
+        #decode every field at once, in the dict form read_header returns
+        header = {}
+        for name, value in zip(self.layout.names, self.layout.header.unpack_from(self.buf)):
+            decode = self.layout.fields[name][2]
+            header[name] = decode(value) if decode else value
+        if self.layout is GROUP_MULTICAST_LAYOUT:
+            header['destinations'] = [unpack_addr(addr) for addr in self.destinations]
+        return header
 
-    else:
-        return "error!"
 
-    return None
+def read_header(pkt):
+    #dict form of the header; the router uses PacketView directly instead
+    view = PacketView(pkt)
+    if not view.known:
+        return None
+    return view.header()
 
 def read_data(pkt):
-    #change bytes to account for network encapsulations
-    pkttype = pkt[0]
-
-    if pkttype == 0:
-        #invalid type
-        print(0)
-    elif pkttype == 1:
-        #HELLO pkttype, no data
-        print(1)
-    elif pkttype == 2:
-        #HELLO ACK pkttype
-        print(2)
-    elif pkttype == 3:
-        #multicast pkttype
-        data = pkt[31:]
-    elif pkttype == 4:
-        #unicast pkttype
-        data = pkt[26:]
-    elif pkttype == 5:
-        data = 0
-    
-    return data
+    #copy of the payload; the router uses PacketView.payload directly instead
+    view = PacketView(pkt)
+    if not view.known:
+        return None
+    return bytes(view.payload)
+
+
+# Forwarding fast path. Instead of decoding a packet and building a new one to change a single
+# byte, the router patches the header of the received buffer in place and sends that same buffer.
+
+def writable_packet(packet, scratch):
+    #writable view of packet; read-only input (bytes) is copied once into the reusable scratch bytearray
+    view = memoryview(packet)
+    if not view.readonly:
+        return view
+    if len(view) > len(scratch):
+        # bigger than any packet the scratch buffer was sized for, e.g. a large multicast group
+        return memoryview(bytearray(view))
+    out = memoryview(scratch)[:len(view)]
+    out[:] = view
+    return out
+
+def flow_key(packet):
+    #the src/dst bytes of a unicast packet
+    return bytes(packet[FLOW_START:FLOW_END])
+
+def flow_hash(packet):
+    #hash of a unicast packet's flow that is the same in every process and run, unlike hash().
+    #crc32 alone is linear, flows whose addresses differ in a few bits collide modulo small path
+    #counts, so its result goes through murmur3's finalizer
+    h = zlib.crc32(packet[FLOW_START:FLOW_END])
+    h = ((h ^ (h >> 16)) * 0x85ebca6b) & 0xFFFFFFFF
+    h = ((h ^ (h >> 13)) * 0xc2b2ae35) & 0xFFFFFFFF
+    return h ^ (h >> 16)
+
+def forward_unicast_in_place(buf):
+    #decrement TTL of a unicast packet in place, returns False if it has expired and must be dropped
+    field, offset, _ = UNICAST_LAYOUT.fields['TTL']
+    TTL = buf[offset]
+    if TTL == 0:
+        return False
+    field.pack_into(buf, offset, TTL - 1)
+    return True
 
+def reflood_LSA_in_place(buf, src_addr):
+    #rewrite an LSA for re-flooding: TTL - 1, hops + 1 and this router as src. False if TTL ran out
+    fields = LSA_LAYOUT.fields
+    field, offset, _ = fields['TTL']
+    TTL = buf[offset]
+    if TTL <= 1:
+        return False
+    field.pack_into(buf, offset, TTL - 1)
+    field, offset, _ = fields['hops']
+    field.pack_into(buf, offset, (buf[offset] + 1) & 0xFF)
+    field, offset, _ = fields['src_addr']
+    field.pack_into(buf, offset, src_addr)
+    return True
@@ -0,0 +1,358 @@
+#In-process discrete-event network simulator.
+#
+#Runs the same LinkStateRouter logic UDPRouter uses under Mininet, but against virtual interfaces on
+#a simulated clock: no root, no namespaces, no real sockets, so thousands of routers fit in one
+#process. Links model bandwidth (Mbit/s, like TCLink's bw), propagation delay and a tail-drop queue.
+#
+#    python sim.py          cold-start MyTopo, then send one packet from s to each of d1/d2/d3
+#
+#Generated topologies come from topogen.py: Network.from_spec(topogen.grid(30, 30)).
+
+import heapq
+import itertools
+import random
+
+from directory import AddressDirectory
+from linkstate import LinkStateRouter, node_id
+from packet import create_unicast_packet, create_group_multicast_packet
+from throttle import SPFThrottle
+from timerwheel import TimerWheel
+from spf import distances, shortest_paths
+from topogen import mytopo
+
+
+class Simulator:
+    """Event queue and simulated clock, in seconds."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.events = []
+        self.order = itertools.count()
+        self.processed = 0
+
+    def schedule(self, delay, callback, *args):
+        heapq.heappush(self.events, (self.now + delay, next(self.order), callback, args))
+
+    def run(self, until=None):
+        #process events in time order, up to and including time until if given
+        events = self.events
+        while events:
+            if until is not None and events[0][0] > until:
+                break
+            when, order, callback, args = heapq.heappop(events)
+            self.now = when
+            callback(*args)
+            self.processed += 1
+        if until is not None and self.now < until:
+            self.now = until
+
+
+class VirtualInterface:
+    """One end of a VirtualLink, with the .name / .node / .link / .params attributes of a Mininet Intf."""
+
+    def __init__(self, name, node, link):
+        self.name = name
+        self.node = node
+        self.link = link
+        self.params = link.params
+        self.busy_until = 0.0
+        self.tx_packets = 0
+        self.tx_bytes = 0
+        self.rx_packets = 0
+        self.rx_bytes = 0
+        self.drops = 0
+        # packet type -> [packets, bytes] sent
+        self.tx_types = {}
+
+    def peer(self):
+        return self.link.intf2 if self.link.intf1 is self else self.link.intf1
+
+    def transmit(self, packet):
+        """Queue a copy of packet for the peer, returns False if it was dropped."""
+        link = self.link
+        sim = link.sim
+        if not link.up:
+            self.drops += 1
+            return False
+        start = max(sim.now, self.busy_until)
+        # tail drop once the bytes still waiting to be serialized exceed the queue
+        if (start - sim.now) * link.bytes_per_second > link.queue_bytes:
+            self.drops += 1
+            return False
+        self.busy_until = start + len(packet) / link.bytes_per_second
+        self.tx_packets += 1
+        self.tx_bytes += len(packet)
+        counts = self.tx_types.get(packet[0])
+        if counts is None:
+            counts = self.tx_types[packet[0]] = [0, 0]
+        counts[0] += 1
+        counts[1] += len(packet)
+        # copy, the sender may reuse its buffer (the router's forward_buffer) for the next packet
+        sim.schedule(self.busy_until - sim.now + link.delay, self.peer().deliver, bytes(packet))
+        return True
+
+    def deliver(self, packet):
+        if self.link.up:
+            self.rx_packets += 1
+            self.rx_bytes += len(packet)
+            self.node.accept(packet, self)
+
+
+class VirtualLink:
+    """Point-to-point link between two simulated nodes."""
+
+    def __init__(self, sim, node1, node2, bw=10, delay=0.001, queue_bytes=64 * 1024, **params):
+        self.sim = sim
+        self.params = dict(params, bw=bw)
+        self.bytes_per_second = bw * 1e6 / 8
+        self.delay = delay
+        self.queue_bytes = queue_bytes
+        self.up = True
+        self.intf1 = node1.add_interface(self)
+        self.intf2 = node2.add_interface(self)
+
+
+class SimNode:
+    def __init__(self, sim, name, ip):
+        self.sim = sim
+        self.name = name
+        self.ip = ip
+        self.intfs = []
+
+    def IP(self):
+        return self.ip
+
+    def intfList(self):
+        return self.intfs
+
+    def accept(self, packet, ingress):
+        self.receive_packet(packet, ingress)
+
+    def add_interface(self, link):
+        intf = VirtualInterface(f"{self.name}-eth{len(self.intfs)}", self, link)
+        self.intfs.append(intf)
+        return intf
+
+
+class SimRouter(SimNode, LinkStateRouter):
+    def __init__(self, sim, name, ip, rx_cost=0.0):
+        SimNode.__init__(self, sim, name, ip)
+        LinkStateRouter.__init__(self, name, ip)
+        # seconds of CPU every received packet costs, packets are processed one at a time
+        self.rx_cost = rx_cost
+        self.cpu_busy_until = 0.0
+
+    def accept(self, packet, ingress):
+        if not self.rx_cost:
+            return self.receive_packet(packet, ingress)
+        sim = self.sim
+        self.cpu_busy_until = max(sim.now, self.cpu_busy_until) + self.rx_cost
+        sim.schedule(self.cpu_busy_until - sim.now, self.receive_packet, packet, ingress)
+
+    def send(self, intf, packet):
+        intf.transmit(packet)
+
+    def call_later(self, delay, callback, *args):
+        self.sim.schedule(delay, callback, *args)
+
+    def clock(self):
+        return self.sim.now
+
+
+class SimHost(SimNode):
+    """End host: sends through its first interface and counts what it receives."""
+
+    def __init__(self, sim, name, ip):
+        super().__init__(sim, name, ip)
+        self.received = 0
+        self.received_bytes = 0
+        # optional callback(packet, ingress) for traffic sinks
+        self.on_receive = None
+
+    def send(self, packet):
+        return self.intfs[0].transmit(packet)
+
+    def receive_packet(self, packet, ingress=None):
+        self.received += 1
+        self.received_bytes += len(packet)
+        if self.on_receive is not None:
+            self.on_receive(packet, ingress)
+
+
+class Network:
+    """A topology instantiated on one Simulator.
+
+    routers and hosts map names to IPs, links is a list of (node1, node2, params) with params like
+    Mininet's addLink keywords (bw, delay, ...). delay and queue_bytes are the defaults for links
+    that do not set their own. rx_cost is the CPU time a router spends per received packet, 0 for
+    infinitely fast routers. spf_throttle is (initial, incremental, max_hold) for every router's
+    SPFThrottle, None to run SPF on every LSA; flood_rate and flood_burst pace LSA floods per
+    interface (see LinkStateRouter.send_flood).
+    """
+
+    def __init__(self, routers, hosts, links, delay=0.001, queue_bytes=64 * 1024, lsa_ttl=255, seed=0,
+                 multicast_mode='unicast', ecmp=False, ecmp_weighted=False, flood_window=0, rx_cost=0.0,
+                 spf_throttle=None, flood_rate=0, flood_burst=8):
+        self.sim = Simulator()
+        self.lsa_ttl = lsa_ttl
+        self.random = random.Random(seed)
+        self.timers = None
+        self.crashed = set()
+        self.routers = {name: SimRouter(self.sim, name, ip, rx_cost) for name, ip in routers.items()}
+        self.hosts = {name: SimHost(self.sim, name, ip) for name, ip in hosts.items()}
+        self.nodes = dict(self.routers, **self.hosts)
+        self.directory = AddressDirectory.from_topology(dict(routers, **hosts), links)
+        for router in self.routers.values():
+            router.directory = self.directory
+            router.multicast_mode = multicast_mode
+            router.ecmp = ecmp
+            router.ecmp_weighted = ecmp_weighted
+            router.flood_window = flood_window
+            if spf_throttle is not None:
+                router.spf_throttle = SPFThrottle(*spf_throttle)
+            router.flood_rate = flood_rate
+            router.flood_burst = flood_burst
+        self.links = {}
+        for node1, node2, params in links:
+            params = dict(params)
+            params.setdefault('delay', delay)
+            params.setdefault('queue_bytes', queue_bytes)
+            link = VirtualLink(self.sim, self.nodes[node1], self.nodes[node2], **params)
+            self.links[node1, node2] = self.links[node2, node1] = link
+
+    @classmethod
+    def from_spec(cls, spec, **kwargs):
+        #Network of a topogen.TopologySpec
+        return cls(spec.routers, spec.hosts, spec.links, **kwargs)
+
+    def start(self, jitter=0.001):
+        #every router originates its LSA within the first jitter seconds
+        for router in self.routers.values():
+            self.sim.schedule(self.random.uniform(0, jitter), router.send_lsa, 0, self.lsa_ttl)
+
+    def start_timers(self, hello_interval=1.0, dead_interval=4.0, refresh_interval=30.0, max_age=120.0,
+                     resolution=0.001):
+        """Run every router's hellos, dead intervals, LSA refresh and max-age on one shared TimerWheel.
+
+        The wheel is advanced every resolution seconds for as long as it holds timers, so with hellos
+        on the simulation no longer runs dry: use run(until).
+        """
+        self.timers = TimerWheel(resolution, start=self.sim.now)
+        for router in self.routers.values():
+            router.hello_interval = hello_interval
+            router.dead_interval = dead_interval
+            router.refresh_interval = refresh_interval
+            router.max_age = max_age
+            router.lsa_ttl = self.lsa_ttl
+            # spread the routers' hellos and refreshes over the interval
+            router.start_timers(self.timers, self.random.uniform(0, hello_interval or refresh_interval))
+        self.sim.schedule(resolution, self.tick_timers)
+
+    def tick_timers(self):
+        timers = self.timers
+        timers.advance(self.sim.now)
+        if len(timers):
+            self.sim.schedule(timers.resolution, self.tick_timers)
+
+    def run(self, until=None):
+        self.sim.run(until)
+
+    def send(self, src, dst, data, seq=0, ttl=64):
+        #unicast from host src to node dst
+        return self.hosts[src].send(create_unicast_packet(seq, ttl, self.hosts[src].ip, self.nodes[dst].ip, data))
+
+    def send_multicast(self, src, router, destinations, kval, data):
+        #multicast from host src: a group packet inside a unicast to router, which picks the kval closest
+        group = [self.nodes[dest].ip for dest in destinations]
+        packet = create_group_multicast_packet(0, 10, kval, group, data)
+        return self.send(src, router, packet)
+
+    def link_bytes(self):
+        #{(node1, node2): bytes sent from node1 to node2} for every link direction that carried traffic
+        counts = {}
+        for link in set(self.links.values()):
+            for intf in (link.intf1, link.intf2):
+                if intf.tx_bytes:
+                    counts[intf.node.name, intf.peer().node.name] = intf.tx_bytes
+        return counts
+
+    def reset_counters(self):
+        for link in set(self.links.values()):
+            for intf in (link.intf1, link.intf2):
+                intf.tx_packets = intf.tx_bytes = intf.rx_packets = intf.rx_bytes = intf.drops = 0
+                intf.tx_types = {}
+
+    def traffic(self):
+        #{packet type: (packets, bytes)} sent over all links since the last reset_counters
+        totals = {}
+        for link in set(self.links.values()):
+            for intf in (link.intf1, link.intf2):
+                for kind, (packets, size) in intf.tx_types.items():
+                    total = totals.setdefault(kind, [0, 0])
+                    total[0] += packets
+                    total[1] += size
+        return {kind: tuple(total) for kind, total in sorted(totals.items())}
+
+    def set_link(self, node1, node2, up):
+        self.links[node1, node2].up = up
+
+    def crash(self, name):
+        #router name stops dead: its timers stop and every link of it goes down
+        router = self.routers[name]
+        if router.timers is not None:
+            router.stop_timers()
+        for intf in router.intfs:
+            intf.link.up = False
+        self.crashed.add(name)
+
+    def set_cost(self, node1, node2, bw):
+        #change the link's cost (its bw, as in get_links) and have the routers on it re-originate their LSAs
+        self.links[node1, node2].params['bw'] = bw
+        for name in (node1, node2):
+            if name in self.routers:
+                self.routers[name].send_lsa(0, self.lsa_ttl)
+
+    def spf_stats(self):
+        #IncrementalSPF runs and seconds summed over all routers, plus the throttles' counters if any
+        totals = {}
+        for router in self.routers.values():
+            stats = dict(router.spf.stats)
+            if router.spf_throttle is not None:
+                stats.update(router.spf_throttle.stats)
+            stats.update(router.flood_stats)
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def expected_routes(self):
+        """{router name: {dest: cost}} every live router should end up with, by SPF over the links that
+        are actually up between live nodes; what the routers must agree on after a failure.
+        """
+        graph = {}
+        for name, router in self.routers.items():
+            if name in self.crashed:
+                continue
+            graph[router.addr] = {node_id(intf.peer().node): int(intf.params.get('bw', 1)) for intf in router.intfs
+                                  if intf.link.up and intf.peer().node.name not in self.crashed}
+        return {name: distances(shortest_paths(graph, router.addr))
+                for name, router in self.routers.items() if name not in self.crashed}
+
+    def routes_match(self, expected):
+        #every live router's routing table has the costs of expected (an expected_routes() result)
+        return all(distances(self.routers[name].routing_table) == costs for name, costs in expected.items())
+
+    def routes_complete(self):
+        #every router has a route to every node
+        return all(len(router.routing_table) == len(self.nodes) for router in self.routers.values())
+
+
+if __name__ == '__main__':
+    net = Network.from_spec(mytopo())
+    net.start()
+    net.run()
+    print(f"converged at t={net.sim.now * 1e3:.1f} ms after {net.sim.processed} events, routes complete: {net.routes_complete()}")
+    for dest in ('d1', 'd2', 'd3'):
+        net.send('s', dest, f"hello {dest}")
+    net.run()
+    for dest in ('d1', 'd2', 'd3'):
+        print(f"{dest} received {net.hosts[dest].received} packet(s) at t={net.sim.now * 1e3:.1f} ms")
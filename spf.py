@@ -0,0 +1,371 @@
+#Shortest path first for the link-state routers.
+#
+#Same heap-driven Dijkstra as compute_shortest_paths in router.py, but it carries the first
+#hop along with each heap entry, so one pass yields a routing table that send_packet can use
+#directly instead of bare distances or predecessors. O(E log V): every edge pushes at most once and
+#entries made stale by a later improvement are skipped when popped.
+
+import collections
+import heapq
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from graphstore import GraphStore, links_of
+
+
+def shortest_paths(graph, source):
+    """Routing table {dest: (cost, first_hop)} for every node reachable from source.
+
+    graph maps each node to its outgoing links, see links_of. Nodes that only show up as neighbors
+    (stub destinations such as d1/d2/d3) are fine, they just have no links of their own. source maps
+    to (0, source).
+    """
+    table = {}
+    best = {source: 0}
+    heap = [(0, source, source)]
+    while heap:
+        dist, node, first_hop = heapq.heappop(heap)
+        if node in table or dist > best[node]:
+            # stale entry, node was already settled through a shorter path
+            continue
+        table[node] = (dist, first_hop)
+        for neighbor, cost in links_of(graph.get(node, ())):
+            new_dist = dist + cost
+            if neighbor not in best or new_dist < best[neighbor]:
+                best[neighbor] = new_dist
+                # the first hop of a direct neighbor of the source is that neighbor itself
+                heapq.heappush(heap, (new_dist, neighbor, neighbor if node == source else first_hop))
+    return table
+
+
+def distances(table):
+    #{dest: cost} view of a routing table, what compute_shortest_paths used to return
+    return {dest: cost for dest, (cost, first_hop) in table.items()}
+
+
+class IncrementalSPF:
+    """Shortest-path tree from one source, kept between runs and repaired locally on LSA changes.
+
+    The graph is a GraphStore with incoming rows, one of its own unless store is given: a router
+    passes its LSDB's, writes every LSA's row into it and reports the changed routers with
+    links_changed({router: old links}); update_links does both for callers holding plain dicts.
+
+    routes is the live routing table {dest: (cost, first_hop)} and is updated in place. When one
+    router's links change, only the part of the tree that can be affected is touched:
+
+    * stub: every changed link points at a stub destination (a node with no links of its own, like
+      d1/d2/d3), so only those destinations' routes are recomputed from their incoming links and no
+      tree walk happens at all.
+    * incremental: links that got worse or vanished and were in the tree invalidate the subtree
+      below them, which is re-settled from its intact surroundings; links that got better or
+      appeared propagate the improvement outwards from where they land.
+    * full: reset() recomputes the whole tree with a Dijkstra over the store's CSR arrays.
+
+    stats counts how often each path was taken and the total seconds spent in it.
+    """
+
+    def __init__(self, source, graph=None, store=None):
+        self.source = source
+        self.graph = store if store is not None else GraphStore(incoming=True)
+        self.routes = {}
+        self.parent = {}
+        self.children = {}
+        self.stats = {'full': 0, 'incremental': 0, 'stub': 0,
+                      'full_time': 0.0, 'incremental_time': 0.0, 'stub_time': 0.0}
+        self.reset(graph)
+
+    def reset(self, graph=None):
+        #full recomputation, over a new {node: links} graph if given, else over the store as it is
+        start = time.perf_counter()
+        if graph is not None:
+            self.graph = GraphStore.from_graph(graph, incoming=True)
+        self.routes.clear()
+        self.parent.clear()
+        self.children.clear()
+        store = self.graph
+        if self.source in store:
+            dist, hop, parent = store.shortest_path_tree(self.source)
+            names = store.names
+            source = store.ids[self.source]
+            for i, cost in enumerate(dist):
+                if cost >= 0:
+                    self.routes[names[i]] = (cost, names[hop[i]])
+                    if i != source:
+                        self._set_parent(names[i], names[parent[i]])
+        else:
+            self.routes[self.source] = (0, self.source)
+        self._count('full', start)
+        return set(self.routes)
+
+    def update_links(self, router, links):
+        """Replace router's outgoing links ({neighbor: cost}) and repair the tree.
+
+        Returns the set of destinations whose route changed.
+        """
+        old = self.graph.row(router) if router in self.graph else {}
+        self.graph.set_row(router, links)
+        return self.links_changed({router: old})
+
+    def links_changed(self, changes):
+        """Repair the tree after the store's rows of the routers in changes changed.
+
+        changes maps each router to its links ({neighbor: cost}) as the tree last saw them. Rows that
+        changed together, like the LSAs one throttled SPF run covers, are repaired as one change.
+        Returns the set of destinations whose route changed.
+        """
+        start = time.perf_counter()
+        changed = []
+        for router, old in changes.items():
+            links = self.graph.row(router) if router in self.graph else {}
+            changed.extend((router, neighbor, old.get(neighbor), links.get(neighbor))
+                           for neighbor in old.keys() | links.keys() if old.get(neighbor) != links.get(neighbor))
+        if not changed:
+            return set()
+        # a node without links and without anything routed through it only affects its own route
+        if all(not self.graph.degree_of(neighbor) and not self.children.get(neighbor) and neighbor != self.source
+               for _, neighbor, _, _ in changed):
+            touched = self._update_stubs({neighbor for _, neighbor, _, _ in changed})
+            self._count('stub', start)
+            return touched
+
+        # links that got worse or vanished only matter if the tree used them
+        roots = [neighbor for router, neighbor, before, after in changed
+                 if (after is None or (before is not None and after > before)) and self.parent.get(neighbor) == router]
+        touched = self._repair(roots) if roots else set()
+        # links that got better or appeared can only lower distances, starting where they land
+        heap = [(self.routes[router][0] + after, neighbor, router) for router, neighbor, before, after in changed
+                if after is not None and (before is None or after < before) and router in self.routes]
+        touched |= self._settle(heap, improve=True)
+        self._count('incremental', start)
+        return touched
+
+    def multipath(self):
+        """{dest: tuple of first hops} with every first hop that starts a shortest path to dest.
+
+        A destination inherits the first hops of every router it is reached from at equal cost.
+        Zero-cost links put such routers at the same distance as the destination, or let them reach
+        each other (the source too) at no cost, so rather than one pass in distance order the first
+        hops are passed along the equal-cost links until nothing grows any more. The source maps to
+        an empty tuple.
+        """
+        routes = self.routes
+        source = self.source
+        # the equal-cost links; the source hands on the first hops of the routers that reach it back
+        # at no cost, and the neighbor itself to the destinations it reaches directly
+        successors = {}
+        hops = {dest: set() for dest in routes}
+        for router, (dist, hop) in routes.items():
+            for dest, cost in self.graph.links(router):
+                route = routes.get(dest)
+                if route is not None and dist + cost == route[0]:
+                    successors.setdefault(router, []).append(dest)
+                    if router == source:
+                        hops[dest].add(dest)
+        queue = collections.deque(sorted(routes, key=lambda node: routes[node][0]))
+        queued = set(queue)
+        while queue:
+            router = queue.popleft()
+            queued.discard(router)
+            first_hops = hops[router]
+            for dest in successors.get(router, ()):
+                if not first_hops <= hops[dest]:
+                    hops[dest] |= first_hops
+                    if dest not in queued:
+                        queued.add(dest)
+                        queue.append(dest)
+        hops[source] = set()
+        return {dest: tuple(sorted(first_hops)) for dest, first_hops in hops.items()}
+
+    def _count(self, path, start):
+        self.stats[path] += 1
+        self.stats[path + '_time'] += time.perf_counter() - start
+
+    def _set_parent(self, node, parent):
+        old = self.parent.pop(node, None)
+        if old is not None:
+            self.children[old].discard(node)
+        if parent is not None:
+            self.parent[node] = parent
+            self.children.setdefault(parent, set()).add(node)
+
+    def _best_incoming(self, node, exclude=()):
+        #cheapest (cost, parent) into node from settled routers outside exclude
+        best = None
+        for router, cost in self.graph.incoming_links(node):
+            if router in self.routes and router not in exclude:
+                dist = self.routes[router][0] + cost
+                if best is None or dist < best[0]:
+                    best = (dist, router)
+        return best
+
+    def _first_hop(self, node, parent):
+        return node if parent == self.source else self.routes[parent][1]
+
+    def _update_stubs(self, stubs):
+        touched = set()
+        for stub in stubs:
+            old = self.routes.pop(stub, None)
+            best = self._best_incoming(stub)
+            if best is None:
+                self._set_parent(stub, None)
+            else:
+                dist, parent = best
+                self.routes[stub] = (dist, self._first_hop(stub, parent))
+                self._set_parent(stub, parent)
+            if self.routes.get(stub) != old:
+                touched.add(stub)
+        return touched
+
+    def _repair(self, roots):
+        #drop the subtrees under roots and re-settle them from their intact surroundings
+        affected = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node not in affected:
+                affected.add(node)
+                stack.extend(self.children.get(node, ()))
+        old = {node: self.routes.pop(node, None) for node in affected}
+        heap = []
+        for node in affected:
+            self._set_parent(node, None)
+            best = self._best_incoming(node, affected)
+            if best is not None:
+                heap.append((best[0], node, best[1]))
+        # improve: a node re-settled over a link that just got cheaper can end up closer than before,
+        # and then has to pass that on to neighbors outside the subtree
+        improved = self._settle(heap, improve=True) - affected
+        return {node for node in affected if self.routes.get(node) != old[node]} | improved
+
+    def _settle(self, heap, improve=False):
+        """Dijkstra from the (dist, node, parent) entries in heap, returns the nodes it settled.
+
+        Normally nodes that already have a route are left alone (full runs, repairs). With improve,
+        a node is re-settled whenever the new distance beats its current route.
+        """
+        heapq.heapify(heap)
+        touched = set()
+        routes = self.routes
+        while heap:
+            dist, node, parent = heapq.heappop(heap)
+            current = routes.get(node)
+            if current is not None and (not improve or current[0] <= dist):
+                continue
+            routes[node] = (dist, node if parent is None else self._first_hop(node, parent))
+            self._set_parent(node, parent)
+            touched.add(node)
+            for neighbor, cost in self.graph.links(node):
+                other = routes.get(neighbor)
+                if other is None or (improve and dist + cost < other[0]):
+                    heapq.heappush(heap, (dist + cost, neighbor, node))
+        return touched
+
+
+# All-pairs routing for a whole network at once (compute_routing_tables in changed_version.py).
+#
+# The graph is frozen once into integer-indexed tuples and shared by every worker, each worker runs
+# SPF for a chunk of sources and sends back two compact int arrays per source (cost and first hop
+# index) rather than dicts, which keeps both the pickling and the gathered result small.
+
+def freeze_graph(graph):
+    """Immutable, integer-indexed copy of a {node: {neighbor: cost}} graph: (names, index, adjacency)."""
+    names = list(graph)
+    index = {name: i for i, name in enumerate(names)}
+    for adjacency in graph.values():
+        for neighbor, cost in links_of(adjacency):
+            if neighbor not in index:
+                index[neighbor] = len(names)
+                names.append(neighbor)
+    adjacency = [()] * len(names)
+    for node, links in graph.items():
+        adjacency[index[node]] = tuple((index[neighbor], cost) for neighbor, cost in links_of(links))
+    return tuple(names), index, tuple(adjacency)
+
+
+def spf_indexed(adjacency, source):
+    #shortest_paths over a frozen adjacency: (costs, first hop indexes) arrays, -1 where unreachable
+    n = len(adjacency)
+    dist = [-1] * n
+    hop = [-1] * n
+    best = [sys.maxsize] * n
+    parent = [source] * n
+    best[source] = 0
+    hop[source] = source
+    heap = [(0, source)]
+    pop, push = heapq.heappop, heapq.heappush
+    while heap:
+        d, node = pop(heap)
+        if dist[node] >= 0:
+            continue
+        dist[node] = d
+        # parents settle first, so the first hop is inherited rather than carried in every heap entry
+        if node != source:
+            hop[node] = node if parent[node] == source else hop[parent[node]]
+        for neighbor, cost in adjacency[node]:
+            new_dist = d + cost
+            if new_dist < best[neighbor]:
+                best[neighbor] = new_dist
+                parent[neighbor] = node
+                push(heap, (new_dist, neighbor))
+    return array('q', dist), array('l', hop)
+
+
+class RoutingTables:
+    """Routing tables of many sources over one frozen graph, kept as int arrays per source.
+
+    tables[source] builds that source's {dest: (cost, first_hop)} dict on demand.
+    """
+
+    def __init__(self, names, index):
+        self.names = names
+        self.index = index
+        self.arrays = {}
+
+    def __getitem__(self, source):
+        costs, hops = self.arrays[self.index[source]]
+        names = self.names
+        return {names[i]: (cost, names[hops[i]]) for i, cost in enumerate(costs) if cost >= 0}
+
+    def __contains__(self, source):
+        return self.index.get(source) in self.arrays
+
+    def __len__(self):
+        return len(self.arrays)
+
+    def __iter__(self):
+        return (self.names[i] for i in self.arrays)
+
+
+_shared_adjacency = None
+
+def _init_worker(adjacency):
+    global _shared_adjacency
+    _shared_adjacency = adjacency
+
+def _spf_chunk(sources):
+    return [(source,) + spf_indexed(_shared_adjacency, source) for source in sources]
+
+
+def all_routing_tables(graph, sources=None, workers=None, chunk=64):
+    """Routing tables of every source in sources (default: every node with links) as RoutingTables.
+
+    Runs in a ProcessPoolExecutor of workers processes (default os.cpu_count()); workers=1 runs
+    in this process. The frozen graph goes to each worker once, through the pool initializer.
+    """
+    names, index, adjacency = freeze_graph(graph)
+    source_ids = [index[source] for source in (graph if sources is None else sources)]
+    tables = RoutingTables(names, index)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for source in source_ids:
+            tables.arrays[source] = spf_indexed(adjacency, source)
+        return tables
+    chunks = [source_ids[i:i + chunk] for i in range(0, len(source_ids), chunk)]
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(adjacency,)) as pool:
+        for results in pool.map(_spf_chunk, chunks):
+            for source, costs, hops in results:
+                tables.arrays[source] = (costs, hops)
+    return tables
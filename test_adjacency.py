@@ -0,0 +1,163 @@
+#Adjacency state machine of LinkStateRouter: attempt -> up on a hello ACK, attempt/up -> down when a
+#dead interval passes without hellos, down -> init on a hello, init -> up on an ACK, and an LSA goes
+#out exactly when a transition changes what the router advertises. One router with two neighbors,
+#on a fake clock: call_later and the hello/dead TimerWheel run only when the test advances time.
+
+import heapq
+import itertools
+
+from linkstate import LinkStateRouter
+from packet import PacketView, create_hello_packet, lsa_links, pack_addr
+from timerwheel import TimerWheel
+
+HELLO, DEAD = 1.0, 4.0
+
+
+class Neighbor:
+    is_router = True
+
+    def __init__(self, name, ip):
+        self.name = name
+        self.ip = ip
+
+
+class Link:
+    def __init__(self, node1, node2, bw):
+        self.params = {'bw': bw}
+        self.intf1 = Interface(f"{node1.name}-{node2.name}", node1, self)
+        self.intf2 = Interface(f"{node2.name}-{node1.name}", node2, self)
+
+
+class Interface:
+    def __init__(self, name, node, link):
+        self.name = name
+        self.node = node
+        self.link = link
+        self.params = link.params
+
+
+class FakeClockRouter(LinkStateRouter):
+    """LinkStateRouter whose clock, call_later and timers only move in advance()."""
+
+    def __init__(self, name, ip):
+        super().__init__(name, ip)
+        self.now = 0.0
+        self.events = []
+        self.order = itertools.count()
+        self.intfs = []
+        self.sent = []
+        self.hello_interval = HELLO
+        self.dead_interval = DEAD
+        self.refresh_interval = 0
+        self.max_age = 0
+
+    def intfList(self):
+        return self.intfs
+
+    def send(self, intf, packet):
+        self.sent.append((intf.name, bytes(packet)))
+
+    def call_later(self, delay, callback, *args):
+        heapq.heappush(self.events, (self.now + delay, next(self.order), callback, args))
+
+    def clock(self):
+        return self.now
+
+    def advance(self, until):
+        #run call_later events and timers due up to until, in time order
+        while self.events and self.events[0][0] <= until:
+            self.now, _, callback, args = heapq.heappop(self.events)
+            self.timers.advance(self.now)
+            callback(*args)
+        self.now = until
+        self.timers.advance(until)
+
+    def take_sent(self):
+        sent, self.sent = self.sent, []
+        return sent
+
+    def lsas(self):
+        #{neighbor: cost} of every LSA sent since the last call, one per LSA whatever the interfaces
+        lsas = []
+        for _, packet in self.take_sent():
+            view = PacketView(packet)
+            if view.type == 5 and (not lsas or lsas[-1][0] != view.LSSeq):
+                lsas.append((view.LSSeq, dict(lsa_links(view.payload))))
+        return [links for _, links in lsas]
+
+
+def network():
+    router = FakeClockRouter('r1', '10.0.0.1')
+    b, c = Neighbor('r2', '10.0.0.2'), Neighbor('r3', '10.0.0.3')
+    for neighbor, bw in ((b, 10), (c, 20)):
+        router.intfs.append(Link(router, neighbor, bw).intf1)
+    router.start_timers(TimerWheel(0.01), offset=0.5)
+    router.send_lsa(0, router.lsa_ttl)
+    return router, b, c
+
+
+B, C = pack_addr('10.0.0.2'), pack_addr('10.0.0.3')
+
+
+def hear(router, neighbor, ack=False):
+    intf = next(intf for intf in router.intfs if intf.link.intf2.node is neighbor)
+    router.receive_packet(create_hello_packet(1, neighbor.ip, ack), intf)
+
+
+def test_configured_neighbors_start_in_attempt_and_are_advertised():
+    router, b, c = network()
+    assert router.adjacencies == {B: 'attempt', C: 'attempt'}
+    assert router.lsas() == [{B: 10, C: 20}]
+    # hellos go out on every router interface, every hello interval
+    router.advance(0.5 + HELLO)
+    hellos = [(name, PacketView(packet).type) for name, packet in router.take_sent()]
+    assert hellos == [('r1-r2', 1), ('r1-r3', 1)] * 2
+
+
+def test_hello_is_answered_and_ack_brings_the_adjacency_up():
+    router, b, c = network()
+    router.take_sent()
+    hear(router, b)
+    # attempt is left alone by a plain hello, the ACK goes back out the link it came in on
+    assert router.adjacencies[B] == 'attempt'
+    assert [(name, PacketView(packet).type) for name, packet in router.take_sent()] == [('r1-r2', 2)]
+    hear(router, b, ack=True)
+    assert router.adjacencies[B] == 'up'
+    # attempt and up are both advertised, nothing to tell the others
+    assert router.lsas() == []
+
+
+def test_dead_interval_takes_the_adjacency_down():
+    router, b, c = network()
+    router.lsas()
+    router.advance(0.5 + DEAD - 0.1)
+    hear(router, b, ack=True)
+    router.lsas()
+    # c never answered: down at its first dead interval, b's timer was pushed back by the ACK
+    router.advance(0.5 + DEAD)
+    assert router.adjacencies == {B: 'up', C: 'down'}
+    assert router.lsas() == [{B: 10}]
+    router.advance(0.5 + 2 * DEAD - 0.1 - 0.01)
+    assert router.adjacencies[B] == 'up' and router.lsas() == []
+    router.advance(0.5 + 2 * DEAD - 0.1)
+    assert router.adjacencies[B] == 'down'
+    assert router.lsas() == [{}]
+
+
+def test_down_goes_through_init_before_up():
+    router, b, c = network()
+    router.advance(0.5 + DEAD)
+    assert router.adjacencies[C] == 'down'
+    router.lsas()
+    # c hears us no better than before: not advertised until it acknowledges our hello
+    hear(router, c)
+    assert router.adjacencies[C] == 'init'
+    assert router.lsas() == []
+    hear(router, c, ack=True)
+    assert router.adjacencies[C] == 'up'
+    assert router.lsas() == [{C: 20}]
+    # the hello and the ACK both pushed c's dead timer back
+    router.advance(router.now + DEAD - 0.01)
+    assert router.adjacencies[C] == 'up'
+    router.advance(router.now + 0.01)
+    assert router.adjacencies[C] == 'down' and router.lsas() == [{}]
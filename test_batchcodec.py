@@ -0,0 +1,103 @@
+#Batch codec against the per-packet codec of packet.py: the NumPy header dtypes read every layout
+#like PacketView does, batch encoding makes the same bytes as create_*_packet, and framing errors in
+#truncated or odd-length captures are caught rather than read past.
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import batchcodec
+from packet import (PACKET_LAYOUTS, PacketView, create_LSA_packet, create_LSU_packets, create_hello_packet,
+                    create_multicast_packet, create_unicast_packet, encode_lsa_links, forward_unicast_in_place,
+                    pack_addr)
+
+LSA = create_LSA_packet(7, 255, '10.0.0.2', 3, pack_addr('10.0.0.2'), 70000, 5, encode_lsa_links({pack_addr('10.0.0.3'): 9}))
+SAMPLES = {
+    1: create_hello_packet(5, '10.0.0.2'),
+    2: create_hello_packet(6, '10.0.0.3', ack=True),
+    3: create_multicast_packet(2, 10, 2, '10.0.0.9', '10.0.0.10', '10.0.0.11', b'abc'),
+    4: create_unicast_packet(200, 64, '10.1.2.3', '10.0.0.9', b'hello'),
+    5: LSA,
+    6: next(create_LSU_packets(1, 9, '10.0.0.3', [LSA, LSA])),
+}
+# payload lengths 0, odd and even, one per packet
+PAYLOADS = [b'', b'x', b'ab', b'abc' * 51, bytes(range(256)), b'\xff' * 7]
+
+
+def as_keys(header):
+    #PacketView header with dotted addresses turned into address keys, like the dtypes hold them
+    return {name: pack_addr(value) if isinstance(value, str) else value for name, value in header.items()}
+
+
+@pytest.mark.parametrize('packet_type', sorted(PACKET_LAYOUTS))
+def test_header_dtype_reads_every_layout(packet_type):
+    packet = SAMPLES[packet_type]
+    dtype = batchcodec.header_dtype(PACKET_LAYOUTS[packet_type])
+    buf, offsets = np.frombuffer(packet * 3, dtype=np.uint8), np.arange(4) * len(packet)
+    headers = batchcodec.decode(buf, offsets, dtype)
+    expected = as_keys(PacketView(packet).header())
+    for header in headers:
+        assert {name: int(header[name]) for name in dtype.names} == expected
+    assert batchcodec.valid(headers, offsets, packet_type).all()
+    assert batchcodec.split_packets(buf).tolist() == offsets.tolist()
+
+
+def test_encode_unicast_matches_create_unicast_packet():
+    n = len(PAYLOADS)
+    seqs, ttls = np.arange(n) * 40, np.array([0, 1, 2, 64, 255, 9])
+    sources = [f"10.1.0.{i}" for i in range(n)]
+    destinations = [pack_addr('10.0.0.9'), '10.0.0.10'] * (n // 2)
+    buf, offsets = batchcodec.encode_unicast(seqs, ttls, sources, destinations, PAYLOADS)
+    expected = [create_unicast_packet(int(seqs[i]), int(ttls[i]), sources[i], ['10.0.0.9', '10.0.0.10'][i % 2], PAYLOADS[i])
+                for i in range(n)]
+    assert batchcodec.packets(buf, offsets) == expected
+    headers = batchcodec.decode(buf, offsets)
+    for header, packet in zip(headers, expected):
+        assert {name: int(header[name]) for name in headers.dtype.names} == as_keys(PacketView(packet).header())
+    # one payload for every packet takes the equal-size path
+    buf, offsets = batchcodec.encode_unicast(1, 64, '10.0.0.1', '10.0.0.9', b'odd', n=5)
+    assert batchcodec.packets(buf, offsets) == [create_unicast_packet(1, 64, '10.0.0.1', '10.0.0.9', b'odd')] * 5
+
+
+def test_encode_multicast_matches_create_multicast_packet():
+    buf, offsets = batchcodec.encode_multicast(3, 10, 2, '10.0.0.9', '10.0.0.10', ['10.0.0.11', '10.0.0.12'],
+                                               [b'', b'xyz'])
+    assert batchcodec.packets(buf, offsets) == [
+        create_multicast_packet(3, 10, 2, '10.0.0.9', '10.0.0.10', '10.0.0.11', b''),
+        create_multicast_packet(3, 10, 2, '10.0.0.9', '10.0.0.10', '10.0.0.12', b'xyz')]
+
+
+def test_decrement_ttl_and_select_match_forward_unicast_in_place():
+    ttls = np.array([0, 1, 2, 64, 255, 9])
+    buf, offsets = batchcodec.encode_unicast(0, ttls, '10.0.0.1', '10.0.0.9', PAYLOADS)
+    expected = []
+    for packet in batchcodec.packets(buf, offsets):
+        packet = bytearray(packet)
+        if forward_unicast_in_place(packet):
+            expected.append(bytes(packet))
+    alive = batchcodec.decrement_ttl(buf, offsets)
+    assert batchcodec.packets(*batchcodec.select(buf, offsets, alive)) == expected
+
+
+def test_truncated_and_odd_length_captures():
+    packet = SAMPLES[4]
+    capture = packet * 2 + packet[:5]
+    with pytest.raises(ValueError):
+        batchcodec.split_packets(np.frombuffer(capture, dtype=np.uint8))
+    # a length field pointing past the end of the buffer
+    with pytest.raises(ValueError):
+        batchcodec.split_packets(np.frombuffer(packet[:-1], dtype=np.uint8))
+    # framing given from outside: the short packet decodes without reading past the buffer and is
+    # masked off, as is one whose length field disagrees with its framing
+    buf = np.frombuffer(packet + packet + b'!' + packet[:4], dtype=np.uint8)
+    assert len(buf) % 2 == 1
+    offsets = np.array([0, len(packet), 2 * len(packet) + 1, len(buf)])
+    headers = batchcodec.decode(buf, offsets)
+    assert batchcodec.valid(headers, offsets, 4).tolist() == [True, False, False]
+    assert int(headers[0]['dst']) == pack_addr('10.0.0.9')
+
+
+def test_empty_batch():
+    buf, offsets = batchcodec.encode_unicast([], [], [], [], [])
+    assert len(buf) == 0 and offsets.tolist() == [0]
+    assert len(batchcodec.decode(buf, offsets)) == 0
@@ -0,0 +1,42 @@
+#InterfaceEndpoint: packets sent before the socket is up or while it is paused wait in the backlog,
+#in order, and go out once the transport takes them.
+
+from datapath import InterfaceEndpoint
+
+PEER = ('10.0.0.2', 5005)
+
+
+class Transport:
+    def __init__(self, endpoint, pause_after=None):
+        self.endpoint = endpoint
+        self.pause_after = pause_after
+        self.sent = []
+
+    def sendto(self, packet, peer):
+        assert peer == PEER
+        self.sent.append(bytes(packet))
+        if len(self.sent) == self.pause_after:
+            self.endpoint.pause_writing()
+
+
+def test_backlog_goes_out_on_connection_made():
+    endpoint = InterfaceEndpoint(None, None, PEER, queue_limit=2)
+    assert endpoint.send(b'a') and endpoint.send(bytearray(b'b')) and not endpoint.send(b'c')
+    transport = Transport(endpoint)
+    endpoint.connection_made(transport)
+    assert transport.sent == [b'a', b'b'] and not endpoint.backlog
+    assert endpoint.send(b'd') and transport.sent[-1] == b'd'
+    assert endpoint.stats == {'rx': 0, 'tx': 3, 'queued': 2, 'drops': 1}
+
+
+def test_backlog_waits_while_paused():
+    endpoint = InterfaceEndpoint(None, None, PEER, queue_limit=8)
+    for packet in (b'a', b'b', b'c'):
+        endpoint.send(packet)
+    transport = Transport(endpoint, pause_after=1)
+    endpoint.connection_made(transport)
+    # paused by the first packet, the rest wait behind it
+    assert transport.sent == [b'a'] and list(endpoint.backlog) == [b'b', b'c']
+    endpoint.send(b'd')
+    endpoint.resume_writing()
+    assert transport.sent == [b'a', b'b', b'c', b'd'] and not endpoint.paused
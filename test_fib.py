@@ -0,0 +1,36 @@
+#FIB construction and forwarding through it: every rebuild has to resolve, and a unicast from s has
+#to reach its destination through the FIBs of every router on the way.
+
+import topogen
+from fib import ForwardingTable, build_routes
+from packet import pack_addr
+from sim import Network
+
+
+def test_build_routes_skips_destinations_without_interface():
+    r2, r3, d1 = pack_addr('10.0.0.3'), pack_addr('10.0.0.4'), pack_addr('10.0.0.9')
+    routing_table = {r2: (10, r2), d1: (20, r2), r3: (10, r3)}
+    routes = dict(build_routes(routing_table, {r2: 'r1-eth1'}))
+    assert routes == {r2: 'r1-eth1', d1: 'r1-eth1'}
+
+
+def test_rebuild_publishes_a_new_snapshot():
+    fib = ForwardingTable()
+    d1 = pack_addr('10.0.0.9')
+    assert fib.rebuild([(d1, 'eth0')]) == 1
+    old = fib.snapshot
+    fib.rebuild([])
+    assert old[1] == {d1: 'eth0'} and d1 not in fib and fib.lookup(d1) is None
+
+
+def test_unicast_reaches_every_destination():
+    for flat in (True, False):
+        spec = topogen.mytopo(flat=flat)
+        net = Network.from_spec(spec)
+        net.start()
+        net.run()
+        for dest in spec.destinations:
+            net.send(spec.source, dest, b'probe')
+        net.run()
+        assert all(net.hosts[dest].received == 1 for dest in spec.destinations)
+        assert all(len(router.fib) for router in net.routers.values())
@@ -0,0 +1,73 @@
+#ForwardingEngine: every packet comes back out of the interface its FIB says with TTL - 1, flows in
+#order, a FIB published between two packets is used from the second one on, and a full egress queue
+#only drops traffic for its own interface.
+
+import time
+
+from forwarding import ForwardingEngine
+from packet import PacketView, create_unicast_packet, pack_addr
+
+DESTINATIONS = ('10.0.0.9', '10.0.0.10', '10.0.0.11')
+
+
+def packets(count):
+    #the payload numbers the packets
+    return [create_unicast_packet(i % 256, 8, f"172.16.0.{i % 7}", DESTINATIONS[i % 3], b"%06d" % i) for i in range(count)]
+
+
+def received(out):
+    def send(intf, packet):
+        view = PacketView(bytes(packet))
+        out.append((intf, view.header(), int(view.payload)))
+    return send
+
+
+def test_forward_returns_once_every_packet_is_out():
+    engine = ForwardingEngine(['eth0', 'eth1'], workers=2, batch=16, queue_limit=64).start()
+    try:
+        engine.publish([(pack_addr(DESTINATIONS[0]), 'eth0'), (pack_addr(DESTINATIONS[1]), 'eth1')])
+        out = []
+        sent = engine.forward(packets(1000), received(out))
+    finally:
+        stats = engine.stop()
+    assert sent == len(out) == stats['forwarded'] == 667 and stats['no_route'] == 333
+    for intf, header, i in out:
+        assert intf == ('eth0' if header['dst'] == DESTINATIONS[0] else 'eth1') and header['TTL'] == 7
+    for flow in {(header['src'], header['dst']) for intf, header, i in out}:
+        numbers = [i for intf, header, i in out if (header['src'], header['dst']) == flow]
+        assert numbers == sorted(numbers)
+
+
+def test_published_fib_applies_to_later_packets():
+    engine = ForwardingEngine(['eth0', 'eth1'], workers=3).start()
+    try:
+        out = []
+        send = lambda intf, packet: out.append(intf)
+        engine.publish([(pack_addr(dest), 'eth0') for dest in DESTINATIONS])
+        engine.forward(packets(300)[:150], send)
+        engine.publish([(pack_addr(dest), 'eth1') for dest in DESTINATIONS])
+        engine.forward(packets(300)[150:], send)
+    finally:
+        stats = engine.stop()
+    assert out == ['eth0'] * 150 + ['eth1'] * 150
+    assert [worker['generation'] for worker in stats['workers']] == [2, 2, 2]
+
+
+def test_congested_interface_only_drops_its_own_traffic():
+    engine = ForwardingEngine(['eth0', 'eth1'], workers=1, queue_limit=32).start()
+    try:
+        engine.publish([(pack_addr(DESTINATIONS[0]), 'eth0'), (pack_addr(DESTINATIONS[1]), 'eth1')])
+        # nothing is drained while the workers run: eth0 gets 120 packets, eth1 20
+        for i, packet in enumerate(packets(360)):
+            if i % 3 == 2 or (i % 3 == 1 and i >= 60):
+                continue
+            while not engine.submit(packet):
+                time.sleep(0.001)
+        engine.flush()
+        while not all(ring.idle() for ring in engine.rings):
+            time.sleep(0.001)
+        out = []
+        engine.drain(lambda intf, packet: out.append(intf))
+    finally:
+        stats = engine.stop()
+    assert out.count('eth0') == 32 and out.count('eth1') == 20 and stats['egress_drops'] == 120 - 32
@@ -0,0 +1,76 @@
+#LinkStateDatabase: which LSAs count as newer, what gets installed, that the store it keeps the links
+#in stays consistent, and that a router re-floods an LSA once and drops every later copy.
+
+import pytest
+
+import topogen
+from lsdb import LinkStateDatabase, SEQ_MOD
+from packet import create_LSA_packet, encode_lsa_links, lsa_links, pack_addr
+from sim import Network
+from spf import IncrementalSPF
+
+R1, R2, R3 = pack_addr('10.0.0.1'), pack_addr('10.0.0.2'), pack_addr('10.0.0.3')
+
+
+@pytest.mark.parametrize('old, seq, newer', (
+    (5, 4, False), (5, 5, False), (5, 6, True), (5, 1000, True),
+    # across the wrap
+    (SEQ_MOD - 1, 0, True), (SEQ_MOD - 2, 3, True), (0, SEQ_MOD - 1, False), (3, SEQ_MOD - 2, False),
+    # half the number space ahead is too far to tell, treated as old
+    (0, SEQ_MOD // 2 - 1, True), (0, SEQ_MOD // 2, False),
+))
+def test_is_newer(old, seq, newer):
+    lsdb = LinkStateDatabase()
+    assert lsdb.is_newer(R1, old)
+    lsdb.install(R1, old, {R2: 1})
+    assert lsdb.is_newer(R1, seq) == newer
+    kind = 'duplicate' if seq == old else 'stale'
+    assert lsdb.stats['received'] == 2 and lsdb.stats[kind] == (not newer)
+
+
+def test_duplicate_is_not_reflooded():
+    net = Network.from_spec(topogen.ring(4, dests=0))
+    net.start()
+    net.run()
+    router = next(iter(net.routers.values()))
+    ingress, *others = router.router_interfaces()
+    origin = pack_addr('10.9.9.9')
+    stats = router.lsdb.stats
+
+    def receive(seq):
+        #copies flooded and (duplicate, stale) counted for one LSA of origin
+        tx = sum(intf.tx_packets for intf in router.intfList())
+        dropped = stats['duplicate'], stats['stale']
+        router.receive_packet(create_LSA_packet(0, 8, '10.9.9.9', 0, origin, seq, 5, encode_lsa_links({R1: 1})), ingress)
+        return (sum(intf.tx_packets for intf in router.intfList()) - tx,
+                (stats['duplicate'] - dropped[0], stats['stale'] - dropped[1]))
+
+    assert receive(SEQ_MOD - 1) == (len(others), (0, 0))
+    assert receive(SEQ_MOD - 1) == (0, (1, 0))
+    assert receive(SEQ_MOD - 2) == (0, (0, 1))
+    # wrapped around, newer again
+    assert receive(0) == (len(others), (0, 0))
+    assert router.lsdb.table[origin]["LSSEQ"] == 0 and router.lsdb.table[origin]["flooded"] == len(others)
+
+
+def test_install_max_cost_lsa():
+    #costs are unsigned 32-bit on the wire, the largest one has to fit the store as well
+    lsdb = LinkStateDatabase()
+    spf = IncrementalSPF(R1, store=lsdb.graph)
+    changes = {R1: lsdb.install(R1, 1, {R2: 1})}
+    changes[R2] = lsdb.install(R2, 1, lsa_links(encode_lsa_links({R1: 1, R3: 0xFFFFFFFF})))
+    spf.links_changed(changes)
+    assert lsdb.links(R2) == {R1: 1, R3: 0xFFFFFFFF}
+    assert dict(lsdb.graph.incoming_links(R3)) == {R2: 0xFFFFFFFF}
+    assert spf.routes[R3] == (1 + 0xFFFFFFFF, R2)
+    assert lsdb.graph.routing_table(R1)[R3] == (1 + 0xFFFFFFFF, R2)
+
+
+@pytest.mark.parametrize('cost', (-1, 1 << 32, 1.5))
+def test_bad_cost_leaves_the_store_unchanged(cost):
+    lsdb = LinkStateDatabase()
+    lsdb.install(R1, 1, {R2: 10})
+    with pytest.raises(ValueError):
+        lsdb.graph.set_row(R1, {R3: 5, R2: cost})
+    assert lsdb.links(R1) == {R2: 10}
+    assert dict(lsdb.graph.incoming_links(R2)) == {R1: 10} and lsdb.graph.incoming_links(R3) == []
@@ -0,0 +1,74 @@
+#Golden wire bytes: the network-order layout (packet.WIRE_ORDER: no padding, big-endian integers,
+#addresses as their 4 bytes) pinned byte for byte for every packet type, including what forwarding
+#and re-flooding change in place, so a faster codec is checked against the exact format.
+
+import pytest
+
+from packet import (create_unicast_packet, create_multicast_packet, create_group_multicast_packet,
+                    create_LSA_packet, create_LSU_packets, create_hello_packet, encode_lsa_links,
+                    decode_lsa_links, lsa_links, read_header, read_data, pack_addr, PacketView,
+                    forward_unicast_in_place, reflood_LSA_in_place)
+
+R2 = pack_addr('10.0.0.2')
+LINKS = {pack_addr('10.0.0.3'): 10, pack_addr('10.0.0.4'): 300}
+GOLDEN_LSA = create_LSA_packet(4, 255, '10.0.0.2', 0, R2, 7, 5, encode_lsa_links(LINKS))
+
+
+def forwarded(packet):
+    buf = bytearray(packet)
+    assert forward_unicast_in_place(buf)
+    return bytes(buf)
+
+
+def reflooded(packet, src):
+    buf = bytearray(packet)
+    assert reflood_LSA_in_place(buf, src)
+    return bytes(buf)
+
+
+# (name, packet built from fixed fields, expected bytes as hex)
+GOLDEN = (
+    ('unicast', lambda: create_unicast_packet(1, 64, '10.0.0.1', '10.0.0.9', b'hi'),
+     '04 00000011 01 40 0a000001 0a000009 6869'),
+    ('multicast', lambda: create_multicast_packet(2, 10, 2, '10.0.0.9', '10.0.0.10', '10.0.0.11', b'x'),
+     '03 00000015 02 0a 02 0a000009 0a00000a 0a00000b 78'),
+    ('group multicast', lambda: create_group_multicast_packet(3, 10, 1, ['10.0.0.9', '10.0.0.10'], b'x'),
+     '03 00000014 03 0a 01 00 0002 0a000009 0a00000a 78'),
+    ('LSA', lambda: create_LSA_packet(4, 255, '10.0.0.2', 0, R2, 7, 5, encode_lsa_links(LINKS)),
+     '05 00000029 04 ff 0a000002 00 0a000002 00000007 05 00000002 0a000003 0000000a 0a000004 0000012c'),
+    ('hello', lambda: create_hello_packet(5, '10.0.0.2'), '01 0000000b 05 01 0a000002'),
+    ('hello ACK', lambda: create_hello_packet(5, '10.0.0.2', ack=True), '02 0000000b 05 01 0a000002'),
+    ('LSU', lambda: next(create_LSU_packets(0, 1, '10.0.0.3', [GOLDEN_LSA, GOLDEN_LSA])),
+     '06 0000005f 00 01 0a000003 0002' + ' 05 00000029 04 ff 0a000002 00 0a000002 00000007 05 00000002'
+     ' 0a000003 0000000a 0a000004 0000012c' * 2),
+    ('unicast forwarded', lambda: forwarded(create_unicast_packet(1, 64, '10.0.0.1', '10.0.0.9', b'hi')),
+     '04 00000011 01 3f 0a000001 0a000009 6869'),
+    ('LSA re-flooded by 10.0.0.3', lambda: reflooded(GOLDEN_LSA, pack_addr('10.0.0.3')),
+     '05 00000029 04 fe 0a000003 01 0a000002 00000007 05 00000002 0a000003 0000000a 0a000004 0000012c'),
+)
+
+
+@pytest.mark.parametrize('name, build, expected', GOLDEN, ids=[name for name, build, expected in GOLDEN])
+def test_golden_bytes(name, build, expected):
+    assert build().hex() == expected.replace(' ', '')
+
+
+def test_golden_lsa_decodes():
+    assert read_header(GOLDEN_LSA) == {'type': 5, 'length': 41, 'seq': 4, 'TTL': 255, 'src': '10.0.0.2', 'hops': 0,
+                                       'advRoute': '10.0.0.2', 'LSSeq': 7, 'CRC': 5}
+    assert decode_lsa_links(read_data(GOLDEN_LSA)) == LINKS
+
+
+def test_golden_group_multicast_decodes():
+    group = PacketView(bytes.fromhex(GOLDEN[2][2]))
+    assert list(group.destinations) == [pack_addr('10.0.0.9'), pack_addr('10.0.0.10')]
+
+
+def test_lsa_links_read_the_packet_in_place():
+    links = {pack_addr(f"172.16.0.{i}"): cost for i, cost in enumerate((1, 300, 1 << 20, 0xFFFFFFFF))}
+    body = bytearray(encode_lsa_links(links))
+    pairs = lsa_links(body)
+    body[8:12] = (7).to_bytes(4, 'big')
+    assert dict(pairs) == {**links, pack_addr('172.16.0.0'): 7}
+    with pytest.raises(ValueError):
+        lsa_links(body[:-1])
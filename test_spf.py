@@ -0,0 +1,156 @@
+#SPF correctness: full and incremental SPF against brute force on random graphs.
+#
+#Costs must match exactly, and every first hop must start a shortest path: it is a neighbor of the
+#source and its link cost plus its own distance to the destination is the destination's cost.
+
+import random
+import sys
+
+import pytest
+
+from graphstore import GraphStore
+from spf import shortest_paths, IncrementalSPF
+
+
+def random_graph(rng, n, degree=3, max_cost=10, stubs=5, min_cost=1):
+    #connected random graph, costs differing per direction like two routers' own LSAs, plus stub
+    #destinations d0.. hanging off random routers
+    graph = {f"r{i}": {} for i in range(n)}
+    names = list(graph)
+    for i in range(1, n):
+        a, b = names[i], names[rng.randrange(i)]
+        graph[a][b], graph[b][a] = rng.randint(min_cost, max_cost), rng.randint(min_cost, max_cost)
+    for _ in range(n * (degree - 2) // 2):
+        a, b = rng.sample(names, 2)
+        graph[a][b], graph[b][a] = rng.randint(min_cost, max_cost), rng.randint(min_cost, max_cost)
+    for i in range(stubs):
+        graph[rng.choice(names)][f"d{i}"] = rng.randint(min_cost, max_cost)
+    return graph
+
+
+def bellman_ford(graph, source):
+    dist = {source: 0}
+    for _ in range(len(graph) + 1):
+        changed = False
+        for node, links in graph.items():
+            if node in dist:
+                for neighbor, cost in links.items():
+                    if dist[node] + cost < dist.get(neighbor, sys.maxsize):
+                        dist[neighbor] = dist[node] + cost
+                        changed = True
+        if not changed:
+            return dist
+    return dist
+
+
+def first_hops(graph, source, dest, cost, distances_from):
+    #every neighbor of source that starts a shortest path to dest
+    return {hop for hop, link in graph.get(source, {}).items()
+            if dest in distances_from(hop) and link + distances_from(hop)[dest] == cost}
+
+
+def check(graph, source, routes, multipath=None):
+    expected = bellman_ford(graph, source)
+    assert {dest: cost for dest, (cost, hop) in routes.items()} == expected
+    cache = {}
+
+    def distances_from(node):
+        if node not in cache:
+            cache[node] = bellman_ford(graph, node)
+        return cache[node]
+
+    for dest, (cost, hop) in routes.items():
+        if dest == source:
+            assert (cost, hop) == (0, source)
+            continue
+        valid = first_hops(graph, source, dest, cost, distances_from)
+        assert hop in valid, f"first hop {hop} of {dest} is not on a shortest path"
+        if multipath is not None:
+            assert set(multipath[dest]) == valid
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_full_spf_matches_bellman_ford(seed):
+    rng = random.Random(seed)
+    graph = random_graph(rng, 80)
+    for source in rng.sample(sorted(graph), 4):
+        check(graph, source, shortest_paths(graph, source))
+        spf = IncrementalSPF(source, graph)
+        check(graph, source, spf.routes, spf.multipath())
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_spf_matches_full_under_churn(seed):
+    rng = random.Random(seed)
+    graph = random_graph(rng, 40)
+    names = sorted(name for name in graph if name.startswith('r'))
+    source = names[0]
+    spf = IncrementalSPF(source, graph)
+    for step in range(200):
+        router = rng.choice(names)
+        links = dict(graph.get(router, {}))
+        kind = rng.random()
+        if kind < 0.2:
+            links[f"d{rng.randrange(8)}"] = rng.randint(1, 10)
+        elif kind < 0.4 and links:
+            del links[rng.choice(sorted(links))]
+        elif kind < 0.6:
+            links[rng.choice(names)] = rng.randint(1, 10)
+        elif kind < 0.95 and links:
+            links[rng.choice(sorted(links))] = rng.randint(1, 10)
+        else:
+            # the router's LSA is withdrawn (max-age), all its links go at once
+            links = {}
+        links.pop(router, None)
+        graph[router] = links
+        spf.update_links(router, links)
+        check(graph, source, spf.routes, spf.multipath() if step % 20 == 0 else None)
+    assert spf.stats['incremental'] + spf.stats['stub'] > 0
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_multipath_with_zero_cost_links(seed):
+    #a link with bw < 1 is advertised at cost 0, which puts routers at the same distance as the ones
+    #they are reached from, or lets them reach each other at no cost
+    rng = random.Random(seed)
+    graph = random_graph(rng, 30, degree=4, max_cost=3, min_cost=0)
+    names = sorted(name for name in graph if name.startswith('r'))
+    spf = IncrementalSPF(names[0], graph)
+    check(graph, names[0], spf.routes, spf.multipath())
+    for _ in range(20):
+        router = rng.choice(names)
+        links = {neighbor: rng.randint(0, 3) for neighbor in rng.sample(names, 3) if neighbor != router}
+        graph[router] = links
+        spf.update_links(router, links)
+        check(graph, names[0], spf.routes, spf.multipath())
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batched_changes_on_a_shared_store(seed):
+    #what a throttled router does: several LSAs land in the LSDB's store before one SPF run repairs
+    #the tree for all of them, each reported with the links SPF last saw
+    rng = random.Random(seed)
+    graph = random_graph(rng, 40)
+    names = sorted(name for name in graph if name.startswith('r'))
+    store = GraphStore.from_graph(graph, incoming=True)
+    spf = IncrementalSPF(names[0], store=store)
+    check(graph, names[0], spf.routes)
+    for _ in range(40):
+        pending = {}
+        for router in rng.sample(names, 5):
+            links = {neighbor: rng.randint(1, 10) for neighbor in rng.sample(names + ['d0', 'd1'], rng.randrange(4))}
+            links.pop(router, None)
+            pending.setdefault(router, store.row(router))
+            graph[router] = links
+            store.set_row(router, links)
+        spf.links_changed(pending)
+        check(graph, names[0], spf.routes, spf.multipath())
+
+
+def test_reset_after_changes_matches_full():
+    rng = random.Random(7)
+    graph = random_graph(rng, 50)
+    spf = IncrementalSPF('r0', graph)
+    graph = random_graph(rng, 50)
+    spf.reset(graph)
+    check(graph, 'r0', spf.routes)
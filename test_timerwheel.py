@@ -0,0 +1,104 @@
+#TimerWheel: every timer fires exactly at the tick it is due, whatever level it was placed on, and
+#cancelled timers never fire. A small wheel (4 slots, 3 levels, 64
+#ticks in range) crosses every level boundary and the top level's range within a few hundred ticks.
+
+import heapq
+import random
+
+import pytest
+
+from timerwheel import TimerWheel
+
+
+def small_wheel(start=0.0):
+    return TimerWheel(resolution=1.0, slots=4, levels=3, start=start)
+
+
+@pytest.mark.parametrize('start', (0, 3, 15, 63, 100))
+def test_fires_at_the_exact_tick(start):
+    wheel = small_wheel(start)
+    fired = []
+    # 1-3 in level 0, 4-15 level 1, 16-63 level 2, beyond 64 clamped to the top level
+    delays = list(range(1, 300)) + [1000]
+    for delay in delays:
+        wheel.schedule(delay, lambda delay=delay: fired.append((delay, wheel.tick)))
+    for now in range(start + 1, start + 1001):
+        wheel.advance(now)
+    assert fired == [(delay, start + delay) for delay in delays]
+    assert len(wheel) == 0 and wheel.stats['fired'] == len(delays)
+
+
+def test_delays_round_up_to_whole_ticks():
+    wheel = TimerWheel(resolution=0.01)
+    fired = []
+    for delay in (0, 0.001, 0.01, 0.011, 0.02):
+        wheel.schedule(delay, lambda delay=delay: fired.append((delay, wheel.tick)))
+    wheel.advance(0.05)
+    assert fired == [(0, 1), (0.001, 1), (0.01, 1), (0.011, 2), (0.02, 2)]
+
+
+def test_cancel():
+    wheel = small_wheel()
+    fired = []
+    timers = [wheel.schedule(delay, fired.append, delay) for delay in (2, 10, 40, 200)]
+    assert wheel.cancel(timers[1]) and wheel.cancel(timers[3])
+    assert not wheel.cancel(timers[1]) and not wheel.cancel(None)
+    assert len(wheel) == 2 and not timers[1].active and timers[2].active
+    wheel.advance(300)
+    assert fired == [2, 40] and not wheel.cancel(timers[0])
+    assert wheel.stats['cancelled'] == 2
+
+
+def test_advance_in_one_step_fires_in_expiry_order():
+    wheel = small_wheel()
+    fired = []
+    for delay in (70, 5, 17, 1, 5, 300):
+        wheel.schedule(delay, fired.append, delay)
+    assert wheel.advance(1000) == 6
+    assert fired == [1, 5, 5, 17, 70, 300]
+
+
+def test_callbacks_scheduling_timers():
+    #a timer due in the tick that is firing lands in the next one
+    wheel = small_wheel()
+    fired = []
+
+    def again(n):
+        fired.append(wheel.tick)
+        if n:
+            wheel.schedule(0, again, n - 1)
+
+    wheel.schedule(3, again, 4)
+    wheel.advance(100)
+    assert fired == [3, 4, 5, 6, 7]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_a_heap_under_random_schedule_and_cancel(seed):
+    rng = random.Random(seed)
+    wheel = small_wheel()
+    heap = []
+    pending = {}
+    fired = []
+    order = 0
+    for now in range(1, 2000):
+        for _ in range(rng.randrange(4)):
+            order += 1
+            due = now - 1 + max(1, rng.choice((rng.randrange(1, 5), rng.randrange(1, 70), rng.randrange(1, 400))))
+            pending[order] = wheel.schedule(due - wheel.tick, fired.append, order)
+            heapq.heappush(heap, (due, order))
+        if pending and rng.random() < 0.3:
+            victim = rng.choice(sorted(pending))
+            assert wheel.cancel(pending.pop(victim))
+        wheel.advance(now)
+        expected = []
+        while heap and heap[0][0] <= now:
+            due, key = heapq.heappop(heap)
+            if key in pending:
+                expected.append(key)
+                del pending[key]
+        # one tick per advance; within a tick, timers cascaded from a higher level come after ones
+        # placed straight into level 0
+        assert sorted(fired) == sorted(expected), now
+        fired.clear()
+    assert len(wheel) == len(pending)
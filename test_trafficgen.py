@@ -0,0 +1,44 @@
+#TrafficSink: duplicates and reordering per flow from a bounded window below the highest sequence
+#number, and the report adds up the same way the generator's does.
+
+from trafficgen import TrafficGenerator, TrafficSink, report
+
+
+def probes(count, destinations=('10.0.0.9',)):
+    generator = TrafficGenerator('10.0.0.1', list(destinations))
+    return generator, [generator.packet(float(i)) for i in range(count)]
+
+
+def test_duplicates_and_reordering_within_the_window():
+    generator, packets = probes(10)
+    sink = TrafficSink(lambda: 100.0, window=16)
+    for i in (0, 2, 1, 2, 5, 3, 9, 4, 1, 6, 7, 8):
+        sink.receive_packet(packets[i])
+    # the second 2 and 1 are duplicates; 1, 3, 4, 6, 7 and 8 arrived after a higher number
+    assert (sink.received, sink.duplicates, sink.reordered, sink.late) == (10, 2, 6, 0)
+    result = report(generator.report(), {'d1': sink.report()})
+    assert result['lost'] == 0 and result['flows'] == {'0': {'sent': 10, 'received': 10}}
+
+
+def test_window_memory_stays_bounded():
+    generator, packets = probes(100)
+    sink = TrafficSink(lambda: 100.0, window=16)
+    for packet in packets[10:]:
+        sink.receive_packet(packet)
+    assert sink.window_seen[0].bit_length() <= 16
+    # below the window: no longer told apart from a duplicate, counted as late
+    sink.receive_packet(packets[5])
+    sink.receive_packet(packets[5])
+    assert (sink.received, sink.duplicates, sink.late) == (92, 0, 2)
+    # inside it duplicates are still caught
+    sink.receive_packet(packets[90])
+    assert sink.duplicates == 1 and sink.report()['flows'] == {'0': 92}
+
+
+def test_flows_are_tracked_apart():
+    generator, packets = probes(6, ('10.0.0.9', '10.0.0.10'))
+    sink = TrafficSink(lambda: 100.0)
+    for packet in reversed(packets):
+        sink.receive_packet(packet)
+    # each flow's first arrival is its highest number, the other two are reordered
+    assert sink.report()['flows'] == {'1': 3, '0': 3} and sink.reordered == 4 and sink.duplicates == 0
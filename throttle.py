@@ -0,0 +1,78 @@
+#Rate limits for the control plane: SPF hold-down with exponential backoff, token buckets for floods.
+#
+#Both are plain state machines that take the current time as an argument, the router owns the clock
+#and the timers (LinkStateRouter.clock / call_later), so they run the same under the simulator,
+#asyncio and Mininet.
+
+
+class SPFThrottle:
+    """When to run SPF after an LSA changed the map table, with exponential backoff under churn.
+
+    The first change after a quiet period runs SPF initial seconds later. A change arriving within
+    the hold time of the last run waits for the hold to expire, and the hold doubles, from
+    incremental up to max_hold, every time that happens. Once nothing has changed for max_hold
+    seconds the hold is back at incremental. All changes that arrive while a run is scheduled are
+    handled by that one run.
+
+    stats counts triggers (changes reported), runs, deferred (runs pushed past initial by the hold)
+    and coalesced (triggers folded into an already scheduled run).
+    """
+
+    def __init__(self, initial=0.005, incremental=0.05, max_hold=1.0):
+        self.initial = initial
+        self.incremental = incremental
+        self.max_hold = max_hold
+        self.hold = incremental
+        self.last_run = None
+        self.scheduled = False
+        self.stats = {'triggers': 0, 'runs': 0, 'deferred': 0, 'coalesced': 0}
+
+    def request(self, now):
+        """Report a change at now: seconds until SPF should run, or None if a run is already scheduled."""
+        self.stats['triggers'] += 1
+        if self.scheduled:
+            self.stats['coalesced'] += 1
+            return None
+        self.scheduled = True
+        if self.last_run is None or now - self.last_run >= self.max_hold:
+            self.hold = self.incremental
+            return self.initial
+        delay = max(self.initial, self.last_run + self.hold - now)
+        if delay > self.initial:
+            self.stats['deferred'] += 1
+        self.hold = min(self.hold * 2, self.max_hold)
+        return delay
+
+    def ran(self, now):
+        self.scheduled = False
+        self.last_run = now
+        self.stats['runs'] += 1
+
+
+class TokenBucket:
+    """rate tokens per second, at most burst of them saved up; starts full."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = None
+
+    def refill(self, now):
+        if self.updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now):
+        #take a token if there is one, True if we got it
+        self.refill(now)
+        # a wait() later the bucket can be short of a token by a rounding error, that counts as full
+        if self.tokens >= 1 - 1e-9:
+            self.tokens = max(0.0, self.tokens - 1)
+            return True
+        return False
+
+    def wait(self, now):
+        #seconds until the next token
+        self.refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
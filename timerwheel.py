@@ -0,0 +1,132 @@
+#Hierarchical timing wheel for the protocol timers of many routers in one process.
+#
+#Hello, dead-interval, LSA refresh and max-age timers are set far more often than they fire: every
+#hello received pushes a dead timer back, every LSA installed pushes its max-age timer back. On a
+#heap each push-back leaves a dead entry behind or costs O(log n) to remove; on a wheel a timer sits
+#in the slot of the tick it expires in, so scheduling and cancelling are a dict insert and delete.
+#
+#Level 0 has one slot per tick (resolution seconds), level 1 one slot per level-0 revolution and so
+#on. A timer goes into the lowest level whose range covers it; when a level-0 revolution completes
+#the next level-1 slot is cascaded, its timers re-placed into level 0, and likewise further up.
+#Slots are dicts keyed by the timers themselves: O(1) delete, and iteration in insertion order, so
+#timers in one slot fire in the order they were scheduled, which keeps simulations reproducible.
+
+class Timer:
+    __slots__ = ('expires', 'callback', 'args', 'slot')
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    @property
+    def active(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    """Timers with O(1) schedule and cancel, fired by advance(now).
+
+    Times are seconds on whatever clock the caller advances the wheel with, starting at start.
+    Delays are rounded up to whole ticks of resolution seconds; levels wheels of slots slots each
+    (a power of two) cover resolution * slots ** levels seconds, longer timers are re-placed until
+    they are in range.
+    """
+
+    def __init__(self, resolution=0.001, slots=256, levels=4, start=0.0):
+        if slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, not {slots}")
+        self.resolution = resolution
+        self.slots = slots
+        self.bits = slots.bit_length() - 1
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.tick = int(start / resolution)
+        self.count = 0
+        self.stats = {'scheduled': 0, 'cancelled': 0, 'fired': 0, 'cascaded': 0}
+
+    def __len__(self):
+        return self.count
+
+    def now(self):
+        return self.tick * self.resolution
+
+    def schedule(self, delay, callback, *args):
+        """Run callback(*args) once delay seconds have passed, returns the Timer to cancel it with."""
+        # at least one tick, the current one may be firing right now
+        ticks = max(1, -int(-delay // self.resolution))
+        timer = Timer(self.tick + ticks, callback, args)
+        self._place(timer)
+        self.count += 1
+        self.stats['scheduled'] += 1
+        return timer
+
+    def cancel(self, timer):
+        #stop timer if it has not fired yet, returns whether it was still pending
+        if timer is None or timer.slot is None:
+            return False
+        del timer.slot[timer]
+        timer.slot = None
+        self.count -= 1
+        self.stats['cancelled'] += 1
+        return True
+
+    def _place(self, timer):
+        expires = timer.expires
+        bits = self.bits
+        # lowest level whose revolution still reaches the expiry, the top level takes the rest
+        level = (expires - self.tick).bit_length() - 1
+        level = level // bits if level > 0 else 0
+        if level >= len(self.wheels):
+            level = len(self.wheels) - 1
+            expires = self.tick + (1 << bits * len(self.wheels)) - 1
+        slot = self.wheels[level][(expires >> bits * level) & (self.slots - 1)]
+        slot[timer] = None
+        timer.slot = slot
+
+    def _cascade(self, level):
+        #move the timers of level's current slot down to where they belong now
+        slot = self.wheels[level][(self.tick >> self.bits * level) & (self.slots - 1)]
+        if not slot:
+            return
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            self.stats['cascaded'] += 1
+            self._place(timer)
+
+    def advance(self, now):
+        """Fire every timer due at or before now, in expiry order, returns how many fired."""
+        target = int(now / self.resolution + 1e-9)
+        fired = 0
+        wheel0 = self.wheels[0]
+        slots = self.slots
+        while self.tick < target:
+            if not self.count:
+                # nothing scheduled, skip the idle ticks
+                self.tick = target
+                break
+            self.tick += 1
+            tick = self.tick
+            level = 1
+            step = slots
+            while level < len(self.wheels) and tick % step == 0:
+                self._cascade(level)
+                level += 1
+                step *= slots
+            slot = wheel0[tick % slots]
+            while slot:
+                # callbacks may schedule more timers, ones due this tick land in the next one
+                timer = next(iter(slot))
+                del slot[timer]
+                timer.slot = None
+                self.count -= 1
+                if timer.expires > tick:
+                    # a clamped top-level timer that is still not due
+                    self._place(timer)
+                    self.count += 1
+                    continue
+                timer.callback(*timer.args)
+                fired += 1
+        self.stats['fired'] += fired
+        return fired
@@ -0,0 +1,329 @@
+#Parametric topology generator.
+#
+#Builds ring, grid, fat-tree, random geometric and Waxman topologies of N routers with M destination
+#hosts (d1..dM) plus the source host s, and assigns every address automatically: routers get a
+#router id out of 172.16.0.0/12 and every link gets its own /30 out of 10.0.0.0/8, allocated in one
+#arithmetic pass. A TopologySpec feeds both Mininet (topo.SpecTopo) and the in-process simulator
+#(sim.Network.from_spec).
+#
+#    python topogen.py grid 1000 --dests 3 --sim         build a 1000 router grid and cold-start it
+#    python topogen.py waxman 200 --bw 10:100 --json waxman.json
+#    sudo python topogen.py ring 8 --mininet --datapath   run it in Mininet, one datapath.py per router
+
+import argparse
+import ipaddress
+import json
+import math
+import random
+import time
+
+ROUTER_ID_BASE = int(ipaddress.IPv4Address('172.16.0.1'))
+LINK_SUBNET_BASE = int(ipaddress.IPv4Address('10.0.0.0'))
+
+
+def allocate_subnets(count, base=LINK_SUBNET_BASE, prefixlen=30):
+    #count consecutive subnets as (first host, second host) dotted pairs, e.g. /30s for point-to-point links
+    size = 1 << (32 - prefixlen)
+    ntoa = ipaddress.IPv4Address
+    return [(str(ntoa(base + i * size + 1)), str(ntoa(base + i * size + 2))) for i in range(count)]
+
+
+class TopologySpec:
+    """Routers, hosts and links of a topology, with the addresses to configure.
+
+    routers and hosts map names to IPs (the router id, or the host's address) and links is a list of
+    (node1, node2, params), params being addLink keywords: bw, intfName1/2 and params1/2 carrying
+    the interface addresses. With flat_prefix set every node instead sits on one shared subnet of
+    that prefix length and links carry no addresses, the way topo.py's MyTopo was set up.
+    """
+
+    def __init__(self, name, flat_prefix=None):
+        self.name = name
+        self.flat_prefix = flat_prefix
+        self.routers = {}
+        self.hosts = {}
+        self.links = []
+        self.source = None
+        self.destinations = []
+        self.intf_count = {}
+
+    @property
+    def nodes(self):
+        return dict(self.routers, **self.hosts)
+
+    def graph(self):
+        #{node: {neighbor: cost}} with a link's bw as its cost in both directions, like get_links
+        graph = {name: {} for name in self.routers}
+        graph.update((name, {}) for name in self.hosts)
+        for node1, node2, params in self.links:
+            graph[node1][node2] = graph[node2][node1] = int(params['bw'])
+        return graph
+
+    def add_router(self, name, ip=None):
+        self.routers[name] = ip or str(ipaddress.IPv4Address(ROUTER_ID_BASE + len(self.routers)))
+        self.intf_count[name] = 0
+        return name
+
+    def add_host(self, name, ip=None):
+        #ip None: the host takes its address from the link that attaches it, see assign_addresses
+        self.hosts[name] = ip
+        self.intf_count[name] = 0
+        return name
+
+    def add_link(self, node1, node2, bw=10, **params):
+        params['bw'] = bw
+        for key, node in (('intfName1', node1), ('intfName2', node2)):
+            params[key] = f"{node}-eth{self.intf_count[node]}"
+            self.intf_count[node] += 1
+        self.links.append((node1, node2, params))
+
+    def assign_addresses(self):
+        #one /30 per link, allocated in bulk; hosts without an address take theirs from their link
+        if self.flat_prefix is not None:
+            return self
+        for (node1, node2, params), (ip1, ip2) in zip(self.links, allocate_subnets(len(self.links))):
+            params['params1'] = {'ip': f"{ip1}/30"}
+            params['params2'] = {'ip': f"{ip2}/30"}
+            for node, ip in ((node1, ip1), (node2, ip2)):
+                if node in self.hosts and self.hosts[node] is None:
+                    self.hosts[node] = ip
+        return self
+
+    def to_json(self):
+        return json.dumps({'name': self.name, 'flat_prefix': self.flat_prefix, 'routers': self.routers,
+                           'hosts': self.hosts, 'links': self.links, 'source': self.source,
+                           'destinations': self.destinations})
+
+    @classmethod
+    def from_json(cls, text):
+        data = json.loads(text)
+        spec = cls(data['name'], data['flat_prefix'])
+        spec.routers = data['routers']
+        spec.hosts = data['hosts']
+        spec.links = [tuple(link) for link in data['links']]
+        spec.source = data['source']
+        spec.destinations = data['destinations']
+        spec.intf_count = dict.fromkeys(spec.nodes, 0)
+        for node1, node2, params in spec.links:
+            spec.intf_count[node1] += 1
+            spec.intf_count[node2] += 1
+        return spec
+
+    def __repr__(self):
+        return f"<TopologySpec {self.name}: {len(self.routers)} routers, {len(self.hosts)} hosts, {len(self.links)} links>"
+
+
+def link_bandwidth(bw, rng):
+    #bw is either a fixed value or a (low, high) range to draw each link's bandwidth from
+    if isinstance(bw, tuple):
+        return rng.randint(*bw)
+    return bw
+
+
+def attach_hosts(spec, dests, rng, candidates=None, bw=10):
+    #source s on the first candidate router like MyTopo's r1, destinations d1..dM on distinct random others
+    candidates = list(candidates or spec.routers)
+    first = candidates[0]
+    spec.source = spec.add_host('s')
+    spec.add_link('s', first, bw=link_bandwidth(bw, rng))
+    others = [router for router in candidates if router != first] or candidates
+    for i, router in enumerate(rng.sample(others, min(dests, len(others))), 1):
+        spec.destinations.append(spec.add_host(f"d{i}"))
+        spec.add_link(f"d{i}", router, bw=link_bandwidth(bw, rng))
+    return spec.assign_addresses()
+
+
+def connect_components(spec, rng, bw):
+    #union-find over the router links, then chain the components together so the topology is connected
+    parent = {router: router for router in spec.routers}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node1, node2, params in spec.links:
+        parent[find(node1)] = find(node2)
+    roots = []
+    for router in spec.routers:
+        if find(router) == router:
+            roots.append(router)
+    for a, b in zip(roots, roots[1:]):
+        spec.add_link(a, b, bw=link_bandwidth(bw, rng))
+
+
+def ring(n, dests=3, bw=10, seed=0):
+    rng = random.Random(seed)
+    spec = TopologySpec(f"ring-{n}")
+    routers = [spec.add_router(f"r{i}") for i in range(1, n + 1)]
+    for i in range(n if n > 2 else n - 1):
+        spec.add_link(routers[i], routers[(i + 1) % n], bw=link_bandwidth(bw, rng))
+    return attach_hosts(spec, dests, rng, bw=bw)
+
+
+def grid(rows, cols, dests=3, bw=10, seed=0):
+    rng = random.Random(seed)
+    spec = TopologySpec(f"grid-{rows}x{cols}")
+    name = [[spec.add_router(f"r{r * cols + c + 1}") for c in range(cols)] for r in range(rows)]
+    for r in range(rows):
+        for c in range(cols):
+            if c + 1 < cols:
+                spec.add_link(name[r][c], name[r][c + 1], bw=link_bandwidth(bw, rng))
+            if r + 1 < rows:
+                spec.add_link(name[r][c], name[r + 1][c], bw=link_bandwidth(bw, rng))
+    return attach_hosts(spec, dests, rng, bw=bw)
+
+
+def fat_tree(k, dests=3, bw=10, seed=0):
+    """k-ary fat tree: (k/2)^2 core routers and k pods of k/2 aggregation + k/2 edge routers."""
+    if k % 2:
+        raise ValueError("fat tree arity k must be even")
+    rng = random.Random(seed)
+    spec = TopologySpec(f"fat-tree-{k}")
+    half = k // 2
+    count = iter(range(1, 5 * k * k // 4 + 1))
+    core = [spec.add_router(f"r{next(count)}") for _ in range(half * half)]
+    edges = []
+    for pod in range(k):
+        aggregation = [spec.add_router(f"r{next(count)}") for _ in range(half)]
+        edge = [spec.add_router(f"r{next(count)}") for _ in range(half)]
+        for i, agg in enumerate(aggregation):
+            for j in range(half):
+                spec.add_link(agg, core[i * half + j], bw=link_bandwidth(bw, rng))
+            for e in edge:
+                spec.add_link(agg, e, bw=link_bandwidth(bw, rng))
+        edges.extend(edge)
+    # hosts hang off edge routers only
+    return attach_hosts(spec, dests, rng, candidates=edges, bw=bw)
+
+
+def positions(n, rng):
+    return [(rng.random(), rng.random()) for _ in range(n)]
+
+
+def random_geometric(n, degree=4, dests=3, bw=10, seed=0):
+    """Routers at random points of the unit square, linked when closer than the radius giving ~degree neighbors."""
+    rng = random.Random(seed)
+    spec = TopologySpec(f"geometric-{n}")
+    routers = [spec.add_router(f"r{i}") for i in range(1, n + 1)]
+    points = positions(n, rng)
+    radius = math.sqrt(degree / (math.pi * n))
+    # bucket points into radius-sized cells, so only neighboring cells need comparing
+    cells = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((int(x / radius), int(y / radius)), []).append(i)
+    for (cx, cy), members in cells.items():
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    for i in members:
+                        if i < j and math.dist(points[i], points[j]) < radius:
+                            spec.add_link(routers[i], routers[j], bw=link_bandwidth(bw, rng))
+    connect_components(spec, rng, bw)
+    return attach_hosts(spec, dests, rng, bw=bw)
+
+
+def waxman(n, alpha=0.4, beta=0.1, dests=3, bw=10, seed=0):
+    """Waxman graph: routers u, v linked with probability alpha * exp(-d(u, v) / (beta * L)).
+
+    This looks at every pair, so it is O(N^2): fine up to a few thousand routers, slow beyond.
+    """
+    rng = random.Random(seed)
+    spec = TopologySpec(f"waxman-{n}")
+    routers = [spec.add_router(f"r{i}") for i in range(1, n + 1)]
+    points = positions(n, rng)
+    scale = beta * math.sqrt(2)
+    for i in range(n):
+        for j in range(i + 1, n):
+            if rng.random() < alpha * math.exp(-math.dist(points[i], points[j]) / scale):
+                spec.add_link(routers[i], routers[j], bw=link_bandwidth(bw, rng))
+    connect_components(spec, rng, bw)
+    return attach_hosts(spec, dests, rng, bw=bw)
+
+
+def mytopo(flat=True):
+    """The MyTopo network: 7 routers, s and d1-d3.
+
+    flat keeps topo.py's addressing, every node on 10.0.0.0/24. Otherwise links get their own /30s
+    and routers router ids, like every generated topology.
+    """
+    spec = TopologySpec('mytopo', flat_prefix=24 if flat else None)
+    spec.source = spec.add_host('s', '10.0.0.1' if flat else None)
+    for i in range(1, 8):
+        spec.add_router(f"r{i}", f"10.0.0.{i + 1}" if flat else None)
+    for i in range(1, 4):
+        spec.destinations.append(spec.add_host(f"d{i}", f"10.0.0.{i + 8}" if flat else None))
+    for a, b in (('s', 'r1'), ('r1', 'r2'), ('r1', 'r3'), ('r2', 'r3'), ('r2', 'r6'), ('r3', 'r4'),
+                 ('r3', 'r5'), ('r4', 'd2'), ('r5', 'd3'), ('r6', 'r7'), ('r7', 'd1')):
+        spec.add_link(a, b, bw=10)
+    return spec.assign_addresses()
+
+
+def generate(kind, n, dests=3, bw=10, seed=0):
+    #topology of kind with about n routers
+    if kind == 'ring':
+        return ring(n, dests, bw, seed)
+    if kind == 'grid':
+        rows = max(1, int(math.sqrt(n)))
+        return grid(rows, max(1, n // rows), dests, bw, seed)
+    if kind == 'fat-tree':
+        k = 2
+        while 5 * k * k // 4 < n:
+            k += 2
+        return fat_tree(k, dests, bw, seed)
+    if kind == 'geometric':
+        return random_geometric(n, dests=dests, bw=bw, seed=seed)
+    if kind == 'waxman':
+        return waxman(n, dests=dests, bw=bw, seed=seed)
+    if kind == 'mytopo':
+        return mytopo()
+    raise ValueError(f"unknown topology kind {kind!r}")
+
+
+def parse_bw(text):
+    #"10" or "10:100"
+    if ':' in text:
+        low, high = text.split(':')
+        return (int(low), int(high))
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a topology and optionally run it")
+    parser.add_argument('kind', choices=['ring', 'grid', 'fat-tree', 'geometric', 'waxman', 'mytopo'])
+    parser.add_argument('routers', type=int, nargs='?', default=10)
+    parser.add_argument('--dests', type=int, default=3)
+    parser.add_argument('--bw', type=parse_bw, default=10, help="link bandwidth in Mbit/s, or low:high")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="write the topology to this file")
+    parser.add_argument('--sim', action='store_true', help="cold-start it in the in-process simulator")
+    parser.add_argument('--mininet', action='store_true', help="start it in Mininet (needs root)")
+    parser.add_argument('--datapath', action='store_true', help="with --mininet, run every router's datapath.py")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    spec = generate(args.kind, args.routers, args.dests, args.bw, args.seed)
+    print(f"{spec} generated in {time.perf_counter() - start:.2f} s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(spec.to_json())
+    if args.sim:
+        from sim import Network
+        start = time.perf_counter()
+        net = Network.from_spec(spec)
+        net.start()
+        net.run()
+        print(f"simulated cold start: converged at t={net.sim.now * 1e3:.1f} ms, {net.sim.processed} events, "
+              f"routes complete: {net.routes_complete()}, {time.perf_counter() - start:.1f} s wall")
+    if args.mininet:
+        from topo import start_network
+        if args.datapath:
+            from CustomRouter import UDPRouter
+            start_network(spec, UDPRouter, args.json or 'topology.json')
+        else:
+            start_network(spec)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+#Traffic generator and sinks: load on the forwarding path, with one-way latency, loss and reordering.
+#
+#The generator sends from one host (s) in the packet.py formats, either unicast, cycling over the
+#destinations, or k-anycast: a group multicast inside a unicast to the source's first router, which
+#delivers a copy to the kval destinations nearest to it. Departures are constant-rate, Poisson or
+#bursts, and every payload starts with a probe (flow, sequence number, send time) followed by
+#padding up to the payload size. A sink on each destination reads the probes back and keeps a
+#latency histogram, duplicates (within a bounded window per flow) and late (reordered) arrivals;
+#report() puts generator and sinks together into loss, latency percentiles and goodput.
+#
+#In the simulator (run_simulated) both ends share the simulated clock. Under Mininet every host runs
+#its own process and both ends use time.time(), which all network namespaces of one machine share:
+#
+#    python trafficgen.py sink topology.json d1           on every destination, prints its record as JSON
+#    python trafficgen.py send topology.json s --to d1 d2 d3 --mode poisson --rate 2000 --count 20000
+#
+#or run_mininet(net, 'topology.json', ...) to do both from the Mininet script.
+
+import argparse
+import json
+import math
+import random
+import socket
+import struct
+import sys
+import time
+
+from datapath import ROUTER_PORT
+from packet import (create_unicast_packet, create_group_multicast_packet, PacketView, WIRE_ORDER,
+                    UNICAST_LAYOUT)
+from topogen import TopologySpec
+
+# magic, flow, sequence number, send time in seconds
+PROBE = struct.Struct(WIRE_ORDER + 'HHId')
+PROBE_MAGIC = 0x7467
+MODES = ('constant', 'poisson', 'burst')
+_SEQ_OFFSET = UNICAST_LAYOUT.fields['seq'][1]
+
+
+def departures(mode, rate, count, burst=10, rng=None):
+    """Send times of count packets in seconds from the start, rate packets a second on average.
+
+    constant spaces them 1/rate apart, poisson draws exponential gaps, burst sends burst packets
+    back to back every burst/rate seconds.
+    """
+    if mode not in MODES:
+        raise ValueError(f"unknown traffic mode {mode!r}")
+    rng = rng or random.Random(0)
+    now = 0.0
+    for i in range(count):
+        if mode == 'constant':
+            yield i / rate
+        elif mode == 'poisson':
+            yield now
+            now += rng.expovariate(rate)
+        else:
+            yield (i // burst) * burst / rate
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram of latencies: constant memory, precision relative error per bucket.
+
+    Bucket 0 holds everything up to floor seconds, bucket i > 0 up to floor * (1 + precision) ** i.
+    """
+
+    def __init__(self, precision=0.01, floor=1e-6):
+        self.precision = precision
+        self.floor = floor
+        self.log_step = math.log1p(precision)
+        self.counts = {}
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, seconds):
+        bucket = 0 if seconds <= self.floor else math.ceil(math.log(seconds / self.floor) / self.log_step)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def percentile(self, p):
+        #upper edge of the bucket holding the p-th percentile (0 < p <= 100), None when empty
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.floor * math.exp(bucket * self.log_step), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'precision': self.precision, 'floor': self.floor, 'max': self.max,
+                'counts': {str(bucket): count for bucket, count in sorted(self.counts.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data['precision'], data['floor'])
+        histogram.counts = {int(bucket): count for bucket, count in data['counts'].items()}
+        histogram.count = sum(histogram.counts.values())
+        histogram.max = data['max']
+        return histogram
+
+
+class TrafficGenerator:
+    """Probe packets from src to destinations (IPs), unicast or k-anycast through router via.
+
+    Unicast sends departure i to destinations[i % len(destinations)], one flow per destination.
+    With kval set every departure is one group multicast to via, the source's first router, which
+    sends it on to the kval destinations closest to it, all as flow first_flow. Packets are built
+    once per flow and only their sequence numbers and send time are patched in.
+    """
+
+    def __init__(self, src, destinations, size=64, kval=None, via=None, ttl=64, first_flow=0):
+        if size < PROBE.size:
+            raise ValueError(f"payload of {size} bytes has no room for the {PROBE.size} byte probe")
+        if kval is not None and via is None:
+            raise ValueError("k-anycast needs the router to send through (via)")
+        self.size = size
+        self.kval = kval
+        self.templates = []
+        padding = bytes(size)
+        if kval is None:
+            for dest in destinations:
+                self.templates.append(bytearray(create_unicast_packet(0, ttl, src, dest, padding)))
+        else:
+            group = create_group_multicast_packet(0, ttl, kval, destinations, padding)
+            self.templates.append(bytearray(create_unicast_packet(0, ttl, src, via, group)))
+        # the probe opens the payload, which is the last size bytes of the packet either way
+        self.probe_offset = len(self.templates[0]) - size
+        self.flows = [first_flow + i for i in range(len(self.templates))]
+        self.sent = [0] * len(self.templates)
+        self.sent_bytes = 0
+        self.first_sent = self.last_sent = None
+
+    def packet(self, now):
+        #the next packet, stamped with now as its send time
+        index = sum(self.sent) % len(self.templates)
+        seq = self.sent[index]
+        buf = self.templates[index]
+        buf[_SEQ_OFFSET] = seq & 0xFF
+        PROBE.pack_into(buf, self.probe_offset, PROBE_MAGIC, self.flows[index], seq, now)
+        self.sent[index] += 1
+        self.sent_bytes += self.size
+        if self.first_sent is None:
+            self.first_sent = now
+        self.last_sent = now
+        return bytes(buf)
+
+    def report(self):
+        #what was sent, per flow, and how many copies the sinks should see in total
+        copies = self.kval or 1
+        return {'sent': sum(self.sent), 'expected': sum(self.sent) * copies, 'payload_bytes': self.sent_bytes,
+                'flows': {str(flow): sent for flow, sent in zip(self.flows, self.sent)},
+                'first_sent': self.first_sent, 'last_sent': self.last_sent}
+
+
+class TrafficSink:
+    """Receiving end on one destination: latency histogram, duplicates and reordering per flow.
+
+    clock gives the receive time on the same clock the generator stamps with. A probe with a lower
+    sequence number than one already seen on its flow counts as reordered. Duplicates are caught
+    within the last window sequence numbers of a flow (a bitmask below its highest one, as in
+    IPsec anti-replay), so a sink's memory stays the same however long it runs; a probe older than
+    that counts as late, and as reordered, but is not checked for being a duplicate.
+    """
+
+    def __init__(self, clock, precision=0.01, window=4096):
+        self.clock = clock
+        self.latency = LatencyHistogram(precision)
+        self.window = window
+        # per flow: highest sequence number, bit i of window_seen set if highest - i arrived, probes
+        self.highest = {}
+        self.window_seen = {}
+        self.flow_received = {}
+        self.received = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self.late = 0
+        self.ignored = 0
+        self.payload_bytes = 0
+        self.first_sent = self.last_received = None
+
+    def receive_packet(self, packet, ingress=None):
+        now = self.clock()
+        try:
+            view = PacketView(packet)
+            payload = view.payload if view.type == 4 else b''
+        except ValueError:
+            payload = b''
+        if len(payload) < PROBE.size:
+            self.ignored += 1
+            return
+        magic, flow, seq, sent = PROBE.unpack_from(payload)
+        if magic != PROBE_MAGIC:
+            self.ignored += 1
+            return
+        highest = self.highest.get(flow)
+        if highest is None:
+            self.highest[flow] = seq
+            self.window_seen[flow] = 1
+        elif seq > highest:
+            # slide the window up, what falls off the bottom is forgotten
+            self.highest[flow] = seq
+            self.window_seen[flow] = ((self.window_seen[flow] << (seq - highest)) | 1) & ((1 << self.window) - 1)
+        else:
+            behind = highest - seq
+            if behind >= self.window:
+                self.late += 1
+            elif self.window_seen[flow] >> behind & 1:
+                self.duplicates += 1
+                return
+            else:
+                self.window_seen[flow] |= 1 << behind
+            self.reordered += 1
+        self.flow_received[flow] = self.flow_received.get(flow, 0) + 1
+        self.received += 1
+        self.payload_bytes += len(payload)
+        self.latency.record(now - sent)
+        if self.first_sent is None or sent < self.first_sent:
+            self.first_sent = sent
+        self.last_received = now
+
+    def report(self):
+        return {'received': self.received, 'duplicates': self.duplicates, 'reordered': self.reordered,
+                'late': self.late, 'ignored': self.ignored, 'payload_bytes': self.payload_bytes,
+                'flows': {str(flow): received for flow, received in self.flow_received.items()},
+                'first_sent': self.first_sent, 'last_received': self.last_received,
+                'latency': self.latency.to_dict()}
+
+
+def _latency_ms(histogram):
+    return {name: None if value is None else value * 1e3
+            for name, value in (('p50', histogram.percentile(50)), ('p99', histogram.percentile(99)),
+                                ('p999', histogram.percentile(99.9)), ('max', histogram.max if histogram.count else None))}
+
+
+def report(sent, sinks):
+    """Loss, reordering, one-way latency percentiles (ms) and goodput of a run, overall and per sink.
+
+    sent is TrafficGenerator.report(), sinks {name: TrafficSink.report()}, both plain dicts so the
+    records of separate processes combine the same way. Goodput is the payload bits received over
+    the time from the first send to the last arrival.
+    """
+    latency = LatencyHistogram()
+    received = duplicates = reordered = late = payload = 0
+    last = None
+    per_sink = {}
+    for name, sink in sinks.items():
+        histogram = LatencyHistogram.from_dict(sink['latency'])
+        latency.merge(histogram)
+        received += sink['received']
+        duplicates += sink['duplicates']
+        reordered += sink['reordered']
+        late += sink['late']
+        payload += sink['payload_bytes']
+        if sink['last_received'] is not None:
+            last = sink['last_received'] if last is None else max(last, sink['last_received'])
+        per_sink[name] = {'received': sink['received'], 'duplicates': sink['duplicates'],
+                          'reordered': sink['reordered'], 'late': sink['late'], 'latency_ms': _latency_ms(histogram)}
+    received_per_flow = {}
+    for sink in sinks.values():
+        for flow, count in sink['flows'].items():
+            received_per_flow[flow] = received_per_flow.get(flow, 0) + count
+    span = None if last is None or sent['first_sent'] is None else last - sent['first_sent']
+    lost = max(0, sent['expected'] - received)
+    sending = None if sent['first_sent'] is None else sent['last_sent'] - sent['first_sent']
+    return {
+        'sent': sent['sent'],
+        'expected': sent['expected'],
+        'received': received,
+        'lost': lost,
+        'loss': lost / sent['expected'] if sent['expected'] else 0.0,
+        'duplicates': duplicates,
+        'reordered': reordered,
+        'late': late,
+        'latency_ms': _latency_ms(latency),
+        'offered_pps': (sent['sent'] - 1) / sending if sending else None,
+        'goodput_bps': payload * 8 / span if span else None,
+        'flows': {flow: {'sent': count, 'received': received_per_flow.get(flow, 0)} for flow, count in sent['flows'].items()},
+        'sinks': per_sink,
+    }
+
+
+def run_simulated(net, source, destinations, mode='constant', rate=1000, count=1000, size=64, kval=None,
+                  burst=10, seed=0, drain=1.0):
+    """Send count probes from host source in a sim.Network and report what destinations received.
+
+    With kval the probes are k-anycast through source's first router. Runs the simulator until
+    drain seconds after the last departure.
+    """
+    host = net.hosts[source]
+    via = host.intfs[0].peer().node.ip if kval is not None else None
+    generator = TrafficGenerator(host.ip, [net.nodes[dest].ip for dest in destinations], size, kval, via)
+    sinks = {dest: TrafficSink(lambda: net.sim.now) for dest in destinations}
+    for dest, sink in sinks.items():
+        net.hosts[dest].on_receive = sink.receive_packet
+    start = net.sim.now
+    times = list(departures(mode, rate, count, burst, random.Random(seed)))
+
+    def send(i):
+        host.send(generator.packet(net.sim.now))
+        if i + 1 < len(times):
+            net.sim.schedule(start + times[i + 1] - net.sim.now, send, i + 1)
+
+    if times:
+        net.sim.schedule(times[0], send, 0)
+        net.run(start + times[-1] + drain)
+    for dest in destinations:
+        net.hosts[dest].on_receive = None
+    return report(generator.report(), {dest: sink.report() for dest, sink in sinks.items()})
+
+
+def _end_address(spec, params, key, node):
+    #address of one end of a link, like datapath.router_from_spec: its /30, or the node's IP when flat
+    return params[f'params{key}']['ip'].split('/')[0] if f'params{key}' in params else spec.nodes[node]
+
+
+def host_link(spec, name):
+    #(own address, first router's interface address, first router's id) of host name in spec
+    for node1, node2, params in spec.links:
+        if name not in (node1, node2):
+            continue
+        (own, router) = ((1, 2), node2) if node1 == name else ((2, 1), node1)
+        return (_end_address(spec, params, own[0], name), _end_address(spec, params, own[1], router),
+                spec.routers[router])
+    raise ValueError(f"{name} has no link in {spec.name}")
+
+
+def send_udp(spec, source, destinations, mode, rate, count, size, kval=None, burst=10, seed=0):
+    """Generator side under Mininet: send to the first router's datapath socket in real time."""
+    address, router_address, router_id = host_link(spec, source)
+    generator = TrafficGenerator(address, [spec.nodes[dest] for dest in destinations], size, kval,
+                                 router_id if kval is not None else None)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    peer = (router_address, ROUTER_PORT)
+    start = time.perf_counter()
+    for offset in departures(mode, rate, count, burst, random.Random(seed)):
+        wait = start + offset - time.perf_counter()
+        if wait > 0.001:
+            time.sleep(wait - 0.0005)
+        while time.perf_counter() < start + offset:
+            pass
+        try:
+            sock.sendto(generator.packet(time.time()), peer)
+        except BlockingIOError:
+            # counted as sent, it is the host's own drop
+            pass
+    return generator.report()
+
+
+def sink_udp(spec, name, idle=2.0, duration=None):
+    """Sink side under Mininet: receive on the port routers send to until idle seconds of silence."""
+    address, _, _ = host_link(spec, name)
+    sink = TrafficSink(time.time)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind((address, ROUTER_PORT))
+    sock.settimeout(idle)
+    deadline = None if duration is None else time.time() + duration
+    while deadline is None or time.time() < deadline:
+        try:
+            packet = sock.recv(65535)
+        except socket.timeout:
+            if sink.received:
+                break
+            continue
+        sink.receive_packet(packet)
+    return sink.report()
+
+
+def run_mininet(net, spec_path, source, destinations, mode='constant', rate=1000, count=1000, size=64,
+                kval=None, burst=10, seed=0, idle=2.0):
+    """Run sinks on the destinations and the generator on source of a started Mininet net, then report.
+
+    The routers must be running their datapaths on the same spec (UDPRouter.start_datapath).
+    """
+    options = ['--mode', mode, '--rate', str(rate), '--count', str(count), '--size', str(size),
+               '--burst', str(burst), '--seed', str(seed)]
+    if kval is not None:
+        options += ['--kval', str(kval)]
+    sinks = {dest: net.get(dest).popen(['python3', 'trafficgen.py', 'sink', spec_path, dest, '--idle', str(idle)])
+             for dest in destinations}
+    time.sleep(0.5)
+    sender = net.get(source).popen(['python3', 'trafficgen.py', 'send', spec_path, source, '--to', *destinations, *options])
+    sent = json.loads(sender.communicate()[0])
+    return report(sent, {dest: json.loads(sink.communicate()[0]) for dest, sink in sinks.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe traffic between Mininet hosts")
+    parser.add_argument('role', choices=('send', 'sink'))
+    parser.add_argument('spec', help="topology written by topogen.py --json")
+    parser.add_argument('host')
+    parser.add_argument('--to', nargs='+', default=[], help="destination hosts (send)")
+    parser.add_argument('--mode', choices=MODES, default='constant')
+    parser.add_argument('--rate', type=float, default=1000, help="packets a second")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--size', type=int, default=64, help="payload bytes, probe included")
+    parser.add_argument('--kval', type=int, help="k-anycast to the kval nearest destinations instead of unicast")
+    parser.add_argument('--burst', type=int, default=10, help="packets per burst in burst mode")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--idle', type=float, default=2.0, help="seconds without packets before a sink reports (sink)")
+    parser.add_argument('--duration', type=float, help="seconds a sink listens at most (sink)")
+    args = parser.parse_args()
+    with open(args.spec) as f:
+        spec = TopologySpec.from_json(f.read())
+    if args.role == 'send':
+        record = send_udp(spec, args.host, args.to or spec.destinations, args.mode, args.rate, args.count,
+                          args.size, args.kval, args.burst, args.seed)
+    else:
+        record = sink_udp(spec, args.host, args.idle, args.duration)
+    json.dump(record, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()